@@ -0,0 +1,177 @@
+"""
+Arquiva mensagens antigas em segmentos colunares comprimidos.
+
+Lê um arquivo JSONL de turnos de conversa (uma mensagem por linha, com o
+resultado do NLU) e move as mensagens mais antigas que `--older-than-days`
+para o arquivo colunar particionado por usuário e mês
+(src/infrastructure/archive). As mensagens recentes e as linhas que não
+puderam ser lidas são gravadas em `--keep` ou, com `--in-place`, substituem
+a entrada (arquivo temporário + rename, depois dos segmentos em disco).
+
+Mensagens que já estão no arquivo são ignoradas (manifesto por partição):
+repetir uma execução interrompida, ou rodar de novo sobre a mesma entrada
+com um corte posterior, não duplica mensagens. O corte pode ser fixado com
+`--cutoff` para que repetições usem exatamente o mesmo.
+
+Cada linha deve ter `user_id` e `timestamp` (segundos desde a época ou data
+ISO 8601). O texto vem de `user_text` (ou `content`) e `bot_text` (ou
+`response`); o NLU, de `intent`, `entities` e `confidence` ou do `result`
+gravado pelo backfill.py.
+
+Exemplo:
+    python archive.py turnos.jsonl --older-than-days 90 --in-place
+    python archive.py turnos.jsonl --cutoff 2024-01-01 --keep recentes.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente
+load_dotenv()
+
+# Configuração básica de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("archive")
+
+def parse_timestamp(value: Any) -> float:
+    """
+    Converte o timestamp de uma linha para segundos desde a época.
+
+    Raises:
+        ValueError: Se o valor não for numérico nem uma data ISO 8601
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def to_record(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normaliza uma linha da entrada para o esquema dos segmentos.
+
+    Raises:
+        KeyError: Se faltar `user_id` ou `timestamp`
+        ValueError: Se o timestamp for inválido
+        TypeError: Se a linha não for um objeto JSON
+    """
+    if not isinstance(message, dict):
+        raise TypeError(f"Linha não é um objeto JSON: {type(message).__name__}")
+    result = message.get("result") if isinstance(message.get("result"), dict) else {}
+    return {
+        "user_id": str(message["user_id"]),
+        "timestamp": parse_timestamp(message["timestamp"]),
+        "session_id": message.get("session_id"),
+        "task_id": message.get("task_id"),
+        "intent": message.get("intent", result.get("intent")),
+        "confidence": message.get("confidence", result.get("confidence")),
+        "user_text": message.get("user_text", message.get("content")),
+        "bot_text": message.get("bot_text", message.get("response")),
+        "entities": message.get("entities", result.get("entities"))
+    }
+
+def run_archive(args: argparse.Namespace) -> None:
+    """
+    Percorre a entrada e arquiva as mensagens antigas.
+    """
+    from src.infrastructure.archive.archive import ChatArchive
+
+    archive = ChatArchive(args.root, args.segment_rows)
+    if args.cutoff is not None:
+        try:
+            cutoff = float(args.cutoff)
+        except ValueError:
+            cutoff = parse_timestamp(args.cutoff)
+    else:
+        cutoff = time.time() - args.older_than_days * 86400
+    logger.info(f"Arquivando mensagens anteriores a {datetime.fromtimestamp(cutoff, timezone.utc).isoformat()}")
+    keep_path = args.input if args.in_place else args.keep
+    keep_tmp = f"{keep_path}.tmp" if keep_path else None
+
+    pending: List[Dict[str, Any]] = []
+    counts = {"archived": 0, "already_archived": 0, "kept": 0, "invalid": 0, "segments": 0}
+
+    def flush() -> None:
+        duplicates = archive.duplicates
+        counts["segments"] += len(archive.append(pending))
+        counts["already_archived"] += archive.duplicates - duplicates
+        counts["archived"] += len(pending) - (archive.duplicates - duplicates)
+        pending.clear()
+
+    keep = open(keep_tmp, "wb") if keep_tmp else None
+    try:
+        with open(args.input, "rb") as f:
+            for raw in f:
+                if not raw.strip():
+                    continue
+                record: Optional[Dict[str, Any]] = None
+                try:
+                    record = to_record(json.loads(raw))
+                except (ValueError, KeyError, TypeError) as e:
+                    counts["invalid"] += 1
+                    logger.warning(f"Linha mantida sem arquivar: {e}")
+
+                if record is not None and record["timestamp"] < cutoff:
+                    pending.append(record)
+                    # Memória limitada: grava os segmentos a cada bloco de mensagens
+                    if len(pending) >= args.segment_rows:
+                        flush()
+                else:
+                    counts["kept"] += 1
+                    if keep:
+                        keep.write(raw if raw.endswith(b"\n") else raw + b"\n")
+        if pending:
+            flush()
+
+        if keep:
+            # A entrada só é substituída depois que os segmentos estão em disco
+            keep.flush()
+            os.fsync(keep.fileno())
+            keep.close()
+            os.replace(keep_tmp, keep_path)
+    finally:
+        if keep and not keep.closed:
+            keep.close()
+            os.remove(keep_tmp)
+
+    logger.info(
+        f"Concluído: {counts['archived']} mensagens arquivadas em {counts['segments']} segmentos "
+        f"({counts['already_archived']} já estavam no arquivo), "
+        f"{counts['kept']} mantidas ({counts['invalid']} inválidas)"
+    )
+
+def main():
+    """
+    Função principal do arquivamento.
+    """
+    from src.config.settings import settings
+
+    parser = argparse.ArgumentParser(description="Arquiva turnos de conversa antigos em segmentos colunares")
+    parser.add_argument("input", help="Arquivo JSONL de entrada (um turno por linha)")
+    cutoff = parser.add_mutually_exclusive_group()
+    cutoff.add_argument("--older-than-days", type=float, default=30, help="Idade mínima das mensagens arquivadas")
+    cutoff.add_argument("--cutoff", help="Arquiva as mensagens anteriores a este instante (ISO 8601 ou segundos)")
+    parser.add_argument("--root", default=settings.ARCHIVE_ROOT, help="Diretório raiz do arquivo")
+    parser.add_argument("--segment-rows", type=int, default=settings.ARCHIVE_SEGMENT_MAX_ROWS,
+                        help="Máximo de mensagens por segmento")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--keep", help="Arquivo JSONL com as mensagens não arquivadas")
+    target.add_argument("--in-place", action="store_true", help="Substitui a entrada pelas mensagens não arquivadas")
+    args = parser.parse_args()
+
+    run_archive(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Reprocessa mensagens armazenadas com o agente NLU, em lote.
+
+Lê um arquivo JSONL (uma mensagem por linha), executa o NLU com
+concorrência limitada e grava os resultados incrementalmente em outro
+JSONL. O progresso é salvo em um checkpoint: uma execução interrompida
+continua de onde parou com o mesmo comando.
+
+O uso de memória não depende do tamanho da entrada: a leitura é feita em
+streaming e, no máximo, `--window` linhas ficam entre a mais antiga
+pendente e a mais recente em processamento.
+
+Exemplo:
+    python backfill.py mensagens.jsonl intents.jsonl --concurrency 16 --rate 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Set
+
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente
+load_dotenv()
+
+# Configuração básica de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger("backfill")
+
+# Trechos de erro que indicam cota ou limite de taxa do provedor
+RATE_LIMIT_MARKERS = ("429", "RESOURCE_EXHAUSTED", "rate limit")
+
+class Checkpoint:
+    """
+    Posição já processada da entrada, gravada de forma atômica.
+    
+    `line` e `offset` marcam o prefixo contíguo da entrada cujas linhas já
+    têm resultado no arquivo de saída.
+    """
+    
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = input_path
+        self.line = 0
+        self.offset = 0
+        self.processed = 0
+        self.errors = 0
+        
+    def load(self) -> bool:
+        """
+        Carrega o checkpoint, se existir.
+        
+        Returns:
+            bool: True se havia um checkpoint para esta entrada
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("input") != os.path.abspath(self.input_path):
+            raise SystemExit(f"O checkpoint {self.path} pertence a outra entrada: {data.get('input')}")
+        self.line = data["line"]
+        self.offset = data["offset"]
+        self.processed = data.get("processed", 0)
+        self.errors = data.get("errors", 0)
+        return True
+        
+    def save(self) -> None:
+        """
+        Grava o checkpoint (arquivo temporário + rename).
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "input": os.path.abspath(self.input_path),
+                "line": self.line,
+                "offset": self.offset,
+                "processed": self.processed,
+                "errors": self.errors,
+                "updated_at": time.time()
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+def recover_output(path: str, from_line: int) -> Set[int]:
+    """
+    Prepara o arquivo de saída para retomar o processamento.
+    
+    Remove uma última linha incompleta (escrita interrompida) e retorna as
+    linhas da entrada posteriores ao checkpoint que já têm resultado
+    (concluídas fora de ordem antes da interrupção).
+    
+    Args:
+        path: Arquivo de saída
+        from_line: Linha do checkpoint
+        
+    Returns:
+        Set[int]: Linhas já processadas a partir do checkpoint
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+        
+    valid_size = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            valid_size += len(raw)
+            line = json.loads(raw)["line"]
+            if line >= from_line:
+                done.add(line)
+                
+    if valid_size != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_size)
+    return done
+
+class Backfill:
+    """
+    Execução do reprocessamento em lote.
+    """
+    
+    def __init__(self, args: argparse.Namespace, nlu_agent):
+        from src.core.limiter import TokenBucket
+        
+        self.args = args
+        self.nlu_agent = nlu_agent
+        self.bucket = TokenBucket(args.rate, burst=max(1, int(args.rate))) if args.rate > 0 else None
+        self.checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint", args.input)
+        
+        # Linhas concluídas além do checkpoint e offset final de cada linha em andamento
+        self._done: Set[int] = set()
+        self._end_offsets: Dict[int, int] = {}
+        self._window_open = asyncio.Event()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+        self._output = None
+        self._started = 0.0
+        self._completed = 0
+        self._last_report = (0.0, 0)
+        self._last_checkpoint = 0.0
+        
+    async def run(self) -> None:
+        """
+        Processa a entrada até o fim.
+        """
+        resumed = self.checkpoint.load()
+        skip = recover_output(self.args.output, self.checkpoint.line) if resumed else set()
+        if resumed:
+            logger.info(
+                f"Retomando da linha {self.checkpoint.line} "
+                f"({self.checkpoint.processed} já processadas, {len(skip)} adiantadas)"
+            )
+            
+        self._output = open(self.args.output, "a" if resumed else "w", encoding="utf-8")
+        self._started = time.perf_counter()
+        self._last_report = (self._started, 0)
+        
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.args.concurrency)]
+        tasks.append(asyncio.create_task(self._produce(skip)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Uma falha interrompe tudo; o checkpoint permite retomar
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            self._output.flush()
+            os.fsync(self._output.fileno())
+            self._output.close()
+            self.checkpoint.save()
+            
+        elapsed = time.perf_counter() - self._started
+        logger.info(
+            f"Concluído: {self._completed} itens em {elapsed:.1f}s "
+            f"({self._completed / elapsed if elapsed else 0:.2f} itens/s), "
+            f"{self.checkpoint.errors} erros no total"
+        )
+        
+    async def _produce(self, skip: Set[int]) -> None:
+        """
+        Lê a entrada a partir do checkpoint e enfileira as linhas.
+        """
+        line = self.checkpoint.line
+        with open(self.args.input, "rb") as f:
+            f.seek(self.checkpoint.offset)
+            offset = self.checkpoint.offset
+            
+            for raw in f:
+                offset += len(raw)
+                
+                # Janela limitada entre a linha pendente mais antiga e a atual
+                while line - self.checkpoint.line >= self.args.window:
+                    self._window_open.clear()
+                    await self._window_open.wait()
+                    
+                self._end_offsets[line] = offset
+                if line in skip or not raw.strip():
+                    self._complete(line)
+                else:
+                    await self._queue.put((line, raw))
+                line += 1
+                
+        # Sinaliza o fim da entrada para os workers
+        for _ in range(self.args.concurrency):
+            await self._queue.put(None)
+                
+    async def _worker(self) -> None:
+        """
+        Processa as linhas da fila.
+        """
+        from src.core.scheduler import llm_call_context
+        
+        # Chamadas em lote não competem com o tráfego interativo
+        with llm_call_context("batch", "backfill"):
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    return
+                line, raw = item
+                record = await self._process(line, raw)
+                self._output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.checkpoint.processed += 1
+                if "error" in record:
+                    self.checkpoint.errors += 1
+                self._completed += 1
+                self._complete(line)
+                self._report()
+                
+    async def _process(self, line: int, raw: bytes) -> Dict[str, Any]:
+        """
+        Executa o NLU de uma linha, repetindo com backoff as falhas do provedor.
+        
+        Um limite de taxa pausa todas as chamadas; as demais falhas (5xx,
+        timeouts, respostas inválidas) pausam só esta linha. Se as tentativas
+        se esgotarem, a linha é gravada apenas com o erro, sem resultado.
+        """
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError as e:
+            return {"line": line, "error": f"JSON inválido: {e}"}
+        if not isinstance(message, dict):
+            return {"line": line, "error": f"Linha não é um objeto JSON: {type(message).__name__}"}
+            
+        text = message.get(self.args.text_field)
+        if not isinstance(text, str):
+            return {"line": line, "id": message.get(self.args.id_field), "error": f"Campo {self.args.text_field} ausente"}
+            
+        for attempt in range(self.args.max_retries + 1):
+            if self.bucket:
+                await self.bucket.acquire()
+            response = await self.nlu_agent.process(text, message.get(self.args.context_field))
+            failed = response.content.get("intent") == "error"
+            error = response.content.get("error") or ("Falha do NLU" if failed else None)
+            
+            if not failed:
+                break
+            if attempt == self.args.max_retries:
+                return {"line": line, "id": message.get(self.args.id_field), "error": error}
+                
+            backoff = min(60.0, 2.0 ** attempt)
+            if any(marker in error for marker in RATE_LIMIT_MARKERS):
+                logger.warning(f"Limite de taxa do provedor; pausando {backoff:.0f}s")
+                if self.bucket:
+                    self.bucket.pause(backoff)
+                    continue
+            else:
+                logger.warning(f"Falha do provedor na linha {line} ({error}); nova tentativa em {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            
+        record = {
+            "line": line,
+            "id": message.get(self.args.id_field),
+            "result": response.content,
+            "confidence": response.confidence,
+            "cached": response.metadata.get("cached", False)
+        }
+        return record
+        
+    def _complete(self, line: int) -> None:
+        """
+        Marca uma linha como concluída e avança o checkpoint pelo prefixo contíguo.
+        """
+        self._done.add(line)
+        advanced = False
+        while self.checkpoint.line in self._done:
+            self._done.remove(self.checkpoint.line)
+            self.checkpoint.offset = self._end_offsets.pop(self.checkpoint.line)
+            self.checkpoint.line += 1
+            advanced = True
+            
+        if not advanced:
+            return
+            
+        self._window_open.set()
+        now = time.perf_counter()
+        if now - self._last_checkpoint >= self.args.checkpoint_every:
+            # A saída precisa estar em disco antes do checkpoint que a referencia
+            self._output.flush()
+            os.fsync(self._output.fileno())
+            self.checkpoint.save()
+            self._last_checkpoint = now
+            
+    def _report(self) -> None:
+        """
+        Registra o progresso periodicamente (itens/s total e recente).
+        """
+        now = time.perf_counter()
+        last_time, last_count = self._last_report
+        if now - last_time < self.args.progress_every:
+            return
+            
+        total_rate = self._completed / (now - self._started)
+        recent_rate = (self._completed - last_count) / (now - last_time)
+        logger.info(
+            f"{self._completed} itens nesta execução (linha {self.checkpoint.line}): "
+            f"{recent_rate:.2f} itens/s (média {total_rate:.2f} itens/s)"
+        )
+        self._last_report = (now, self._completed)
+
+async def run_backfill(args: argparse.Namespace) -> None:
+    """
+    Prepara o agente NLU e executa o reprocessamento.
+    """
+    from src.agents.nlu_agent import NLUAgent
+    
+    nlu_agent = NLUAgent()
+    await nlu_agent.prepare()
+    try:
+        await Backfill(args, nlu_agent).run()
+    finally:
+        await nlu_agent.cleanup()
+
+def main():
+    """
+    Função principal do reprocessamento em lote.
+    """
+    parser = argparse.ArgumentParser(description="Reprocessa mensagens JSONL com o agente NLU")
+    parser.add_argument("input", help="Arquivo JSONL de entrada (uma mensagem por linha)")
+    parser.add_argument("output", help="Arquivo JSONL de saída (resultados)")
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: <saída>.checkpoint)")
+    parser.add_argument("--text-field", default="content", help="Campo com o texto da mensagem")
+    parser.add_argument("--id-field", default="id", help="Campo com o ID da mensagem")
+    parser.add_argument("--context-field", default="context", help="Campo com o contexto (opcional)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Chamadas simultâneas ao NLU")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("BACKFILL_RATE", "5")),
+                        help="Máximo de chamadas por segundo (0 desativa)")
+    parser.add_argument("--max-retries", type=int, default=5, help="Tentativas após falha do provedor")
+    parser.add_argument("--window", type=int, default=0,
+                        help="Máximo de linhas entre a pendente mais antiga e a atual (padrão: 8 x concorrência)")
+    parser.add_argument("--checkpoint-every", type=float, default=5.0, help="Intervalo entre checkpoints (s)")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="Intervalo entre relatórios (s)")
+    args = parser.parse_args()
+    args.window = args.window or args.concurrency * 8
+    
+    asyncio.run(run_backfill(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Pacote de benchmarks do Orumaiv Bot.
+
+Contém micro-benchmarks das funções do caminho crítico, um servidor Gemini
+falso para testes locais e um gerador de carga para o endpoint de chat.
+"""
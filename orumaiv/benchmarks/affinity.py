@@ -0,0 +1,165 @@
+"""
+Taxa de acerto de caches por processo com e sem afinidade de sessão.
+
+Sobe vários processos worker, cada um com o seu cache LRU de sessões (como
+o contexto pré-carregado de `src.core.prefetch`), e distribui entre eles o
+mesmo fluxo de mensagens, com sessões de popularidade Zipf:
+
+- random: cada mensagem vai a um worker qualquer (balanceamento sem afinidade)
+- affinity: o worker é escolhido pelo anel de hashing consistente
+  (`src.core.affinity.HashRing`) a partir da chave da sessão
+- rebalance: como affinity, mas um worker sai do anel na metade do fluxo
+
+Cada worker é endereçado diretamente pelo anel, como no modo
+`run.py --production --worker-ports`; no modo padrão (socket compartilhado
+pelos workers de um nó), a afinidade só escolhe o nó, e dentro dele o
+resultado se aproxima de `random`.
+
+Com `--redis`, os workers usam o armazenamento compartilhado Redis
+(`RedisSharedStore`): falhas do cache local que encontram a sessão no Redis
+contam como recuperadas, em vez de frias.
+
+Uso:
+    python -m benchmarks.affinity [--workers 4] [--sessions 5000] [--messages 100000]
+                                  [--cache-size 500] [--redis redis://localhost:6379/0]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+from typing import Dict, Any, List, Optional
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from src.core.affinity import HashRing, affinity_key
+from src.infrastructure.cache.memory import LRUCache
+
+from benchmarks.common import save_results
+
+# Mensagens enviadas a um worker de cada vez
+BATCH_SIZE = 500
+
+def _worker(inbox: multiprocessing.Queue, outbox: multiprocessing.Queue,
+            cache_size: int, redis_uri: Optional[str]) -> None:
+    """
+    Processo worker: consulta o cache local (e o compartilhado) para cada mensagem.
+    """
+    async def run() -> Dict[str, int]:
+        store = None
+        if redis_uri:
+            from src.infrastructure.cache.shared import RedisSharedStore
+            store = RedisSharedStore(redis_uri, ttl=600)
+
+        cache = LRUCache(maxsize=cache_size)
+        counts = {"hit": 0, "restored": 0, "cold": 0}
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                return counts
+            for key in batch:
+                if cache.get(key) is not None:
+                    counts["hit"] += 1
+                    continue
+                if store is not None and await store.load(key) is not None:
+                    counts["restored"] += 1
+                else:
+                    counts["cold"] += 1
+                    if store is not None:
+                        await store.save(key, {"warm": True})
+                cache.set(key, True)
+
+    outbox.put(asyncio.run(run()))
+
+def _run_mode(mode: str, stream: List[str], workers: int, cache_size: int,
+              redis_uri: Optional[str], seed: int) -> Dict[str, Any]:
+    """
+    Distribui o fluxo entre os workers conforme o modo e coleta as contagens.
+    """
+    names = [f"worker-{index}" for index in range(workers)]
+    ring = HashRing(names)
+    rng = random.Random(seed)
+    outbox = multiprocessing.Queue()
+    inboxes = {name: multiprocessing.Queue() for name in names}
+    processes = [
+        multiprocessing.Process(target=_worker, args=(inboxes[name], outbox, cache_size, redis_uri))
+        for name in names
+    ]
+    for process in processes:
+        process.start()
+
+    pending = {name: [] for name in names}
+    for index, key in enumerate(stream):
+        if mode == "rebalance" and index == len(stream) // 2:
+            ring.remove(names[-1])
+        if mode == "random":
+            name = rng.choice(names)
+        else:
+            name = ring.node_for(key)
+        batch = pending[name]
+        batch.append(key)
+        if len(batch) >= BATCH_SIZE:
+            inboxes[name].put(batch)
+            pending[name] = []
+
+    for name in names:
+        if pending[name]:
+            inboxes[name].put(pending[name])
+        inboxes[name].put(None)
+
+    totals = {"hit": 0, "restored": 0, "cold": 0}
+    for _ in processes:
+        for outcome, count in outbox.get().items():
+            totals[outcome] += count
+    for process in processes:
+        process.join()
+
+    lookups = sum(totals.values())
+    return {
+        **totals,
+        "hit_rate": totals["hit"] / lookups,
+        "warm_rate": (totals["hit"] + totals["restored"]) / lookups
+    }
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Taxa de acerto com e sem afinidade de sessão")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--cache-size", type=int, default=500, help="Sessões no cache de cada worker")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Expoente da popularidade das sessões")
+    parser.add_argument("--redis", help="URI do Redis para o armazenamento compartilhado")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions = [affinity_key(session_id=f"s{index}") for index in range(args.sessions)]
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.sessions)]
+    stream = rng.choices(sessions, weights, k=args.messages)
+
+    results = {}
+    for mode in ("random", "affinity", "rebalance"):
+        if args.redis:
+            # Cada modo começa com o armazenamento compartilhado vazio
+            import redis
+            client = redis.from_url(args.redis)
+            keys = client.keys("shared_state:session:*")
+            if keys:
+                client.delete(*keys)
+        results[mode] = _run_mode(mode, stream, args.workers, args.cache_size, args.redis, args.seed)
+        result = results[mode]
+        print(
+            f"{mode:<10} hit rate {result['hit_rate']:>6.1%}   warm rate {result['warm_rate']:>6.1%}"
+            f"   (hit {result['hit']}, restored {result['restored']}, cold {result['cold']})"
+        )
+
+    path = save_results("affinity", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark de alocações de memória do caminho crítico de uma requisição.
+
+Mede com tracemalloc, por operação, a memória que permanece alocada
+(objetos mantidos vivos, como durante uma requisição), o pico de memória
+transitória e o número de blocos alocados; e o número de coletas da geração
+0 do GC, que cresce com a quantidade de objetos criados.
+
+Cenários:
+- agent_response: criação de um AgentResponse
+- message_response: criação e serialização de um MessageResponse
+- record_metrics: registros de métricas de uma requisição de chat
+- request: contabilidade completa de uma requisição (métricas, NLG
+  instrumentado, respostas dos agentes e modelo da API), sem o LLM
+
+Uso:
+    python -m benchmarks.allocations [--number 5000] [--output arquivo.json]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Any
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from src.agents.base_agent import AgentResponse
+from src.agents.nlg_agent import NLGAgent
+from src.api.routes.chat import MessageResponse
+from src.infrastructure.observability import metrics
+from src.infrastructure.observability.metrics import record_metrics
+
+from benchmarks.common import save_results
+
+# Resultado típico do NLU para uma mensagem
+NLU_RESULT = {
+    "intent": "criar_tarefa",
+    "entities": [{"name": "data", "value": "amanhã"}, {"name": "titulo", "value": "relatório"}],
+    "requires_task_info": False,
+    "requires_user_history": False,
+    "requires_external_info": False
+}
+
+# As alocações do próprio tracemalloc não contam
+_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+def _measure(func: Callable[[], Any], number: int) -> Dict[str, float]:
+    """
+    Executa `func` `number` vezes, mantendo os resultados vivos.
+
+    Returns:
+        Dict[str, float]: Bytes e blocos retidos por operação, pico de bytes
+            transitórios por operação e coletas da geração 0 por 1000 operações
+    """
+    # Aquece caches e estruturas criadas na primeira chamada
+    for _ in range(100):
+        func()
+    gc.collect()
+
+    keep = [None] * number
+    collections = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    peak_total = 0
+    for index in range(number):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        keep[index] = func()
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+
+    after = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    tracemalloc.stop()
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    diff = after.compare_to(before, "filename")
+    return {
+        "retained_bytes": sum(stat.size_diff for stat in diff) / number,
+        "retained_blocks": sum(stat.count_diff for stat in diff) / number,
+        "peak_bytes": peak_total / number,
+        "gen0_collections_per_1000": collections * 1000 / number
+    }
+
+def run_benchmarks(number: int) -> Dict[str, Dict[str, float]]:
+    """
+    Executa todos os cenários.
+
+    Args:
+        number: Operações por cenário
+
+    Returns:
+        Dict[str, Dict[str, float]]: Alocações por cenário
+    """
+    loop = asyncio.new_event_loop()
+    nlg_agent = NLGAgent()
+    labels = {"user_id": "u1"}
+
+    def agent_response():
+        return AgentResponse("nlu-agent", NLU_RESULT, 0.9, {"source": "llm", "latency": 0.4})
+
+    def message_response():
+        response = MessageResponse(
+            id="msg-1",
+            content="Claro! Qual seria o título da nova tarefa?",
+            timestamp=datetime.utcnow(),
+            intent=NLU_RESULT["intent"],
+            entities=NLU_RESULT["entities"]
+        )
+        return response, response.model_dump(mode="json")
+
+    def request_metrics():
+        start = record_metrics("chat_request", "start", labels)
+        record_metrics("chat_request", "success", {"user_id": "u1", "intent": "criar_tarefa"})
+        record_metrics("chat_request", "end", labels, start)
+
+    def request():
+        request_metrics()
+        nlu_response = agent_response()
+        nlg_response = loop.run_until_complete(nlg_agent.process(nlu_response.content, "Quero criar uma tarefa", {}))
+        response = MessageResponse(
+            id="msg-1",
+            content=nlg_response.content,
+            timestamp=datetime.utcnow(),
+            intent=NLU_RESULT["intent"],
+            entities=NLU_RESULT["entities"]
+        )
+        return nlu_response, nlg_response, response
+
+    try:
+        results = {
+            "agent_response": _measure(agent_response, number),
+            "message_response": _measure(message_response, number),
+            "record_metrics": _measure(request_metrics, number),
+            "request": _measure(request, number)
+        }
+    finally:
+        loop.close()
+        # Descarta as amostras acumuladas pelo benchmark
+        metrics._metrics_cache["processing_times"].pop("chat_request", None)
+
+    return results
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de alocações do Orumaiv Bot")
+    parser.add_argument("--number", type=int, default=5000, help="Operações por cenário")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.number)
+
+    for name, result in results.items():
+        print(
+            f"{name:<18} retained {result['retained_bytes']:>8.0f} B / {result['retained_blocks']:>5.1f} blocks"
+            f"   peak {result['peak_bytes']:>8.0f} B   gen0 GCs/1000 {result['gen0_collections_per_1000']:>5.1f}"
+        )
+
+    path = save_results("allocations", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os resultados são gravados como JSON, identificados pelo commit atual, para
+que regressões possam ser comparadas entre commits com `benchmarks.compare`.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Sequence
+
+# Diretório padrão para os resultados
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Calcula um percentil por interpolação linear.
+    
+    Args:
+        sorted_values: Valores já ordenados
+        fraction: Percentil desejado entre 0 e 1
+        
+    Returns:
+        float: Valor do percentil, ou 0.0 se não houver valores
+    """
+    if not sorted_values:
+        return 0.0
+        
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Resume uma lista de amostras com média e percentis.
+    
+    Args:
+        values: Amostras
+        
+    Returns:
+        Dict[str, float]: count, mean, min, p50, p95, p99 e max
+    """
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+        "min": ordered[0] if ordered else 0.0,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0.0
+    }
+
+def git_revision() -> str:
+    """
+    Obtém o hash curto do commit atual.
+    
+    Returns:
+        str: Hash do commit, ou "unknown" fora de um repositório git
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def save_results(name: str, results: Dict[str, Any], output: str = None) -> Path:
+    """
+    Grava os resultados de um benchmark como JSON.
+    
+    Args:
+        name: Nome do benchmark (ex: micro, load)
+        results: Resultados a serem gravados
+        output: Caminho do arquivo; por padrão results/<name>-<commit>.json
+        
+    Returns:
+        Path: Caminho do arquivo gravado
+    """
+    revision = git_revision()
+    path = Path(output) if output else RESULTS_DIR / f"{name}-{revision}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    payload = {
+        "benchmark": name,
+        "revision": revision,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results
+    }
+    
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        
+    return path
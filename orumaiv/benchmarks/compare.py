@@ -0,0 +1,72 @@
+"""
+Compara dois arquivos de resultados de benchmark.
+
+Uso:
+    python -m benchmarks.compare results/micro-abc123.json results/micro-def456.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Any, Iterator, Tuple
+
+def _flatten(data: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """
+    Percorre os resultados e produz pares (caminho, valor) numéricos.
+    """
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, float(data)
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> int:
+    """
+    Imprime as diferenças entre dois resultados.
+    
+    Args:
+        baseline: Resultados de referência
+        candidate: Resultados a comparar
+        threshold: Variação relativa a partir da qual uma diferença é destacada
+        
+    Returns:
+        int: Número de métricas com variação acima do limite
+    """
+    base_values = dict(_flatten(baseline["results"]))
+    candidate_values = dict(_flatten(candidate["results"]))
+    flagged = 0
+    
+    print(f"{'métrica':<60} {baseline['revision']:>14} {candidate['revision']:>14} {'delta':>9}")
+    for key in sorted(base_values.keys() & candidate_values.keys()):
+        before, after = base_values[key], candidate_values[key]
+        delta = (after - before) / before if before else 0.0
+        marker = ""
+        if abs(delta) >= threshold:
+            marker = " *"
+            flagged += 1
+        print(f"{key:<60} {before:>14.4f} {after:>14.4f} {delta:>+8.1%}{marker}")
+        
+    return flagged
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("baseline", help="Arquivo JSON de referência")
+    parser.add_argument("candidate", help="Arquivo JSON a comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Variação relativa destacada (padrão: 0.10)")
+    args = parser.parse_args()
+    
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+        
+    flagged = compare(baseline, candidate, args.threshold)
+    print(f"\n{flagged} métrica(s) com variação acima de {args.threshold:.0%}")
+    sys.exit(1 if flagged else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Servidor Gemini falso para testes de carga locais.
+
+Implementa os endpoints REST usados pelo SDK `google-genai` (consulta de
+modelo e `generateContent`) com latência e taxa de erro configuráveis, sem
+chamadas à rede externa. Para usá-lo, aponte `GEMINI_BASE_URL` para ele.
+
+Uso:
+    python -m benchmarks.fake_gemini --port 8090 --latency lognormal --mean-ms 300 --stddev-ms 120 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import Dict, Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Respostas de NLU por palavra-chave encontrada no texto do usuário
+_INTENTS = (
+    ("criar", "criar_tarefa", [{"name": "data", "value": "amanhã"}]),
+    ("buscar", "buscar_tarefa", [{"name": "filtro", "value": "pendentes"}]),
+    ("lembr", "criar_lembrete", [{"name": "horario", "value": "09:00"}]),
+    ("clima", "obter_informacao", [{"name": "assunto", "value": "clima"}]),
+)
+
+class LatencyModel:
+    """
+    Gera latências artificiais segundo uma distribuição configurável.
+    """
+    
+    DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+    
+    def __init__(self, distribution: str = "constant", mean_ms: float = 200.0,
+                 stddev_ms: float = 50.0, seed: int = None):
+        """
+        Inicializa o modelo de latência.
+        
+        Args:
+            distribution: Uma das distribuições em DISTRIBUTIONS
+            mean_ms: Latência média em milissegundos
+            stddev_ms: Desvio padrão em milissegundos (ignorado para constant/exponential)
+            seed: Semente opcional para resultados reprodutíveis
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Distribuição desconhecida: {distribution}")
+            
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.stddev_ms = stddev_ms
+        self._random = random.Random(seed)
+        
+    def sample(self) -> float:
+        """
+        Sorteia uma latência.
+        
+        Returns:
+            float: Latência em segundos (nunca negativa)
+        """
+        if self.distribution == "constant":
+            value = self.mean_ms
+        elif self.distribution == "uniform":
+            value = self._random.uniform(self.mean_ms - self.stddev_ms, self.mean_ms + self.stddev_ms)
+        elif self.distribution == "normal":
+            value = self._random.gauss(self.mean_ms, self.stddev_ms)
+        elif self.distribution == "lognormal":
+            # Converte média/desvio para os parâmetros da normal subjacente
+            variance = math.log(1 + (self.stddev_ms / self.mean_ms) ** 2)
+            mu = math.log(self.mean_ms) - variance / 2
+            value = self._random.lognormvariate(mu, math.sqrt(variance))
+        else:
+            value = self._random.expovariate(1 / self.mean_ms)
+            
+        return max(value, 0.0) / 1000
+
+def _nlu_payload(prompt: str) -> Dict[str, Any]:
+    """
+    Monta uma resposta de NLU plausível a partir do prompt.
+    """
+    user_text = prompt.rsplit("TEXTO DO USUÁRIO:", 1)[-1].lower()
+    
+    for keyword, intent, entities in _INTENTS:
+        if keyword in user_text:
+            return {
+                "intent": intent,
+                "entities": entities,
+                "requires_task_info": intent == "buscar_tarefa",
+                "requires_user_history": False,
+                "requires_external_info": intent == "obter_informacao",
+                "search_query": user_text.strip() if intent == "obter_informacao" else None
+            }
+            
+    return {
+        "intent": "obter_ajuda",
+        "entities": [],
+        "requires_task_info": False,
+        "requires_user_history": False,
+        "requires_external_info": False
+    }
+
+def create_app(latency: LatencyModel, error_rate: float = 0.0, seed: int = None) -> FastAPI:
+    """
+    Cria a aplicação do servidor falso.
+    
+    Args:
+        latency: Modelo de latência das chamadas generateContent
+        error_rate: Fração de chamadas que retornam 503
+        seed: Semente opcional para o sorteio de erros
+        
+    Returns:
+        FastAPI: Aplicação pronta para ser servida
+    """
+    app = FastAPI(title="Fake Gemini")
+    error_random = random.Random(seed)
+    stats = {"requests": 0, "errors": 0}
+    
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, Any]:
+        return stats
+    
+    @app.get("/{api_version}/models/{model}")
+    async def get_model(api_version: str, model: str) -> Dict[str, Any]:
+        return {
+            "name": f"models/{model}",
+            "displayName": f"{model} (fake)",
+            "inputTokenLimit": 1048576,
+            "outputTokenLimit": 8192,
+            "supportedActions": ["generateContent"]
+        }
+    
+    @app.post("/{api_version}/models/{model}:generateContent")
+    async def generate_content(api_version: str, model: str, request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        
+        await asyncio.sleep(latency.sample())
+        
+        if error_random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}}
+            )
+        
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        grounded = any("googleSearch" in tool or "google_search" in tool for tool in body.get("tools", []))
+        
+        if grounded:
+            text = "Resultado de busca simulado pelo servidor falso."
+        else:
+            text = json.dumps(_nlu_payload(prompt), ensure_ascii=False)
+            
+        # Estimativa grosseira de tokens: ~4 caracteres por token
+        prompt_tokens = max(len(prompt) // 4, 1)
+        response_tokens = max(len(text) // 4, 1)
+        
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": response_tokens,
+                "totalTokenCount": prompt_tokens + response_tokens
+            },
+            "modelVersion": model
+        }
+        
+    return app
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Servidor Gemini falso")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", choices=LatencyModel.DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-ms", type=float, default=300.0)
+    parser.add_argument("--stddev-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    latency = LatencyModel(args.latency, args.mean_ms, args.stddev_ms, args.seed)
+    app = create_app(latency, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Gerador de carga para o endpoint de chat.
+
+Envia requisições em malha aberta (taxa fixa, independente das respostas)
+para `/api/vv1/chat/message` e reporta vazão e latências p50/p95/p99. A
+latência é medida a partir do instante agendado de cada requisição, para
+não esconder filas (coordinated omission).
+
+Com `--spawn`, sobe localmente o servidor Gemini falso e a aplicação.
+
+Uso:
+    python -m benchmarks.load --spawn --rps 50 --duration 30 --latency lognormal --mean-ms 300 --error-rate 0.01
+    python -m benchmarks.load --url http://localhost:8000 --rps 20 --duration 60
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, List, Iterator
+
+import httpx
+
+from benchmarks.common import save_results, summarize
+
+# Caminho do endpoint de chat
+CHAT_PATH = "/api/vv1/chat/message"
+
+# Mensagens usadas na carga
+SAMPLE_MESSAGES = (
+    "Quero criar uma tarefa para amanhã",
+    "Buscar minhas tarefas pendentes",
+    "Me lembre de ligar para o cliente às 9h",
+    "Como está o clima em São Paulo hoje?",
+    "Preciso de ajuda com o relatório",
+)
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    """
+    Aguarda até que o endpoint responda com sucesso.
+    """
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(url)
+                if response.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+            
+    raise RuntimeError(f"Servidor não ficou pronto: {url}")
+
+@contextmanager
+def spawn_servers(args: argparse.Namespace) -> Iterator[str]:
+    """
+    Sobe o servidor Gemini falso e a aplicação em subprocessos.
+    
+    Yields:
+        str: URL base da aplicação
+    """
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake_cmd = [
+        sys.executable, "-m", "benchmarks.fake_gemini",
+        "--port", str(args.fake_port),
+        "--latency", args.latency,
+        "--mean-ms", str(args.mean_ms),
+        "--stddev-ms", str(args.stddev_ms),
+        "--error-rate", str(args.error_rate),
+    ]
+    if args.seed is not None:
+        fake_cmd += ["--seed", str(args.seed)]
+    
+    app_env = {
+        **os.environ,
+        "GEMINI_BASE_URL": fake_url,
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "fake-key",
+    }
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "src.api.main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port), "--log-level", "warning",
+    ]
+    
+    processes = [subprocess.Popen(fake_cmd)]
+    try:
+        asyncio.run(_wait_ready(f"{fake_url}/stats"))
+        processes.append(subprocess.Popen(app_cmd, env=app_env, stdout=subprocess.DEVNULL))
+        app_url = f"http://127.0.0.1:{args.app_port}"
+        asyncio.run(_wait_ready(f"{app_url}/health/ready"))
+        yield app_url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+def _is_nlu_error(response: httpx.Response) -> bool:
+    """
+    Indica se uma resposta HTTP 200 carrega o fallback de erro do NLU.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return not isinstance(body, dict) or body.get("intent") == "error"
+
+async def run_load(url: str, rps: float, duration: float, timeout: float,
+                   users: int, seed: int = None) -> Dict[str, Any]:
+    """
+    Executa a carga em malha aberta.
+    
+    Args:
+        url: URL base da aplicação
+        rps: Taxa alvo de requisições por segundo
+        duration: Duração da carga em segundos
+        timeout: Timeout de cada requisição em segundos
+        users: Número de usuários distintos simulados
+        seed: Semente para a escolha de mensagens
+        
+    Returns:
+        Dict[str, Any]: Vazão, latências e contagem de status (respostas
+        200 com intent "error" contam como falha em `200_nlu_error`)
+    """
+    chooser = random.Random(seed)
+    total = int(rps * duration)
+    latencies: List[float] = []
+    service_times: List[float] = []
+    statuses: Counter = Counter()
+    
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        
+        async def send(index: int, scheduled: float) -> None:
+            payload = {
+                "user_id": f"load-user-{index % users}",
+                "content": chooser.choice(SAMPLE_MESSAGES),
+                "session_id": f"load-session-{index % users}",
+            }
+            sent = time.perf_counter()
+            try:
+                response = await client.post(CHAT_PATH, json=payload)
+                outcome = str(response.status_code)
+                # Falhas do Gemini viram HTTP 200 com intent "error" (fallback do NLU)
+                if response.status_code == 200 and _is_nlu_error(response):
+                    outcome = "200_nlu_error"
+                statuses[outcome] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            finished = time.perf_counter()
+            latencies.append(finished - scheduled)
+            service_times.append(finished - sent)
+        
+        start = time.perf_counter()
+        tasks = []
+        for index in range(total):
+            scheduled = start + index / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(index, scheduled)))
+            
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    
+    successes = statuses.get("200", 0)
+    return {
+        "target_rps": rps,
+        "duration_seconds": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "success_rps": successes / elapsed if elapsed else 0.0,
+        "error_rate": 1 - successes / total if total else 0.0,
+        "statuses": dict(statuses),
+        "latency_seconds": summarize(latencies),
+        "service_time_seconds": summarize(service_times),
+    }
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Teste de carga do endpoint de chat")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base (ignorada com --spawn)")
+    parser.add_argument("--rps", type=float, default=20.0, help="Taxa alvo de requisições por segundo")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição")
+    parser.add_argument("--users", type=int, default=50, help="Usuários distintos simulados")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    
+    spawn = parser.add_argument_group("servidores locais")
+    spawn.add_argument("--spawn", action="store_true", help="Sobe o Gemini falso e a aplicação")
+    spawn.add_argument("--app-port", type=int, default=8001)
+    spawn.add_argument("--fake-port", type=int, default=8090)
+    spawn.add_argument("--latency", default="lognormal", help="Distribuição de latência do Gemini falso")
+    spawn.add_argument("--mean-ms", type=float, default=300.0)
+    spawn.add_argument("--stddev-ms", type=float, default=100.0)
+    spawn.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    def execute(url: str) -> Dict[str, Any]:
+        return asyncio.run(run_load(url, args.rps, args.duration, args.timeout, args.users, args.seed))
+    
+    if args.spawn:
+        with spawn_servers(args) as url:
+            results = execute(url)
+        results["fake_gemini"] = {
+            "latency": args.latency,
+            "mean_ms": args.mean_ms,
+            "stddev_ms": args.stddev_ms,
+            "error_rate": args.error_rate,
+        }
+    else:
+        results = execute(args.url)
+    
+    latency = results["latency_seconds"]
+    print(f"Vazão: {results['throughput_rps']:.1f} req/s (sucesso: {results['success_rps']:.1f} req/s)")
+    print(f"Latência: p50 {latency['p50'] * 1000:.1f} ms   p95 {latency['p95'] * 1000:.1f} ms   p99 {latency['p99'] * 1000:.1f} ms")
+    print(f"Status: {results['statuses']}")
+    
+    path = save_results("load", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
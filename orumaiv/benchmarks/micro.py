@@ -0,0 +1,170 @@
+"""
+Micro-benchmarks das funções do caminho crítico.
+
+Mede o custo por chamada da montagem do prompt, do parse da resposta, do
+cálculo de confiança, da renderização de templates do NLG, do registro de métricas, da formatação de logs e dos
+decoradores `traced`/`timed`.
+
+Uso:
+    python -m benchmarks.micro [--number 20000] [--repeat 5] [--output arquivo.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from src.agents.nlu_agent import NLUAgent
+from src.agents.nlg_agent import NLGAgent
+from src.infrastructure.observability import metrics
+from src.infrastructure.observability.logging import JsonFormatter
+from src.infrastructure.observability.metrics import record_metrics, timed
+from src.infrastructure.observability.tracing import traced
+
+from benchmarks.common import save_results
+
+# Resposta típica do modelo na fase de compreensão
+SAMPLE_RESPONSE = json.dumps({
+    "intent": "criar_tarefa",
+    "entities": [{"name": "data", "value": "amanhã"}, {"name": "titulo", "value": "relatório"}],
+    "requires_task_info": False,
+    "requires_user_history": False,
+    "requires_external_info": False
+})
+
+# Contexto típico de uma conversa ligada a uma tarefa
+SAMPLE_CONTEXT = {
+    "task": {
+        "id": "task-1",
+        "title": "Preparar relatório mensal",
+        "description": "Consolidar os números de vendas",
+        "status": "em_andamento",
+        "due_date": "2024-05-10"
+    },
+    "recent_history": [
+        {"user": "Qual o prazo?", "bot": "O prazo é dia 10."},
+        {"user": "Ok, obrigado", "bot": "De nada!"}
+    ]
+}
+
+class _FakeResponse:
+    """Resposta mínima compatível com o Gemini API."""
+    
+    def __init__(self, text: str):
+        self.text = text
+
+def _run(func: Callable[[], Any], number: int, repeat: int) -> Dict[str, float]:
+    """
+    Executa uma função síncrona `number` vezes por rodada.
+    
+    Returns:
+        Dict[str, float]: Melhor e mediana do tempo por chamada em nanossegundos
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter_ns() - start) / number)
+        
+    timings.sort()
+    return {"best_ns": timings[0], "median_ns": timings[len(timings) // 2]}
+
+def _run_async(func: Callable[[], Awaitable[Any]], number: int, repeat: int) -> Dict[str, float]:
+    """
+    Executa uma corrotina `number` vezes por rodada, dentro de um único event loop.
+    
+    Returns:
+        Dict[str, float]: Melhor e mediana do tempo por chamada em nanossegundos
+    """
+    async def measure() -> float:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            await func()
+        return (time.perf_counter_ns() - start) / number
+        
+    timings = sorted(asyncio.run(measure()) for _ in range(repeat))
+    return {"best_ns": timings[0], "median_ns": timings[len(timings) // 2]}
+
+def run_benchmarks(number: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Executa todos os micro-benchmarks.
+    
+    Args:
+        number: Chamadas por rodada
+        repeat: Número de rodadas
+        
+    Returns:
+        Dict[str, Dict[str, float]]: Tempos por benchmark
+    """
+    agent = NLUAgent()
+    nlg_agent = NLGAgent()
+    slots = {"titulo": "relatório", "data": "amanhã"}
+    response = _FakeResponse(SAMPLE_RESPONSE)
+    wrapped_response = _FakeResponse(f"Claro! Aqui está:\n```json\n{SAMPLE_RESPONSE}\n```")
+    parsed = json.loads(SAMPLE_RESPONSE)
+    formatter = JsonFormatter()
+    record = logging.LogRecord("bench", logging.INFO, __file__, 1, "Processando mensagem %s", ("x",), None)
+    
+    def plain():
+        return None
+        
+    async def plain_async():
+        return None
+    
+    results = {
+        "nlu_prepare_prompt": _run(lambda: agent._prepare_prompt("Quero criar uma tarefa para amanhã", None), number, repeat),
+        "nlu_prepare_prompt_context": _run(lambda: agent._prepare_prompt("Qual o prazo?", SAMPLE_CONTEXT), number, repeat),
+        "nlu_parse_response": _run(lambda: agent._parse_response(response), number, repeat),
+        "nlu_calculate_confidence": _run(lambda: agent._calculate_confidence(parsed), number, repeat),
+        "nlg_render_template": _run(lambda: nlg_agent.render("criar_tarefa", slots), number, repeat),
+        "json_formatter_format": _run(lambda: formatter.format(record), number, repeat),
+        "record_metrics_start": _run(lambda: record_metrics("bench", "start", {"user_id": "u1"}), number, repeat),
+        "record_metrics_end": _run(lambda: record_metrics("bench", "end", {"user_id": "u1"}, 0.0), number, repeat),
+        "record_metrics_counter": _run(lambda: record_metrics("bench", "success", {"user_id": "u1", "intent": "x"}), number, repeat),
+        "baseline_call": _run(plain, number, repeat),
+        "traced_sync": _run(traced("bench.sync")(plain), number, repeat),
+        "timed_sync": _run(timed("bench_sync")(plain), number, repeat),
+        "baseline_await": _run_async(plain_async, number, repeat),
+        "traced_async": _run_async(traced("bench.async")(plain_async), number, repeat),
+        "timed_async": _run_async(timed("bench_async")(plain_async), number, repeat),
+    }
+    
+    # O parse com fallback por regex é bem mais caro; mede com menos iterações
+    logging.getLogger("src.agents.nlu_agent").disabled = True
+    results["nlu_parse_response_fallback"] = _run(
+        lambda: agent._parse_response(wrapped_response), max(number // 10, 1), repeat
+    )
+    
+    # Descarta as amostras acumuladas pelo benchmark
+    metrics._metrics_cache["processing_times"].pop("bench", None)
+    metrics._metrics_cache["processing_times"].pop("bench_sync", None)
+    metrics._metrics_cache["processing_times"].pop("bench_async", None)
+    
+    return results
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do Orumaiv Bot")
+    parser.add_argument("--number", type=int, default=20000, help="Chamadas por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Número de rodadas")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args.number, args.repeat)
+    
+    for name, timing in results.items():
+        print(f"{name:<32} best {timing['best_ns']:>10.0f} ns   median {timing['median_ns']:>10.0f} ns")
+        
+    path = save_results("micro", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Custo da serialização das respostas do endpoint de chat.
+
+Executa diretamente a aplicação ASGI (sem servidor nem cliente HTTP) e mede
+o tempo de CPU por requisição de variantes da mesma rota, todas com o
+mesmo parse da requisição e a mesma montagem do `MessageResponse`:
+
+- baseline: retorna bytes prontos (custo da rota sem serialização)
+- before: retorna o modelo pelo `response_model` com `JSONResponse`: nova
+  validação, conversão para dict e `json.dumps` (o caminho do FastAPI nas
+  versões suportadas pelo requirements.txt)
+- before_native: retorna o modelo pelo `response_model` com a classe de
+  resposta padrão; versões recentes do FastAPI revalidam o modelo mas o
+  serializam direto em bytes (nas antigas, igual a before)
+- after: retorna `FastJSONResponse` (sem revalidação, direto em bytes)
+
+A fatia de serialização é `(cpu_variante - cpu_baseline) / cpu_variante`.
+Também compara o /openapi.json padrão do FastAPI com o pré-serializado de
+`src.api.openapi`.
+
+Uso:
+    python -m benchmarks.serialization [--number 2000] [--repeat 5] [--tasks 5] [--output arquivo.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+
+from src.api.openapi import install_openapi
+from src.api.responses import FastJSONResponse
+from src.api.routes.chat import MessageRequest, MessageResponse
+
+from benchmarks.common import save_results
+
+REQUEST_BODY = json.dumps({
+    "user_id": "user123",
+    "content": "Quero criar uma nova tarefa para amanhã",
+    "task_id": "task-1",
+    "session_id": "session456"
+}).encode("utf-8")
+
+# Variantes da rota de mensagens
+VARIANTS = ("baseline", "before", "before_native", "after")
+
+def build_app(tasks: int) -> FastAPI:
+    """
+    Aplicação com as variantes da rota de mensagens.
+
+    Args:
+        tasks: Tarefas incluídas em cada resposta (como em buscar_tarefa)
+    """
+    app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+    found = [
+        {"id": f"task-{index}", "title": "Preparar relatório mensal", "status": "pendente",
+         "category": "trabalho", "due_date": "2024-05-10", "score": 1.25}
+        for index in range(tasks)
+    ] or None
+
+    def build(request: MessageRequest) -> MessageResponse:
+        return MessageResponse(
+            id="msg-1a2b3c4d",
+            content="Claro! Vou criar uma tarefa para amanhã. Qual seria o título da tarefa?",
+            timestamp=datetime.utcnow(),
+            intent="criar_tarefa",
+            entities=[{"name": "data", "value": "amanhã"}, {"name": "titulo", "value": "relatório"}],
+            tasks=found
+        )
+
+    prebuilt = build(MessageRequest.model_validate_json(REQUEST_BODY)).model_dump_json().encode("utf-8")
+
+    @app.post("/baseline")
+    async def baseline(request: MessageRequest):
+        build(request)
+        return Response(prebuilt, media_type="application/json")
+
+    @app.post("/before", response_model=MessageResponse, response_class=JSONResponse)
+    async def before(request: MessageRequest):
+        return build(request)
+
+    @app.post("/before_native", response_model=MessageResponse)
+    async def before_native(request: MessageRequest):
+        return build(request)
+
+    @app.post("/after", response_model=MessageResponse, response_class=FastJSONResponse)
+    async def after(request: MessageRequest):
+        return FastJSONResponse(build(request))
+
+    return app
+
+async def call(app, method: str, path: str, body: bytes = b"") -> bytes:
+    """
+    Executa uma requisição na aplicação ASGI e retorna o corpo da resposta.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)
+    }
+    chunks = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+async def measure(app, method: str, path: str, number: int, body: bytes = b"") -> float:
+    """
+    Tempo de CPU médio por requisição, em microssegundos.
+    """
+    start = time.process_time()
+    for _ in range(number):
+        await call(app, method, path, body)
+    return (time.process_time() - start) / number * 1e6
+
+async def compare(variants: Dict[str, tuple], number: int, repeat: int) -> Dict[str, float]:
+    """
+    Mede as variantes em rodadas alternadas e fica com a menor média de cada.
+
+    Args:
+        variants: Nome -> (aplicação, método, rota, corpo)
+        number: Requisições por rodada
+        repeat: Rodadas por variante
+    """
+    for app, method, path, body in variants.values():
+        await measure(app, method, path, min(200, number), body)
+    best = {name: float("inf") for name in variants}
+    for _ in range(repeat):
+        for name, (app, method, path, body) in variants.items():
+            best[name] = min(best[name], await measure(app, method, path, number, body))
+    return best
+
+async def run_benchmarks(number: int, tasks: int, repeat: int) -> Dict[str, Any]:
+    """
+    Executa todos os cenários.
+
+    Args:
+        number: Requisições por rodada
+        tasks: Tarefas incluídas em cada resposta
+        repeat: Rodadas por cenário
+
+    Returns:
+        Dict[str, Any]: CPU por requisição e fatia de serialização
+    """
+    app = build_app(tasks)
+
+    # Todas as variantes produzem o mesmo documento
+    bodies = []
+    for name in VARIANTS[1:]:
+        body = json.loads(await call(app, "POST", f"/{name}", REQUEST_BODY))
+        body.pop("timestamp")
+        bodies.append(body)
+    assert all(body == bodies[0] for body in bodies), "As variantes produzem respostas diferentes"
+
+    cpu = await compare({name: (app, "POST", f"/{name}", REQUEST_BODY) for name in VARIANTS}, number, repeat)
+    results: Dict[str, Any] = {
+        "cpu_us_per_request": cpu,
+        "serialization_share": {
+            name: max(0.0, (cpu[name] - cpu["baseline"]) / cpu[name]) for name in VARIANTS[1:]
+        }
+    }
+
+    # /openapi.json: padrão do FastAPI (serializado a cada requisição) x pré-serializado
+    default_app = build_app(tasks)
+    default_app.openapi_url = "/openapi.json"
+    default_app.setup()
+    cached_app = build_app(tasks)
+    install_openapi(cached_app).warm()
+    results["openapi_cpu_us_per_request"] = await compare(
+        {"before": (default_app, "GET", "/openapi.json", b""), "after": (cached_app, "GET", "/openapi.json", b"")},
+        number // 10 or 1, repeat
+    )
+    return results
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Custo da serialização das respostas de chat")
+    parser.add_argument("--number", type=int, default=2000, help="Requisições por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas por cenário (vale a menor média)")
+    parser.add_argument("--tasks", type=int, default=5, help="Tarefas em cada resposta (0 = nenhuma)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args.number, args.tasks, args.repeat))
+
+    cpu, share = results["cpu_us_per_request"], results["serialization_share"]
+    for name in VARIANTS:
+        line = f"{name:<14} {cpu[name]:>8.1f} us/req CPU"
+        if name in share:
+            line += f"   serialização {share[name]:>6.1%} da CPU da requisição"
+        print(line)
+    openapi = results["openapi_cpu_us_per_request"]
+    print(f"openapi   before {openapi['before']:>8.1f} us/req   after {openapi['after']:>8.1f} us/req")
+
+    path = save_results("serialization", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark de tempo de inicialização (cold start).
+
+Mede, em processos novos:
+
+- o tempo de importação de `src.api.main`
+- o tempo até `/health/live` responder (processo aceitando conexões)
+- o tempo até `/health/ready` responder 200 (agentes prontos)
+
+A aplicação aponta para o servidor Gemini falso, com latência configurável
+para a consulta do modelo feita na preparação do agente.
+
+Uso:
+    python -m benchmarks.startup [--runs 5] [--mean-ms 300]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from benchmarks.common import save_results, summarize
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.api.main; "
+    "print(time.perf_counter() - start)"
+)
+
+def measure_import(env: Dict[str, str]) -> float:
+    """
+    Mede o tempo de importação da aplicação em um interpretador novo.
+    
+    Returns:
+        float: Tempo de importação em segundos
+    """
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], env=env, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def _poll(client: httpx.Client, url: str, deadline: float) -> Optional[float]:
+    """
+    Consulta a URL até obter 200, retornando o instante do sucesso.
+    """
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+def measure_server(env: Dict[str, str], port: int, timeout: float) -> Dict[str, Optional[float]]:
+    """
+    Sobe a aplicação e mede o tempo até liveness e readiness.
+    
+    Returns:
+        Dict[str, Optional[float]]: Segundos até cada endpoint responder (None em timeout)
+    """
+    cmd = [
+        sys.executable, "-m", "uvicorn", "src.api.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    base_url = f"http://127.0.0.1:{port}"
+    
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        with httpx.Client(timeout=1.0) as client:
+            live_at = _poll(client, f"{base_url}/health/live", deadline)
+            ready_at = _poll(client, f"{base_url}/health/ready", deadline)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        
+    return {
+        "live": live_at - start if live_at else None,
+        "ready": ready_at - start if ready_at else None
+    }
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--fake-port", type=int, default=8090)
+    parser.add_argument("--mean-ms", type=float, default=300.0, help="Latência do Gemini falso")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "fake-key",
+    }
+    
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini",
+        "--port", str(args.fake_port), "--latency", "constant", "--mean-ms", str(args.mean_ms),
+    ])
+    
+    imports: List[float] = []
+    live: List[float] = []
+    ready: List[float] = []
+    try:
+        # Aguarda o servidor falso aceitar conexões
+        with httpx.Client() as client:
+            _poll(client, f"http://127.0.0.1:{args.fake_port}/stats", time.perf_counter() + args.timeout)
+        
+        for _ in range(args.runs):
+            imports.append(measure_import(env))
+            timings = measure_server(env, args.app_port, args.timeout)
+            if timings["live"] is not None:
+                live.append(timings["live"])
+            if timings["ready"] is not None:
+                ready.append(timings["ready"])
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+    
+    results = {
+        "runs": args.runs,
+        "fake_gemini_latency_ms": args.mean_ms,
+        "import_seconds": summarize(imports),
+        "time_to_live_seconds": summarize(live),
+        "time_to_ready_seconds": summarize(ready),
+    }
+    
+    for name in ("import_seconds", "time_to_live_seconds", "time_to_ready_seconds"):
+        summary = results[name]
+        print(f"{name:<24} p50 {summary['p50'] * 1000:>8.1f} ms   max {summary['max'] * 1000:>8.1f} ms   n={summary['count']}")
+    
+    path = save_results("startup", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
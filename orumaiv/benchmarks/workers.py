@@ -0,0 +1,90 @@
+"""
+Benchmark de vazão com um e com vários workers.
+
+Sobe o servidor Gemini falso e, para cada quantidade de workers, executa a
+aplicação em modo de produção (`run.py --production`) e aplica a mesma carga
+em malha aberta, comparando vazão e latências.
+
+Uso:
+    python -m benchmarks.workers --workers 1 4 --rps 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import save_results
+from benchmarks.load import _wait_ready, run_load
+
+def main() -> None:
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description="Compara vazão com diferentes números de workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 2])
+    parser.add_argument("--rps", type=float, default=200.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--fake-port", type=int, default=8090)
+    parser.add_argument("--mean-ms", type=float, default=300.0, help="Latência média do Gemini falso")
+    parser.add_argument("--stddev-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": fake_url,
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "fake-key",
+        # Desativa o cache de resultados para medir o caminho completo
+        "NLU_CACHE_SIZE": "0",
+    }
+    
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini",
+        "--port", str(args.fake_port), "--latency", "lognormal",
+        "--mean-ms", str(args.mean_ms), "--stddev-ms", str(args.stddev_ms), "--seed", str(args.seed),
+    ])
+    
+    results = {}
+    try:
+        asyncio.run(_wait_ready(f"{fake_url}/stats"))
+        
+        for workers in args.workers:
+            app = subprocess.Popen(
+                [sys.executable, "run.py", "--production", "--host", "127.0.0.1",
+                 "--port", str(args.app_port), "--workers", str(workers)],
+                env=env,
+                stdout=subprocess.DEVNULL
+            )
+            try:
+                asyncio.run(_wait_ready(f"http://127.0.0.1:{args.app_port}/health/ready"))
+                # Dá tempo para todos os workers terminarem de preparar os agentes
+                time.sleep(2)
+                result = asyncio.run(run_load(
+                    f"http://127.0.0.1:{args.app_port}", args.rps, args.duration, 30.0, args.users, args.seed
+                ))
+            finally:
+                app.terminate()
+                app.wait(timeout=60)
+                
+            results[f"workers_{workers}"] = result
+            latency = result["latency_seconds"]
+            print(
+                f"{workers:>3} worker(s): {result['success_rps']:>8.1f} req/s   "
+                f"p50 {latency['p50'] * 1000:>7.1f} ms   p99 {latency['p99'] * 1000:>7.1f} ms"
+            )
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+    
+    path = save_results("workers", results, args.output)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
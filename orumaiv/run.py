@@ -1,7 +1,13 @@
 """
 Script para executar a aplicação FastAPI com Uvicorn.
+
+Em desenvolvimento, executa um único processo uvicorn (com reload quando
+DEBUG=true). Com --production (ou PRODUCTION=true), executa vários workers
+pré-carregados, com reciclagem periódica e desligamento gracioso; com
+--worker-ports, cada worker escuta em uma porta própria.
 """
 
+import argparse
 import uvicorn
 import os
 import logging
@@ -20,11 +26,40 @@ def main():
     """
     Função principal para executar a aplicação.
     """
+    parser = argparse.ArgumentParser(description="Executa o Orumaiv Bot")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("PRODUCTION", "False").lower() == "true",
+                        help="Executa vários workers pré-carregados (gunicorn + uvicorn)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "0")),
+                        help="Número de workers em produção (0: um por CPU)")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "10000")),
+                        help="Requisições por worker antes da reciclagem (0 desativa)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("MAX_REQUESTS_JITTER", "1000")))
+    parser.add_argument("--worker-ports", action="store_true",
+                        default=os.getenv("WORKER_PORTS", "False").lower() == "true",
+                        help="Um worker por porta (--port, --port + 1, ...), para afinidade de sessão por worker")
+    args = parser.parse_args()
+    
+    if args.production:
+        from src.api.server import run_production
+        
+        run_production(
+            args.host,
+            args.port,
+            workers=args.workers or None,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            worker_ports=args.worker_ports
+        )
+        return
+    
     # Configurações do Uvicorn
     uvicorn_config = {
         "app": "src.api.main:app",
-        "host": os.getenv("HOST", "0.0.0.0"),
-        "port": int(os.getenv("PORT", "8000")),
+        "host": args.host,
+        "port": args.port,
         "reload": os.getenv("DEBUG", "False").lower() == "true",
         "log_level": "info"
     }
@@ -33,4 +68,4 @@ def main():
     uvicorn.run(**uvicorn_config)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,23 +1,76 @@
 """
 Módulo que define a classe base para todos os agentes do sistema.
+
+O `process` de cada subclasse é instrumentado automaticamente: latência,
+chamadas em andamento, contagem por resultado (incluindo respostas de
+fallback que escondem erros) e distribuição da confiança são exportadas
+pelo backend de métricas compartilhado.
 """
 
 from abc import ABC, abstractmethod
+from functools import wraps
 from typing import Dict, Any, Optional
 import asyncio
 import time
 import uuid
 
 from src.infrastructure.observability.tracing import traced
+from src.infrastructure.observability.metrics import (
+    record_metrics, observe_histogram, adjust_gauge, LATENCY_BUCKETS
+)
+
+# Buckets da distribuição de confiança das respostas
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+def _instrument(process):
+    """
+    Envolve o `process` de um agente com as métricas de chamada.
+    """
+    @wraps(process)
+    async def wrapper(self, *args, **kwargs):
+        labels = self._metric_labels
+        metrics = self._metrics
+        metrics["in_flight"] += 1
+        adjust_gauge("agent_in_flight", labels, 1)
+        outcome = "exception"
+        start_time = time.perf_counter()
+        try:
+            response = await process(self, *args, **kwargs)
+            if isinstance(response, AgentResponse):
+                outcome = self._outcome(response)
+                observe_histogram("agent_confidence", labels, response.confidence, CONFIDENCE_BUCKETS)
+            else:
+                outcome = "success"
+            return response
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            processing_time = time.perf_counter() - start_time
+            metrics["in_flight"] -= 1
+            adjust_gauge("agent_in_flight", labels, -1)
+            observe_histogram("agent_latency_seconds", labels, processing_time, LATENCY_BUCKETS)
+            record_metrics("agent_calls", outcome, labels)
+            # Fallbacks sem erro são respostas degradadas, não falhas
+            self._update_metrics(outcome in ("success", "fallback"), processing_time, outcome)
+            
+    wrapper._instrumented = True
+    return wrapper
 
 class BaseAgent(ABC):
     """
     Classe base abstrata para todos os agentes do sistema.
     
     Todos os agentes específicos devem herdar desta classe e implementar
-    pelo menos o método process().
+    pelo menos o método process(), que é instrumentado automaticamente.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        process = cls.__dict__.get("process")
+        if process is not None and not getattr(process, "_instrumented", False):
+            cls.process = _instrument(process)
+    
     def __init__(self, name: str = None):
         """
         Inicializa um agente com um nome único.
@@ -31,8 +84,21 @@ class BaseAgent(ABC):
             "total_calls": 0,
             "successful_calls": 0,
             "failed_calls": 0,
-            "total_processing_time": 0
+            "total_processing_time": 0,
+            "in_flight": 0,
+            "outcomes": {}
         }
+        # Rótulo por classe: o agent_id pode ter alta cardinalidade (ex: um por tarefa)
+        self._metric_labels = {"agent": self.__class__.__name__}
+    
+    def set_metric_labels(self, **labels: str) -> None:
+        """
+        Substitui os rótulos das métricas de chamada do agente.
+        
+        Args:
+            **labels: Rótulos de baixa cardinalidade (ex: agent="NLUAgent.shadow")
+        """
+        self._metric_labels = labels
     
     @traced("base_agent.process")
     @abstractmethod
@@ -63,13 +129,14 @@ class BaseAgent(ABC):
             "metrics": self._metrics
         }
     
-    def _update_metrics(self, success: bool, processing_time: float) -> None:
+    def _update_metrics(self, success: bool, processing_time: float, outcome: Optional[str] = None) -> None:
         """
         Atualiza as métricas internas do agente.
         
         Args:
             success: Se o processamento foi bem-sucedido
             processing_time: Tempo de processamento em segundos
+            outcome: Resultado da chamada (ver `_outcome`)
         """
         self._metrics["total_calls"] += 1
         
@@ -79,6 +146,30 @@ class BaseAgent(ABC):
             self._metrics["failed_calls"] += 1
             
         self._metrics["total_processing_time"] += processing_time
+        
+        if outcome:
+            outcomes = self._metrics["outcomes"]
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    
+    def _outcome(self, response: "AgentResponse") -> str:
+        """
+        Classifica o resultado de uma chamada a partir da resposta.
+        
+        Respostas de fallback que escondem um erro (`metadata["error"]`)
+        contam como falha, assim como exceções e cancelamentos.
+        
+        Args:
+            response: Resposta retornada por process()
+            
+        Returns:
+            str: "success", "fallback" ou "error_fallback"
+        """
+        metadata = response.metadata
+        if metadata.get("error"):
+            return "error_fallback"
+        if metadata.get("source") == "fallback":
+            return "fallback"
+        return "success"
     
     async def prepare(self) -> None:
         """
@@ -92,17 +183,45 @@ class BaseAgent(ABC):
     async def cleanup(self) -> None:
         """
         Libera recursos utilizados pelo agente.
-        
+
         Este método pode ser sobrescrito por agentes que precisam
         de limpeza específica.
         """
         pass
 
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do agente para hibernação (serializável em JSON).
+
+        Agentes com estado próprio devem sobrescrever este método e `restore`.
+
+        Returns:
+            Dict[str, Any]: Estado do agente
+        """
+        return {"metrics": dict(self._metrics)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """
+        Restaura o estado gravado por `snapshot`.
+
+        Args:
+            state: Estado do agente
+        """
+        metrics = dict(state.get("metrics", {}))
+        # Chamadas em andamento pertencem à instância anterior
+        metrics.pop("in_flight", None)
+        self._metrics.update(metrics)
+
 class AgentResponse:
     """
     Classe que representa uma resposta padronizada de um agente.
+    
+    Criada a cada chamada de agente: usa `__slots__` e gera o ID da
+    resposta apenas quando consultado.
     """
     
+    __slots__ = ("agent_id", "content", "confidence", "metadata", "timestamp", "_response_id")
+    
     def __init__(self, agent_id: str, content: Any, confidence: float = 1.0, 
                  metadata: Dict[str, Any] = None):
         """
@@ -119,4 +238,13 @@ class AgentResponse:
         self.confidence = confidence
         self.metadata = metadata or {}
         self.timestamp = time.time()
-        self.response_id = f"response-{uuid.uuid4().hex}" 
\ No newline at end of file
+        self._response_id = None
+        
+    @property
+    def response_id(self) -> str:
+        """
+        Identificador único da resposta.
+        """
+        if self._response_id is None:
+            self._response_id = f"response-{uuid.uuid4().hex}"
+        return self._response_id
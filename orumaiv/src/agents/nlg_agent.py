@@ -0,0 +1,268 @@
+"""
+Agente de Geração de Linguagem Natural (NLG).
+
+Este agente gera a resposta ao usuário a partir do resultado do NLU. As
+intenções mais comuns são atendidas por templates pré-compilados, indexados
+por intenção e pelas entidades (slots) disponíveis, renderizados localmente.
+Apenas intenções abertas são escaladas para um gerador baseado em LLM.
+"""
+
+import logging
+import string
+import unicodedata
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+
+from src.agents.base_agent import BaseAgent, AgentResponse
+from src.infrastructure.observability.tracing import traced
+from src.infrastructure.observability.metrics import record_metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Templates por intenção; o primeiro cujos slots estejam todos disponíveis é usado.
+# Nenhuma ação é executada a partir da conversa: os templates confirmam o
+# pedido com o usuário em vez de afirmar que ele foi realizado.
+TEMPLATES: Dict[str, List[str]] = {
+    "criar_tarefa": [
+        'Quer que eu crie a tarefa "{titulo}" para {data}?',
+        'Quer que eu crie a tarefa "{titulo}"? Se quiser, me diga também a data de vencimento.',
+        "Claro! Qual seria o título da tarefa para {data}?",
+        "Claro! Qual seria o título da nova tarefa?",
+    ],
+    "buscar_tarefa": [
+        'Aqui estão suas tarefas {filtro} relacionadas a "{titulo}".',
+        "Aqui estão suas tarefas {filtro} para {data}.",
+        'Aqui estão as tarefas relacionadas a "{titulo}".',
+        "Aqui estão suas tarefas para {data}.",
+        "Aqui estão suas tarefas {filtro}.",
+        "Aqui estão suas tarefas.",
+    ],
+    "criar_lembrete": [
+        "Quer que eu te lembre de {titulo} {data} às {horario}?",
+        "Quer que eu te lembre de {titulo} às {horario}?",
+        "Quer que eu te lembre de {titulo} {data}?",
+        "Claro! Quando você quer ser lembrado de {titulo}?",
+        "Claro! Do que você quer ser lembrado, e quando?",
+    ],
+    "concluir_tarefa": [
+        'Quer que eu marque a tarefa "{titulo}" como concluída?',
+        "Ótimo! Qual tarefa você concluiu?",
+    ],
+    "unknown": [
+        "Desculpe, não entendi. Pode reformular a sua mensagem?",
+    ],
+    "error": [
+        "Desculpe, tive um problema para processar sua mensagem. Pode tentar novamente?",
+    ],
+}
+
+# Nomes de entidade retornados pelo NLU que correspondem a cada slot
+SLOT_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "titulo": ("titulo", "title", "tarefa", "nome", "assunto", "nome_tarefa"),
+    "data": ("data", "date", "dia", "prazo", "quando", "data_vencimento", "vencimento"),
+    "horario": ("horario", "hora", "time"),
+    "filtro": ("filtro", "status", "estado"),
+}
+
+# Configuração de geração usada na escalada para o LLM
+NLG_CONFIG = {
+    "temperature": 0.7
+}
+
+def _normalize(name: str) -> str:
+    """
+    Normaliza um nome de entidade (minúsculas, sem acentos, com underscores).
+    """
+    decomposed = unicodedata.normalize("NFKD", name.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).replace(" ", "_")
+
+# Mapa nome normalizado -> slot, montado uma única vez
+_ALIAS_TO_SLOT = {_normalize(alias): slot for slot, aliases in SLOT_ALIASES.items() for alias in aliases}
+
+def extract_slots(entities: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Converte as entidades do NLU em slots (titulo, data, horario, filtro).
+    
+    Args:
+        entities: Entidades retornadas pelo NLU
+        
+    Returns:
+        Dict[str, str]: Valor de cada slot encontrado (a primeira ocorrência vence)
+    """
+    slots = {}
+    for entity in entities:
+        slot = _ALIAS_TO_SLOT.get(_normalize(str(entity.get("name", ""))))
+        value = entity.get("value")
+        if slot and value and slot not in slots:
+            slots[slot] = str(value)
+    return slots
+
+def _compile(templates: Dict[str, List[str]]) -> Dict[str, List[Tuple[FrozenSet[str], str]]]:
+    """
+    Pré-compila os templates, extraindo os slots exigidos por cada um.
+    
+    Returns:
+        Dict[str, List[Tuple[FrozenSet[str], str]]]: Por intenção, pares (slots, template)
+    """
+    formatter = string.Formatter()
+    compiled = {}
+    for intent, intent_templates in templates.items():
+        compiled[intent] = [
+            (frozenset(field for _, field, _, _ in formatter.parse(template) if field), template)
+            for template in intent_templates
+        ]
+    return compiled
+
+# Templates padrão, compilados uma única vez
+_COMPILED_TEMPLATES = _compile(TEMPLATES)
+
+class NLGAgent(BaseAgent):
+    """
+    Agente que gera respostas em português a partir do resultado do NLU.
+    
+    Usa templates locais sempre que possível; intenções sem template são
+    escaladas para um gerador LLM (qualquer objeto com `generate_text`).
+    """
+    
+    def __init__(self, name: str = "nlg_agent", llm=None):
+        """
+        Inicializa o agente NLG.
+        
+        O construtor aceita apenas parâmetros simples: as rotas o declaram
+        com `Depends()`, e um parâmetro estruturado viraria um campo do corpo
+        da requisição.
+        
+        Args:
+            name: Nome opcional para o agente
+            llm: Gerador usado para intenções abertas (ex: NLUAgent)
+        """
+        super().__init__(name)
+        self.llm = llm
+        self._templates = _COMPILED_TEMPLATES
+        self._stats = {
+            "template_hits": 0,
+            "escalations": 0,
+            "fallbacks": 0
+        }
+    
+    @traced("nlg_agent.process")
+    async def process(self, nlu_result: Dict[str, Any], text: str = "",
+                      context: Dict[str, Any] = None) -> AgentResponse:
+        """
+        Gera a resposta para o resultado do NLU.
+        
+        Args:
+            nlu_result: Resultado do NLU (intenção e entidades)
+            text: Texto original do usuário (usado na escalada para o LLM)
+            context: Contexto adicional da conversa
+            
+        Returns:
+            AgentResponse: Resposta com o texto gerado; `metadata["source"]`
+            indica "template", "llm" ou "fallback"
+        """
+        intent = nlu_result.get("intent", "unknown")
+        slots = self._extract_slots(nlu_result.get("entities") or [])
+        
+        content = self.render(intent, slots)
+        if content is not None:
+            self._stats["template_hits"] += 1
+            record_metrics("nlg", "template_hit", {"intent": intent})
+            return AgentResponse(
+                agent_id=self.agent_id,
+                content=content,
+                metadata={"source": "template", "intent": intent}
+            )
+        
+        if self.llm is not None:
+            try:
+                generated = await self.llm.generate_text(
+                    self._prepare_prompt(intent, nlu_result.get("entities") or [], text, context),
+                    NLG_CONFIG
+                )
+                self._stats["escalations"] += 1
+                record_metrics("nlg", "escalation", {"intent": intent})
+                return AgentResponse(
+                    agent_id=self.agent_id,
+                    content=generated["text"].strip(),
+                    confidence=0.9,
+                    metadata={
+                        "source": "llm",
+                        "intent": intent,
+                        "usage": generated.get("usage"),
+                        "latency": generated.get("latency", 0.0)
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Erro ao gerar resposta com LLM: {str(e)}")
+        
+        self._stats["fallbacks"] += 1
+        record_metrics("nlg", "fallback", {"intent": intent})
+        return AgentResponse(
+            agent_id=self.agent_id,
+            content=self._fallback(intent, nlu_result.get("entities") or []),
+            confidence=0.5,
+            metadata={"source": "fallback", "intent": intent}
+        )
+    
+    def render(self, intent: str, slots: Dict[str, str]) -> Optional[str]:
+        """
+        Renderiza o template mais específico disponível para a intenção.
+        
+        Args:
+            intent: Intenção identificada
+            slots: Valores dos slots disponíveis
+            
+        Returns:
+            Optional[str]: Texto renderizado, ou None se não houver template aplicável
+        """
+        for required, template in self._templates.get(intent, ()):
+            if required <= slots.keys():
+                return template.format_map(slots)
+        return None
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Inclui a taxa de acerto dos templates.
+        """
+        health = await super().health_check()
+        total = sum(self._stats.values())
+        health["nlg"] = {
+            **self._stats,
+            "template_hit_rate": self._stats["template_hits"] / total if total else 0.0
+        }
+        return health
+    
+    def _extract_slots(self, entities: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Converte as entidades do NLU em slots dos templates.
+        """
+        return extract_slots(entities)
+    
+    def _prepare_prompt(self, intent: str, entities: List[Dict[str, Any]], text: str,
+                        context: Optional[Dict[str, Any]]) -> str:
+        """
+        Prepara o prompt para a geração com LLM.
+        """
+        entities_text = ", ".join(f"{e.get('name')}: {e.get('value')}" for e in entities) or "nenhuma"
+        task_text = ""
+        if context and "task" in context:
+            task_text = f"Tarefa ativa: {context['task'].get('title', context['task'].get('id', ''))}\n"
+            
+        return (
+            "Você é um assistente de tarefas e produtividade. Responda ao usuário em português, "
+            "de forma natural, breve (no máximo três frases) e sem inventar dados.\n"
+            f"{task_text}"
+            f"Intenção identificada: {intent}\n"
+            f"Entidades: {entities_text}\n"
+            f"MENSAGEM DO USUÁRIO: {text}"
+        )
+    
+    def _fallback(self, intent: str, entities: List[Dict[str, Any]]) -> str:
+        """
+        Resposta genérica quando não há template nem LLM disponível.
+        """
+        response_content = f"Entendi que você quer: {intent}"
+        if entities:
+            entities_text = ", ".join([f"{e['name']}: {e['value']}" for e in entities])
+            response_content += f"\nEntidades identificadas: {entities_text}"
+        return response_content
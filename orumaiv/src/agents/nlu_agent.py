@@ -5,22 +5,53 @@ Este agente é responsável por processar o texto do usuário para identificar
 intenções, entidades e informações relevantes usando o Google Gemini API.
 """
 
+import os
 import json
+import time
 import asyncio
 from typing import Dict, Any, Optional, List
 import logging
 
-from google import genai
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 from src.agents.base_agent import BaseAgent, AgentResponse
 from src.config.settings import settings
 from src.infrastructure.observability.tracing import traced
-from src.infrastructure.observability.metrics import timed
+from src.infrastructure.observability.metrics import timed, record_metrics
+from src.infrastructure.observability.usage import extract_usage
+from src.infrastructure.cache.memory import LRUCache
+from src.core.scheduler import llm_scheduler
+from src.infrastructure.llm.transport import (
+    create_transport, in_flight_calls, load_recordings, recording_key, RecordedResponse
+)
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
+# Fase 1: compreensão sem ferramentas (sem latência de grounding)
+UNDERSTANDING_CONFIG = {
+    "temperature": 0.1
+}
+
+# Fase 2: busca externa com grounding, executada apenas quando necessária
+GROUNDING_CONFIG = {
+    "tools": [{"google_search": {}}],
+    "temperature": 0.1
+}
+
+def _is_transient_error(exc: BaseException) -> bool:
+    """
+    Indica se o erro do Gemini justifica uma nova tentativa (erros 5xx).
+    
+    O SDK é importado sob demanda para não pesar na inicialização (e pode
+    não estar instalado em modo replay).
+    """
+    try:
+        from google.genai import errors
+    except ImportError:
+        return False
+    return isinstance(exc, errors.ServerError)
+
 class NLUAgent(BaseAgent):
     """
     Agente que utiliza Google Gemini API para compreensão de linguagem natural.
@@ -29,41 +60,125 @@ class NLUAgent(BaseAgent):
     entidades e determinar quais informações adicionais são necessárias.
     """
     
-    def __init__(self, name: str = "nlu_agent"):
+    def __init__(self, name: str = "nlu_agent", model_id: Optional[str] = None,
+                 transport_mode: Optional[str] = None):
         """
         Inicializa o agente NLU.
         
         Args:
             name: Nome opcional para o agente
+            model_id: Modelo do Gemini (padrão: GEMINI_MODEL_ID)
+            transport_mode: Modo do transporte (padrão: GEMINI_TRANSPORT_MODE)
         """
         super().__init__(name)
+        self.model_id = model_id or settings.GEMINI_MODEL_ID
+        self.transport_mode = transport_mode or settings.GEMINI_TRANSPORT_MODE
         self.client = None
         self.model = None
+        self.transport = None
+        self.result_cache = LRUCache(settings.NLU_CACHE_SIZE, settings.NLU_CACHE_TTL_SECONDS)
+        self._prepare_lock = asyncio.Lock()
         
     async def prepare(self) -> None:
         """
-        Inicializa o cliente do Google Gemini.
+        Inicializa o cliente do Google Gemini e o transporte das chamadas.
+        
+        As etapas bloqueantes (importação do SDK, consulta do modelo e leitura
+        das gravações) rodam fora do event loop. Em modo replay nenhum cliente
+        é criado, permitindo execução offline.
         """
-        try:
-            # Configura o cliente do Google Gemini
-            self.client = genai.Client(api_key=settings.GOOGLE_API_KEY)
-            self.model = self.client.models.get(settings.GEMINI_MODEL_ID)
-            logger.info(f"Agente NLU inicializado com modelo {settings.GEMINI_MODEL_ID}")
-        except Exception as e:
-            logger.error(f"Erro ao inicializar agente NLU: {str(e)}")
-            raise
+        async with self._prepare_lock:
+            if self.transport:
+                return
+                
+            try:
+                mode = self.transport_mode
+                
+                if mode != "replay":
+                    await asyncio.to_thread(self._connect)
+                
+                self.transport = await asyncio.to_thread(
+                    create_transport,
+                    mode,
+                    self.model_id,
+                    client=self.client,
+                    path=settings.GEMINI_RECORDINGS_PATH,
+                    honour_latency=settings.GEMINI_REPLAY_HONOUR_LATENCY
+                )
+                
+                if settings.NLU_CACHE_WARMUP and os.path.exists(settings.GEMINI_RECORDINGS_PATH):
+                    warmed = await asyncio.to_thread(self.warm_cache, settings.GEMINI_RECORDINGS_PATH)
+                    logger.info(f"Cache do NLU pré-aquecido com {warmed} resultados")
+                
+                logger.info(f"Agente NLU inicializado com modelo {self.model_id} (transporte: {mode})")
+            except Exception as e:
+                logger.error(f"Erro ao inicializar agente NLU: {str(e)}")
+                raise
+    
+    def _connect(self) -> None:
+        """
+        Cria o cliente do Google Gemini e consulta o modelo configurado.
+        
+        Operação bloqueante (importação do SDK e chamada de rede); deve ser
+        executada em uma thread.
+        """
+        from google import genai
+        
+        # GEMINI_BASE_URL permite apontar para um servidor local (ex: benchmarks)
+        http_options = {"base_url": settings.GEMINI_BASE_URL} if settings.GEMINI_BASE_URL else None
+        self.client = genai.Client(api_key=settings.GOOGLE_API_KEY, http_options=http_options)
+        self.model = self.client.models.get(model=self.model_id)
+    
+    async def cleanup(self) -> None:
+        """
+        Fecha o transporte (e o arquivo de gravações, se houver).
+        """
+        if self.transport:
+            await self.transport.close()
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Inclui o modo de transporte e as estatísticas do cache de resultados.
+        """
+        health = await super().health_check()
+        health["transport"] = self.transport.mode if self.transport else None
+        health["result_cache"] = self.result_cache.stats()
+        return health
+    
+    def warm_cache(self, path: str) -> int:
+        """
+        Pré-aquece o cache de resultados a partir de um arquivo de gravações.
+        
+        Apenas chamadas da fase de compreensão (sem ferramentas) são usadas.
+        
+        Args:
+            path: Arquivo de gravações
+            
+        Returns:
+            int: Número de resultados inseridos no cache
+        """
+        warmed = 0
+        for record in load_recordings(path):
+            if record.get("c") != UNDERSTANDING_CONFIG:
+                continue
+                
+            result = self._parse_response(RecordedResponse(record["r"], record["m"], record.get("u")))
+            if result.get("intent") not in ("error", "unknown"):
+                self.result_cache.set(record["k"], result)
+                warmed += 1
+                
+        return warmed
     
     @traced("nlu_agent.process")
     @timed("agent_processing", agent="nlu")
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((genai.errors.ServiceUnavailable, genai.errors.DeadlineExceeded))
-    )
     async def process(self, text: str, context: Dict[str, Any] = None) -> AgentResponse:
         """
         Processa o texto do usuário para identificar a intenção e entidades.
         
+        Esta é a fase 1 do NLU: a chamada ao modelo não usa ferramentas. Quando
+        o resultado indica `requires_external_info`, o chamador deve disparar
+        a fase 2 com `ground()`, em paralelo com as demais etapas do pipeline.
+        
         Args:
             text: Texto do usuário para processar
             context: Contexto adicional para melhorar a compreensão
@@ -71,22 +186,37 @@ class NLUAgent(BaseAgent):
         Returns:
             AgentResponse: Resposta contendo as intenções e entidades identificadas
         """
-        if not self.client:
+        if not self.transport:
             await self.prepare()
             
         try:
             # Prepara o prompt para o Gemini
             prompt = self._prepare_prompt(text, context)
             
-            # Gera conteúdo com o Gemini
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                contents=prompt,
-                config={
-                    "tools": [{"google_search": {}}],
-                    "temperature": 0.1
-                }
-            )
+            # Resultados idênticos para o mesmo prompt dispensam a chamada ao modelo
+            cache_key = recording_key(self.model_id, prompt, UNDERSTANDING_CONFIG)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                record_metrics("nlu_cache", "hit", {"agent": "nlu"})
+                return AgentResponse(
+                    agent_id=self.agent_id,
+                    content=dict(cached),
+                    confidence=self._calculate_confidence(cached),
+                    metadata={
+                        "original_text": text,
+                        "has_context": context is not None,
+                        "cached": True
+                    }
+                )
+            record_metrics("nlu_cache", "miss", {"agent": "nlu"})
+            
+            # Gera conteúdo com o Gemini (fase 1, sem ferramentas)
+            phase_labels = {"phase": "understanding"}
+            start_time = record_metrics("nlu_phase", "start", phase_labels)
+            response = await self._generate(prompt, UNDERSTANDING_CONFIG, "understanding")
+            record_metrics("nlu_phase", "end", phase_labels, start_time)
+            understanding_latency = time.time() - start_time
+            usage = extract_usage(response, self.model_id)
             
             # Processa a resposta
             result = self._parse_response(response)
@@ -94,13 +224,20 @@ class NLUAgent(BaseAgent):
             # Calcula nível de confiança
             confidence = self._calculate_confidence(result)
             
+            if result.get("intent") not in ("error", "unknown"):
+                self.result_cache.set(cache_key, dict(result))
+            
             return AgentResponse(
                 agent_id=self.agent_id,
                 content=result,
                 confidence=confidence,
                 metadata={
                     "original_text": text,
-                    "has_context": context is not None
+                    "has_context": context is not None,
+                    "phase_latencies": {
+                        "understanding": understanding_latency
+                    },
+                    "usage": usage
                 }
             )
             
@@ -125,10 +262,131 @@ class NLUAgent(BaseAgent):
                 }
             )
     
+    async def generate_text(self, prompt: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Gera texto livre com o modelo, reutilizando o transporte deste agente.
+        
+        Usado por outros agentes (ex: NLG) que não mantêm conexão própria.
+        
+        Args:
+            prompt: Prompt a ser enviado
+            config: Configuração de geração
+            
+        Returns:
+            Dict[str, Any]: Texto gerado, latência e uso de tokens
+        """
+        if not self.transport:
+            await self.prepare()
+            
+        start_time = time.time()
+        response = await self._generate(prompt, config, "generation")
+        
+        return {
+            "text": response.text,
+            "latency": time.time() - start_time,
+            "usage": extract_usage(response, self.model_id)
+        }
+    
+    @traced("nlu_agent.ground")
+    async def ground(self, text: str, search_query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Executa a fase 2 do NLU: uma chamada com grounding no Google Search.
+        
+        Deve ser chamada apenas quando a fase 1 retornar `requires_external_info`.
+        Falhas não são propagadas, pois a busca externa é complementar.
+        
+        Args:
+            text: Texto original do usuário
+            search_query: Consulta sugerida pela fase 1, se houver
+            
+        Returns:
+            Dict[str, Any]: Resumo das informações externas, latência e uso de tokens
+        """
+        if not self.transport:
+            await self.prepare()
+            
+        query = search_query or text
+        phase_labels = {"phase": "grounding"}
+        start_time = record_metrics("nlu_phase", "start", phase_labels)
+        
+        try:
+            prompt = self._prepare_grounding_prompt(text, query)
+            response = await self._generate(prompt, GROUNDING_CONFIG, "grounding")
+            record_metrics("nlu_phase", "end", phase_labels, start_time)
+            
+            return {
+                "search_query": query,
+                "summary": response.text,
+                "latency": time.time() - start_time,
+                "usage": extract_usage(response, self.model_id)
+            }
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar informações externas: {str(e)}")
+            record_metrics("nlu_phase", "error", phase_labels)
+            
+            return {
+                "search_query": query,
+                "summary": None,
+                "latency": time.time() - start_time,
+                "error": str(e)
+            }
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception(_is_transient_error),
+        reraise=True
+    )
+    async def _generate(self, prompt: str, config: Dict[str, Any], kind: str):
+        """
+        Envia o prompt ao modelo por meio do transporte configurado.
+        
+        A chamada aguarda uma vaga no escalonador central, com a prioridade e
+        o usuário definidos pelo chamador via `llm_call_context`. A latência e
+        os erros da chamada alimentam o limite adaptativo de concorrência,
+        comparados com os de chamadas do mesmo tipo. Erros transitórios (5xx)
+        são repetidos com backoff, fora da vaga, em todas as fases.
+        
+        Args:
+            prompt: Prompt a ser enviado
+            config: Configuração de geração (ferramentas, temperatura)
+            kind: Tipo da chamada (understanding, grounding ou generation)
+            
+        Returns:
+            Resposta do Gemini API (ou gravação equivalente em modo replay)
+            
+        Raises:
+            LLMRejectedError: Se não houver vaga dentro do tempo máximo de espera
+        """
+        async with llm_scheduler.slot(kind=kind):
+            async with in_flight_calls.track():
+                return await self.transport.generate(prompt, config)
+    
+    def _prepare_grounding_prompt(self, text: str, search_query: str) -> str:
+        """
+        Prepara o prompt da fase de busca externa.
+        
+        Args:
+            text: Texto original do usuário
+            search_query: Consulta a ser pesquisada
+            
+        Returns:
+            str: Prompt formatado para o modelo
+        """
+        return (
+            "Pesquise na web e resuma, em até três frases em português, as informações "
+            "relevantes para ajudar o usuário com a sua tarefa.\n"
+            f"CONSULTA: {search_query}\n"
+            f"TEXTO DO USUÁRIO: {text}"
+        )
+    
     def _prepare_prompt(self, text: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Prepara o prompt para enviar ao modelo, incluindo contexto se disponível.
         
+        Usa o prefixo pré-montado do contexto (`prompt_prefix`) quando houver.
+        
         Args:
             text: Texto do usuário
             context: Contexto adicional
@@ -136,11 +394,28 @@ class NLUAgent(BaseAgent):
         Returns:
             str: Prompt formatado para o modelo
         """
+        prefix = context.get("prompt_prefix") if context else None
+        if prefix is None:
+            prefix = self.prompt_prefix(context)
+        return f"{prefix}TEXTO DO USUÁRIO: {text}"
+        
+    def prompt_prefix(self, context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Monta a parte do prompt que não depende da mensagem: instruções e contexto.
+        
+        Pode ser pré-montada quando o chat da tarefa é aberto.
+        
+        Args:
+            context: Contexto da conversa (tarefa ativa, histórico recente)
+            
+        Returns:
+            str: Prefixo do prompt
+        """
         system_prompt = """
         Você é um analisador de linguagem natural especializado em chatbots de tarefas e produtividade.
         
         Analise o texto do usuário e retorne:
-        1. Intenção principal (uma única string, ex: 'buscar_tarefa', 'criar_lembrete', 'obter_ajuda')
+        1. Intenção principal (uma única string, ex: 'buscar_tarefa', 'criar_lembrete', 'editar_tarefa', 'definir_prazo', 'obter_ajuda')
         2. Entidades mencionadas (lista de objetos com nome e valor)
         3. Quais informações você precisa consultar (histórico do usuário, detalhes de tarefa, busca externa)
         
@@ -179,8 +454,7 @@ class NLUAgent(BaseAgent):
                     
             context_text += "=== FIM DO CONTEXTO ===\n"
         
-        # Monta o prompt final
-        return f"{system_prompt}\n{context_text}\nTEXTO DO USUÁRIO: {text}"
+        return f"{system_prompt}\n{context_text}\n"
         
     def _parse_response(self, response) -> Dict[str, Any]:
         """
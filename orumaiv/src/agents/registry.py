@@ -0,0 +1,289 @@
+"""
+Registro de agentes especialistas.
+
+Cria sob demanda uma instância de agente por chave (ex: uma por tarefa),
+a partir de fábricas registradas por tipo. Chaves compostas (ex: usuário e
+tarefa) são tuplas, passadas inteiras à fábrica; a primeira parte agrupa os
+agentes, cujos estados podem ser listados com `states`. O número de agentes residentes
+é limitado: ao exceder o limite, o menos usado recentemente é hibernado
+(o seu `snapshot()` é gravado no armazenamento de estados) e removido da
+memória; ao voltar a ser usado, é recriado e restaurado.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from src.agents.base_agent import BaseAgent
+from src.infrastructure.observability.metrics import record_metrics
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Chave de um agente: texto ou tupla de textos (ex: (user_id, task_id))
+AgentKey = Union[str, Tuple[str, ...]]
+
+# Cria o agente de uma chave: (chave) -> agente
+AgentFactory = Callable[[AgentKey], BaseAgent]
+
+def _store_key(kind: str, key: AgentKey) -> str:
+    """
+    Chave do estado hibernado de um agente.
+    
+    As partes são escapadas, então IDs com ":" não colidem entre si.
+    """
+    parts = key if isinstance(key, tuple) else (key,)
+    return ":".join([kind, *(quote(part, safe="") for part in parts)])
+
+def _group_key(kind: str, key: AgentKey) -> Optional[str]:
+    """
+    Grupo do estado hibernado de um agente com chave composta.
+    """
+    if isinstance(key, tuple) and len(key) > 1:
+        return _store_key(kind, key[0])
+    return None
+
+def _deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Estima o tamanho em bytes de um objeto e dos objetos que ele referencia.
+    """
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_sizeof(vars(obj), seen)
+    return size
+
+class AgentRegistry:
+    """
+    Registro de agentes com remoção LRU e hibernação.
+    """
+    
+    def __init__(self, max_resident: int, store=None):
+        """
+        Inicializa o registro.
+        
+        Args:
+            max_resident: Número máximo de agentes em memória
+            store: Armazenamento de estados hibernados (sem ele, o estado
+                dos agentes removidos é descartado)
+        """
+        self.max_resident = max_resident
+        self.store = store
+        self._factories: Dict[str, AgentFactory] = {}
+        self._agents: "OrderedDict[Tuple[str, AgentKey], BaseAgent]" = OrderedDict()
+        self._creating: Dict[Tuple[str, AgentKey], asyncio.Future] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "restored": 0,
+            "hibernated": 0,
+            "creation_seconds_total": 0.0,
+            "creation_seconds_max": 0.0
+        }
+        
+    def register(self, kind: str, factory: AgentFactory) -> None:
+        """
+        Registra a fábrica de agentes de um tipo.
+        
+        Args:
+            kind: Tipo de agente (ex: "task")
+            factory: Função que cria o agente de uma chave
+        """
+        self._factories[kind] = factory
+        
+    async def get(self, kind: str, key: AgentKey) -> BaseAgent:
+        """
+        Obtém o agente de uma chave, criando-o ou restaurando-o se necessário.
+        
+        Chamadas simultâneas para a mesma chave compartilham a criação.
+        
+        Args:
+            kind: Tipo de agente
+            key: Chave do agente (ex: (user_id, task_id))
+            
+        Returns:
+            BaseAgent: Agente pronto para uso
+            
+        Raises:
+            KeyError: Se não houver fábrica registrada para o tipo
+        """
+        agent_key = (kind, key)
+        agent = self._agents.get(agent_key)
+        if agent is not None:
+            self._agents.move_to_end(agent_key)
+            self._stats["hits"] += 1
+            record_metrics("agent_registry", "hit", {"kind": kind})
+            return agent
+            
+        pending = self._creating.get(agent_key)
+        if pending is not None:
+            self._stats["hits"] += 1
+            return await asyncio.shield(pending)
+            
+        if kind not in self._factories:
+            raise KeyError(f"Nenhuma fábrica registrada para agentes do tipo {kind}")
+            
+        self._stats["misses"] += 1
+        record_metrics("agent_registry", "miss", {"kind": kind})
+        
+        pending = asyncio.get_running_loop().create_future()
+        self._creating[agent_key] = pending
+        try:
+            agent = await self._create(kind, key)
+            self._agents[agent_key] = agent
+            pending.set_result(agent)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Evita o aviso de exceção não consultada quando ninguém aguardava
+            pending.exception()
+            raise
+        finally:
+            del self._creating[agent_key]
+            
+        await self._evict_overflow()
+        return agent
+        
+    async def hibernate(self, kind: str, key: AgentKey) -> bool:
+        """
+        Hiberna um agente residente.
+        
+        Returns:
+            bool: False se o agente não estava em memória
+        """
+        agent = self._agents.pop((kind, key), None)
+        if agent is None:
+            return False
+        await self._hibernate(kind, key, agent)
+        return True
+        
+    async def discard(self, kind: str, key: AgentKey) -> None:
+        """
+        Remove um agente e o seu estado hibernado (ex: a tarefa foi excluída).
+        """
+        agent = self._agents.pop((kind, key), None)
+        if agent is not None:
+            await agent.cleanup()
+        if self.store:
+            await self.store.delete(_store_key(kind, key), _group_key(kind, key))
+            
+    async def states(self, kind: str, group: str) -> List[Dict[str, Any]]:
+        """
+        Estados de todos os agentes de um grupo, residentes ou hibernados.
+        
+        Args:
+            kind: Tipo de agente
+            group: Primeira parte das chaves compostas (ex: o user_id)
+            
+        Returns:
+            List[Dict[str, Any]]: `snapshot()` dos residentes e estados
+                gravados dos demais
+        """
+        states = {}
+        for (agent_kind, key), agent in self._agents.items():
+            if agent_kind == kind and isinstance(key, tuple) and key[0] == group:
+                states[_store_key(kind, key)] = agent.snapshot()
+                
+        if self.store:
+            for store_key, state in (await self.store.load_group(_store_key(kind, group))).items():
+                states.setdefault(store_key, state)
+        return list(states.values())
+        
+    async def close(self) -> None:
+        """
+        Hiberna todos os agentes residentes (ex: no desligamento).
+        """
+        while self._agents:
+            (kind, key), agent = self._agents.popitem(last=False)
+            await self._hibernate(kind, key, agent)
+            
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas do registro.
+        
+        Returns:
+            Dict[str, Any]: Agentes residentes, taxa de acerto, custo de
+            criação e memória residente estimada
+        """
+        stats = self._stats
+        lookups = stats["hits"] + stats["misses"]
+        built = stats["created"] + stats["restored"]
+        resident_bytes = sum(_deep_sizeof(agent) for agent in self._agents.values())
+        
+        by_kind: Dict[str, int] = {}
+        for kind, _ in self._agents:
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+            
+        return {
+            "resident": len(self._agents),
+            "max_resident": self.max_resident,
+            "resident_by_kind": by_kind,
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "created": stats["created"],
+            "restored": stats["restored"],
+            "hibernated": stats["hibernated"],
+            "creation_seconds_avg": stats["creation_seconds_total"] / built if built else 0.0,
+            "creation_seconds_max": stats["creation_seconds_max"],
+            "resident_bytes": resident_bytes,
+            "resident_bytes_per_agent": resident_bytes / len(self._agents) if self._agents else 0
+        }
+        
+    async def _create(self, kind: str, key: AgentKey) -> BaseAgent:
+        """
+        Cria, prepara e (se houver estado hibernado) restaura um agente.
+        """
+        start_time = time.perf_counter()
+        
+        agent = self._factories[kind](key)
+        await agent.prepare()
+        
+        state = await self.store.load(_store_key(kind, key)) if self.store else None
+        if state is not None:
+            agent.restore(state)
+            self._stats["restored"] += 1
+        else:
+            self._stats["created"] += 1
+            
+        elapsed = time.perf_counter() - start_time
+        self._stats["creation_seconds_total"] += elapsed
+        self._stats["creation_seconds_max"] = max(self._stats["creation_seconds_max"], elapsed)
+        return agent
+        
+    async def _evict_overflow(self) -> None:
+        """
+        Hiberna os agentes menos usados até respeitar o limite de residentes.
+        """
+        while len(self._agents) > self.max_resident:
+            (kind, key), agent = self._agents.popitem(last=False)
+            await self._hibernate(kind, key, agent)
+            
+    async def _hibernate(self, kind: str, key: AgentKey, agent: BaseAgent) -> None:
+        """
+        Grava o estado do agente e libera os seus recursos.
+        """
+        try:
+            if self.store:
+                await self.store.save(_store_key(kind, key), agent.snapshot(), _group_key(kind, key))
+            self._stats["hibernated"] += 1
+            record_metrics("agent_registry", "hibernated", {"kind": kind})
+        except Exception as e:
+            logger.error(f"Falha ao hibernar agente {_store_key(kind, key)}: {str(e)}")
+        finally:
+            await agent.cleanup()
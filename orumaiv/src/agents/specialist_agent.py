@@ -0,0 +1,91 @@
+"""
+Agente especialista de uma tarefa.
+
+Cada tarefa com chat aberto tem o seu especialista, criado sob demanda pelo
+registro de agentes. O especialista acumula o que a conversa revela sobre
+a tarefa (título, data de vencimento, status) e fornece esses detalhes como
+contexto às mensagens seguintes, inclusive entre sessões.
+"""
+
+import logging
+from typing import Dict, Any
+
+from src.agents.base_agent import BaseAgent, AgentResponse
+from src.agents.nlg_agent import extract_slots
+from src.infrastructure.observability.tracing import traced
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Slot do NLU -> campo da tarefa usado no contexto dos prompts
+TASK_FIELDS = {
+    "titulo": "title",
+    "data": "due_date"
+}
+
+# Intenções que alteram a tarefa ativa; entidades de outras intenções (ex:
+# buscar_tarefa, criar_tarefa) se referem a outras tarefas e são ignoradas
+TASK_EDIT_INTENTS = frozenset({"editar_tarefa", "definir_prazo"})
+
+class SpecialistAgent(BaseAgent):
+    """
+    Agente que mantém o conhecimento acumulado sobre uma tarefa.
+    """
+    
+    def __init__(self, task_id: str, name: str = None):
+        """
+        Inicializa o especialista.
+        
+        Args:
+            task_id: ID da tarefa
+            name: Nome opcional para o agente
+        """
+        super().__init__(name or f"specialist-{task_id}")
+        self.task: Dict[str, Any] = {"id": task_id}
+        self.turns = 0
+        self.intents: Dict[str, int] = {}
+        
+    @traced("specialist_agent.process")
+    async def process(self, nlu_result: Dict[str, Any]) -> AgentResponse:
+        """
+        Incorpora aos detalhes da tarefa o resultado do NLU de uma mensagem.
+        
+        Args:
+            nlu_result: Resultado do NLU (intenção e entidades)
+            
+        Returns:
+            AgentResponse: Detalhes atualizados da tarefa
+        """
+        intent = nlu_result.get("intent", "unknown")
+        self.turns += 1
+        self.intents[intent] = self.intents.get(intent, 0) + 1
+        
+        if intent in TASK_EDIT_INTENTS:
+            for slot, value in extract_slots(nlu_result.get("entities") or []).items():
+                field = TASK_FIELDS.get(slot)
+                if field:
+                    self.task[field] = value
+                    
+        if intent == "concluir_tarefa":
+            self.task["status"] = "concluída"
+            
+        return AgentResponse(
+            agent_id=self.agent_id,
+            content=self.task,
+            metadata={"turns": self.turns}
+        )
+        
+    def snapshot(self) -> Dict[str, Any]:
+        state = super().snapshot()
+        state.update({
+            "task": self.task,
+            "turns": self.turns,
+            "intents": self.intents
+        })
+        return state
+        
+    def restore(self, state: Dict[str, Any]) -> None:
+        super().restore(state)
+        self.task = dict(state.get("task", self.task))
+        self.turns = state.get("turns", 0)
+        self.intents = dict(state.get("intents", {}))
@@ -5,7 +5,11 @@ Este módulo define a aplicação FastAPI, configura rotas, middleware e manipul
 de eventos.
 """
 
+import asyncio
 import logging
+import time
+from typing import Dict, Any, List
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -13,38 +17,153 @@ from contextlib import asynccontextmanager
 
 from src.config.settings import settings
 from src.infrastructure.observability.logging import setup_logging, get_logger
-from src.api.routes import health, chat
+from src.api.routes import admin, health, chat, chat_ws, dashboard
+from src.api.state import app_state
+from src.api.openapi import install_openapi
+from src.agents.base_agent import BaseAgent
 from src.agents.nlu_agent import NLUAgent
+from src.agents.nlg_agent import NLGAgent
+from src.agents.registry import AgentRegistry
+from src.agents.specialist_agent import SpecialistAgent
+from src.infrastructure.cache.hibernation import get_hibernation_store
+from src.infrastructure.cache.shared import get_shared_store
+from src.infrastructure.llm.transport import in_flight_calls
+from src.core.prefetch import context_prefetcher
+from src.domain.services.task_search import task_search_index
+from src.domain.services.dashboard import dashboard_engine
+from src.core.shadow import shadow_evaluator
+from src.core.affinity import AffinityMiddleware, cluster_ring
+from src.infrastructure.observability.loop_monitor import loop_monitor
 
 # Configuração de logging
 logger = get_logger(__name__)
 
-# Variáveis globais para armazenar instâncias de agentes
-app_state = {
-    "nlu_agent": None
-}
+async def prepare_agents(agents: Dict[str, BaseAgent]) -> None:
+    """
+    Prepara os agentes em paralelo e atualiza o estado de prontidão.
+    
+    Falhas de um agente não interrompem os demais; ficam registradas em
+    `app_state["startup"]` e mantêm a aplicação como não pronta.
+    
+    Args:
+        agents: Agentes indexados pelo nome
+    """
+    startup = app_state["startup"]
+    
+    async def prepare_one(name: str, agent: BaseAgent) -> bool:
+        start_time = time.perf_counter()
+        try:
+            await agent.prepare()
+            startup["agents"][name] = {"ready": True, "seconds": time.perf_counter() - start_time}
+            return True
+        except Exception as e:
+            logger.error(f"Falha ao preparar agente {name}: {str(e)}", exc_info=True)
+            startup["agents"][name] = {"ready": False, "seconds": time.perf_counter() - start_time, "error": str(e)}
+            return False
+    
+    results = await asyncio.gather(*(prepare_one(name, agent) for name, agent in agents.items()))
+    
+    startup["finished_at"] = time.time()
+    app_state["ready"] = all(results)
+    
+    if app_state["ready"]:
+        logger.info(f"Agentes prontos em {startup['finished_at'] - startup['started_at']:.3f}s")
+
+async def warm_openapi() -> None:
+    """
+    Gera o documento OpenAPI fora do event loop, antes da primeira requisição.
+    
+    Uma falha não impede a aplicação de ficar pronta: o documento passa a
+    ser gerado na primeira requisição.
+    """
+    try:
+        size = await asyncio.to_thread(openapi_cache.warm)
+        logger.info(f"Documento OpenAPI pré-serializado ({size} bytes)")
+    except Exception as e:
+        logger.error(f"Falha ao pré-serializar o documento OpenAPI: {str(e)}", exc_info=True)
+
+async def load_task(user_id: str, task_id: str) -> Dict[str, Any]:
+    """
+    Carrega os detalhes de uma tarefa a partir do seu agente especialista.
+    
+    Usado pelo pré-carregamento de contexto ao abrir o chat da tarefa.
+    """
+    specialist = await app_state["agent_registry"].get("task", (user_id, task_id))
+    return specialist.task
+
+async def load_user_tasks(user_id: str) -> List[Dict[str, Any]]:
+    """
+    Carrega todas as tarefas conhecidas de um usuário, dos seus agentes
+    especialistas residentes e hibernados.
+    
+    Usado para reconstruir o índice de busca e os dashboards de usuários
+    que não estão em memória.
+    """
+    states = await app_state["agent_registry"].states("task", user_id)
+    return [state["task"] for state in states if "task" in state]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Gerencia o ciclo de vida da aplicação.
     
-    Inicializa recursos necessários na inicialização e
-    limpa recursos na finalização.
+    A preparação dos agentes roda em segundo plano: o servidor começa a
+    aceitar conexões imediatamente (liveness) e só fica pronto (readiness)
+    quando todos os agentes terminam de inicializar.
     """
+    validation_error = settings.validate()
+    if validation_error:
+        logger.error(f"ERRO DE CONFIGURAÇÃO: {validation_error}")
+    
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    
     # Inicializa agentes
     logger.info("Inicializando agentes...")
     
     app_state["nlu_agent"] = NLUAgent()
-    await app_state["nlu_agent"].prepare()
+    # Intenções abertas são escaladas ao Gemini pelo transporte do agente NLU
+    app_state["nlg_agent"] = NLGAgent(llm=app_state["nlu_agent"])
+    
+    # Um especialista por tarefa (chave: (user_id, task_id)), hibernado quando sai da memória
+    registry = AgentRegistry(settings.AGENT_REGISTRY_MAX_RESIDENT, get_hibernation_store())
+    registry.register("task", lambda key: SpecialistAgent(key[1]))
+    app_state["agent_registry"] = registry
+    context_prefetcher.task_loader = load_task
+    task_search_index.tasks_loader = load_user_tasks
+    dashboard_engine.tasks_loader = load_user_tasks
+    # Sessões remanejadas entre workers/nós continuam do estado compartilhado;
+    # em memória, o próprio cache de sessões já cumpre esse papel
+    if settings.SHARED_STATE_BACKEND == "redis":
+        context_prefetcher.shared_store = get_shared_store()
     
-    logger.info("Aplicação inicializada com sucesso")
+    app_state["startup"]["started_at"] = time.time()
+    startup_task = asyncio.create_task(prepare_agents({
+        "nlu": app_state["nlu_agent"],
+        "nlg": app_state["nlg_agent"]
+    }))
+    
+    openapi_task = asyncio.create_task(warm_openapi())
+    
+    logger.info("Aplicação inicializada; agentes em preparação")
     
     yield
     
     # Limpa recursos
     logger.info("Finalizando aplicação...")
     
+    for task in (startup_task, openapi_task):
+        if not task.done():
+            task.cancel()
+    await context_prefetcher.close()
+    await shadow_evaluator.close()
+    
+    # Drena chamadas ao Gemini em andamento (ex: buscas externas em segundo plano)
+    await in_flight_calls.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    
+    await app_state["agent_registry"].close()
+    await loop_monitor.stop()
+    
     if app_state["nlu_agent"]:
         await app_state["nlu_agent"].cleanup()
         
@@ -54,7 +173,11 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Servidos pré-serializados por install_openapi
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None
 )
 
 # Configuração de CORS
@@ -66,12 +189,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cabeçalhos de afinidade de sessão (nó que atendeu e dono da chave)
+app.add_middleware(AffinityMiddleware, ring=cluster_ring, node_id=settings.NODE_ID)
+
 # Configuração de logging
 setup_logging(app)
 
 # Registro de rotas
 app.include_router(health.router)
+app.include_router(admin.router)
 app.include_router(chat.router, prefix=f"{settings.API_PREFIX}/v{settings.API_VERSION}")
+app.include_router(chat_ws.router, prefix=f"{settings.API_PREFIX}/v{settings.API_VERSION}")
+app.include_router(dashboard.router, prefix=f"{settings.API_PREFIX}/v{settings.API_VERSION}")
+
+# Documento OpenAPI (/openapi.json) e documentação interativa (/docs, /redoc)
+openapi_cache = install_openapi(app)
 
 # Manipulador global de exceções
 @app.exception_handler(Exception)
@@ -96,12 +228,31 @@ def get_nlu_agent() -> NLUAgent:
     Raises:
         HTTPException: Se o agente não estiver inicializado
     """
-    if app_state["nlu_agent"] is None:
+    if app_state["nlu_agent"] is None or not app_state["ready"]:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Serviço NLU não disponível"
         )
     return app_state["nlu_agent"]
 
-# Exporta a função get_nlu_agent como dependência para uso nos controladores
-app.dependency_overrides[NLUAgent] = get_nlu_agent 
\ No newline at end of file
+# Obtenção de instância do agente NLG
+def get_nlg_agent() -> NLGAgent:
+    """
+    Obtém a instância do agente NLG.
+    
+    Returns:
+        NLGAgent: Instância do agente NLG
+    
+    Raises:
+        HTTPException: Se o agente não estiver inicializado
+    """
+    if app_state["nlg_agent"] is None or not app_state["ready"]:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço NLG não disponível"
+        )
+    return app_state["nlg_agent"]
+
+# Exporta as funções de obtenção de agentes como dependências para uso nos controladores
+app.dependency_overrides[NLUAgent] = get_nlu_agent
+app.dependency_overrides[NLGAgent] = get_nlg_agent 
\ No newline at end of file
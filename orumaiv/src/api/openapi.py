@@ -0,0 +1,93 @@
+"""
+Documento OpenAPI gerado uma única vez e servido pré-serializado.
+
+O FastAPI guarda o esquema gerado, mas o serializa de novo a cada
+requisição de /openapi.json (e o gera no caminho da primeira requisição).
+Aqui o documento é gerado fora do event loop no início da aplicação e
+servido como bytes prontos; /docs e /redoc apontam para ele.
+"""
+
+import threading
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.responses import HTMLResponse, Response
+
+from src.api.responses import dumps
+
+class OpenAPICache:
+    """
+    Documento OpenAPI de uma aplicação, serializado sob demanda uma vez.
+    """
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self._body: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def body(self) -> bytes:
+        """
+        Retorna o documento serializado, gerando-o na primeira chamada.
+
+        A geração é bloqueante; no início da aplicação deve rodar em uma
+        thread (ver `warm`).
+        """
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = dumps(self.app.openapi())
+        return self._body
+
+    def warm(self) -> int:
+        """
+        Gera o documento antecipadamente.
+
+        Returns:
+            int: Tamanho do documento em bytes
+        """
+        return len(self.body())
+
+def install_openapi(app: FastAPI, openapi_url: str = "/openapi.json", docs_url: str = "/docs",
+                    redoc_url: str = "/redoc") -> OpenAPICache:
+    """
+    Registra as rotas do documento OpenAPI e da documentação interativa.
+
+    A aplicação deve ser criada com `openapi_url=None`, `docs_url=None` e
+    `redoc_url=None`, para que o FastAPI não registre as suas.
+
+    Args:
+        app: Aplicação FastAPI
+        openapi_url: Rota do documento OpenAPI
+        docs_url: Rota do Swagger UI
+        redoc_url: Rota do ReDoc
+
+    Returns:
+        OpenAPICache: Cache do documento
+    """
+    cache = OpenAPICache(app)
+    oauth2_redirect_url = f"{docs_url}/oauth2-redirect"
+
+    @app.get(openapi_url, include_in_schema=False)
+    async def openapi() -> Response:
+        return Response(cache.body(), media_type="application/json")
+
+    @app.get(docs_url, include_in_schema=False)
+    async def swagger_ui(request: Request) -> HTMLResponse:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        return get_swagger_ui_html(
+            openapi_url=root_path + openapi_url,
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url=root_path + oauth2_redirect_url
+        )
+
+    @app.get(oauth2_redirect_url, include_in_schema=False)
+    async def swagger_ui_redirect() -> HTMLResponse:
+        return get_swagger_ui_oauth2_redirect_html()
+
+    @app.get(redoc_url, include_in_schema=False)
+    async def redoc(request: Request) -> HTMLResponse:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        return get_redoc_html(openapi_url=root_path + openapi_url, title=f"{app.title} - ReDoc")
+
+    return cache
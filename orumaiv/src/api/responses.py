@@ -0,0 +1,83 @@
+"""
+Serialização rápida das respostas da API.
+
+Rotas que já montam um modelo pydantic validado (ex: `MessageResponse`)
+retornam `FastJSONResponse`: o FastAPI não valida nem serializa a resposta
+de novo pelo `response_model`, e o corpo é gerado direto em bytes.
+
+- modelos pydantic simples (sem aliases, serializadores customizados,
+  campos computados ou extras) têm os campos serializados diretamente pelo
+  orjson, se instalado; os demais, pelo pydantic-core (`to_json`). Em
+  ambos os casos sem revalidação nem passagem por `jsonable_encoder`
+- demais valores (dicts, listas) usam o orjson ou, sem ele, o módulo json
+  da biblioteca padrão
+"""
+
+import json
+from typing import Any, Dict
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Classe do modelo -> se os seus campos podem ser serializados diretamente
+_plain_models: Dict[type, bool] = {}
+
+def _is_plain(model_class: type) -> bool:
+    """
+    Indica se `model.__dict__` serializado em JSON equivale ao `model_dump_json()`.
+    """
+    plain = _plain_models.get(model_class)
+    if plain is None:
+        decorators = model_class.__pydantic_decorators__
+        plain = _plain_models[model_class] = (
+            not decorators.field_serializers
+            and not decorators.model_serializers
+            and not model_class.model_computed_fields
+            and model_class.model_config.get("extra") != "allow"
+            and all(
+                field.alias in (None, name) and field.serialization_alias in (None, name)
+                for name, field in model_class.model_fields.items()
+            )
+        )
+    return plain
+
+def _default(value: Any) -> Any:
+    """
+    Converte valores que o encoder JSON não conhece (modelos aninhados, datas).
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializa um valor em JSON (UTF-8, sem espaços).
+
+    Args:
+        content: Modelo pydantic ou valor serializável em JSON
+
+    Returns:
+        bytes: Documento JSON
+    """
+    if isinstance(content, BaseModel):
+        if orjson is not None and _is_plain(type(content)):
+            return orjson.dumps(content.__dict__, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return content.__pydantic_serializer__.to_json(content)
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    Resposta JSON serializada com `dumps`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,86 @@
+"""
+Controlador para endpoints administrativos.
+
+Protegidos pelo header `X-Admin-Token`; desativados se ADMIN_TOKEN não
+estiver configurado.
+"""
+
+import hmac
+from typing import Dict, Any, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.config.settings import settings
+from src.infrastructure.observability.profiler import stack_sampler, ProfilerBusyError
+from src.infrastructure.observability.usage import get_usage_summary
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Valida o token administrativo.
+    
+    Raises:
+        HTTPException: 404 se os endpoints estiverem desativados, 403 se o token for inválido
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token administrativo inválido")
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+@router.post("/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=60, description="Duração da amostragem"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Intervalo entre amostras"),
+    fraction: Optional[float] = Query(None, gt=0, le=1, description="Fração das requisições amostradas"),
+    correlation_id: Optional[str] = Query(None, description="Amostra apenas esta requisição"),
+    include_idle: bool = Query(False, description="Inclui threads ociosas"),
+    by_request: bool = Query(False, description="Usa o ID de correlação como frame raiz"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$", description="collapsed ou json")
+):
+    """
+    Executa o profiler por amostragem e retorna as pilhas agregadas.
+    
+    O formato `collapsed` pode ser passado diretamente ao flamegraph.pl,
+    speedscope ou inferno. O worker que atende a requisição é o amostrado.
+    
+    Returns:
+        Pilhas colapsadas (texto) ou resumo em JSON
+    """
+    try:
+        session = await stack_sampler.profile(
+            seconds,
+            interval=interval_ms / 1000,
+            fraction=fraction,
+            correlation_id=correlation_id,
+            include_idle=include_idle
+        )
+    except ProfilerBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Já existe uma sessão de profiling em andamento"
+        )
+        
+    if format == "json":
+        return session.to_dict()
+    return PlainTextResponse(session.collapsed(by_request=by_request))
+
+@router.get("/usage")
+async def usage(days: int = Query(7, ge=1, le=90)) -> Dict[str, Any]:
+    """
+    Retorna o uso de tokens e o custo estimado do Gemini em rollups diários.
+    
+    Fica sob o token administrativo porque detalha o gasto por usuário.
+    
+    Args:
+        days: Número de dias a retornar
+        
+    Returns:
+        Dict[str, Any]: Uso agregado por usuário, intenção e modelo
+    """
+    return get_usage_summary(days)
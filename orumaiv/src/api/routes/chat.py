@@ -2,16 +2,29 @@
 Controlador para endpoints de chat.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field
+import asyncio
 import logging
-import uuid
+import secrets
 from datetime import datetime
 
 from src.agents.nlu_agent import NLUAgent
+from src.agents.nlg_agent import NLGAgent, extract_slots
 from src.infrastructure.observability.tracing import traced
 from src.infrastructure.observability.metrics import record_metrics
+from src.infrastructure.observability.usage import record_usage
+from src.core.scheduler import llm_call_context
+from src.core.prefetch import context_prefetcher
+from src.core.shadow import shadow_evaluator
+from src.domain.services.task_search import task_search_index
+from src.domain.services.dashboard import dashboard_engine
+from src.api.state import app_state
+from src.api.responses import FastJSONResponse
+from src.infrastructure.cache.idempotency import (
+    get_idempotency_store, request_fingerprint, IdempotencyConflictError, IdempotencyKeyReusedError
+)
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -30,16 +43,21 @@ class MessageRequest(BaseModel):
     content: str = Field(..., description="Conteúdo da mensagem")
     task_id: Optional[str] = Field(None, description="ID da tarefa ativa (se houver)")
     session_id: Optional[str] = Field(None, description="ID da sessão de chat")
+    client_message_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description="ID da mensagem gerado pelo cliente; repetições com o mesmo ID retornam a mesma resposta"
+    )
     
-    class Config:
-        schema_extra = {
-            "example": {
-                "user_id": "user123",
-                "content": "Quero criar uma nova tarefa para amanhã",
-                "task_id": None,
-                "session_id": "session456"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "user_id": "user123",
+            "content": "Quero criar uma nova tarefa para amanhã",
+            "task_id": None,
+            "session_id": "session456",
+            "client_message_id": "c-4f1a9e"
         }
+    })
         
 class MessageResponse(BaseModel):
     """Modelo para resposta a mensagens do usuário."""
@@ -49,36 +67,280 @@ class MessageResponse(BaseModel):
     timestamp: datetime = Field(..., description="Timestamp da resposta")
     intent: str = Field(..., description="Intenção identificada")
     entities: List[Dict[str, str]] = Field(default_factory=list, description="Entidades identificadas")
+    external_info: Optional[str] = Field(None, description="Informações externas obtidas por busca (se houver)")
+    tasks: Optional[List[Dict[str, Any]]] = Field(None, description="Tarefas encontradas (intenção buscar_tarefa)")
+    phase_latencies: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Latência em segundos de cada fase do NLU (understanding e, com busca externa, grounding)"
+    )
     
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "msg789",
-                "content": "Claro! Vou criar uma tarefa para amanhã. Qual seria o título da tarefa?",
-                "timestamp": "2023-04-28T14:30:00Z",
-                "intent": "criar_tarefa",
-                "entities": [
-                    {"name": "data", "value": "amanhã"}
-                ]
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "id": "msg789",
+            "content": "Claro! Vou criar uma tarefa para amanhã. Qual seria o título da tarefa?",
+            "timestamp": "2023-04-28T14:30:00Z",
+            "intent": "criar_tarefa",
+            "entities": [
+                {"name": "data", "value": "amanhã"}
+            ]
         }
+    })
+
+class OpenChatRequest(BaseModel):
+    """Modelo para notificação de abertura do chat de uma tarefa."""
+    
+    user_id: str = Field(..., description="ID do usuário")
+    session_id: str = Field(..., max_length=128, description="ID da sessão de chat")
+    task_id: Optional[str] = Field(None, description="ID da tarefa cujo chat foi aberto")
+    
+class OpenChatResponse(BaseModel):
+    """Modelo para resposta à abertura de chat."""
+    
+    session_id: str = Field(..., description="ID da sessão de chat")
+    status: str = Field(..., description="Estado do contexto: prefetching ou ready")
+
+async def run_message_pipeline(
+    request: MessageRequest,
+    context: Dict[str, Any],
+    nlu_agent: NLUAgent,
+    nlg_agent: NLGAgent
+) -> Tuple[MessageResponse, Optional[asyncio.Task]]:
+    """
+    Executa o pipeline de uma mensagem: NLU, busca externa (se necessária) e NLG.
+    
+    Compartilhado entre o endpoint HTTP e o canal WebSocket.
+    
+    Args:
+        request: Mensagem do usuário
+        context: Contexto da conversa (tarefa ativa, histórico recente)
+        nlu_agent: Agente NLU
+        nlg_agent: Agente NLG
+        
+    Returns:
+        Tuple[MessageResponse, Optional[asyncio.Task]]: A resposta (sem
+        informações externas) e a tarefa da busca externa, se disparada
+    """
+    # Chamadas de chat são interativas e atribuídas ao usuário para o
+    # escalonamento justo; a busca externa herda este contexto
+    with llm_call_context("interactive", request.user_id):
+        return await _run_message_pipeline(request, context, nlu_agent, nlg_agent)
+
+async def _run_message_pipeline(
+    request: MessageRequest,
+    context: Dict[str, Any],
+    nlu_agent: NLUAgent,
+    nlg_agent: NLGAgent
+) -> Tuple[MessageResponse, Optional[asyncio.Task]]:
+    """
+    Implementação de run_message_pipeline, executada no contexto de LLM da mensagem.
+    """
+    # Processa a mensagem com o NLU Agent
+    agent_response = await nlu_agent.process(request.content, context)
+    nlu_result = agent_response.content
+    intent = nlu_result.get("intent", "unknown")
+    
+    # Amostra para o NLU candidato, em segundo plano (não atrasa a resposta)
+    shadow_evaluator.submit(request.content, context, agent_response)
+    
+    # Contabiliza tokens e custo da fase de compreensão
+    record_usage(
+        agent_response.metadata.get("usage"),
+        request.user_id,
+        intent,
+        agent_response.metadata.get("phase_latencies", {}).get("understanding", 0.0)
+    )
+    
+    # Fase 2 do NLU: a busca externa só é disparada quando necessária e
+    # roda em paralelo com as demais etapas do pipeline
+    grounding_task = None
+    if nlu_result.get("requires_external_info"):
+        grounding_task = asyncio.create_task(
+            nlu_agent.ground(request.content, nlu_result.get("search_query"))
+        )
+    
+    # Gera a resposta: templates locais para intenções comuns e LLM
+    # apenas para intenções abertas
+    nlg_response = await nlg_agent.process(nlu_result, request.content, context)
+    if nlg_response.metadata.get("source") == "llm":
+        record_usage(
+            nlg_response.metadata.get("usage"),
+            request.user_id,
+            intent,
+            nlg_response.metadata.get("latency", 0.0)
+        )
+    
+    # Cria a resposta
+    response = MessageResponse(
+        id=f"msg-{secrets.token_hex(4)}",
+        content=nlg_response.content,
+        timestamp=datetime.utcnow(),
+        intent=intent,
+        entities=nlu_result.get("entities", []),
+        phase_latencies=agent_response.metadata.get("phase_latencies", {})
+    )
+    
+    if intent == "buscar_tarefa":
+        response.tasks = await search_tasks(request.user_id, request.content, response.entities)
+    
+    return response, grounding_task
+
+async def resolve_external_info(grounding_task: asyncio.Task, user_id: str, intent: str,
+                                phase_latencies: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """
+    Aguarda a busca externa e contabiliza seu uso de tokens.
+    
+    Args:
+        grounding_task: Tarefa criada por run_message_pipeline
+        user_id: ID do usuário
+        intent: Intenção identificada
+        phase_latencies: Latências por fase da resposta, que recebem a da busca
+        
+    Returns:
+        Optional[str]: Resumo das informações externas, se houver
+    """
+    grounding = await grounding_task
+    record_usage(grounding.get("usage"), user_id, intent, grounding["latency"])
+    if phase_latencies is not None:
+        phase_latencies["grounding"] = grounding["latency"]
+    return grounding.get("summary")
+
+async def search_tasks(user_id: str, content: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Busca as tarefas do usuário no índice em memória.
+    
+    Usa os slots extraídos pelo NLU (título, filtro, data) como consulta e,
+    sem eles, o texto da mensagem.
+    
+    Args:
+        user_id: ID do usuário
+        content: Texto da mensagem
+        entities: Entidades identificadas pelo NLU
+        
+    Returns:
+        List[Dict[str, Any]]: Tarefas encontradas, da mais relevante
+    """
+    slots = extract_slots(entities)
+    query = " ".join(slots[slot] for slot in ("titulo", "filtro", "data") if slot in slots)
+    await task_search_index.ensure_user(user_id)
+    return task_search_index.search(user_id, query or content)
+
+async def observe_task(user_id: str, task_id: Optional[str], response: MessageResponse) -> Optional[Dict[str, Any]]:
+    """
+    Repassa a resposta ao especialista da tarefa, que atualiza o que sabe sobre ela.
+    
+    Não há repositório de tarefas neste serviço: o que a conversa revela é a
+    única fonte de criações, alterações e exclusões para o índice de busca e
+    os dashboards. Eles só são atualizados quando a mensagem de fato mudou
+    os campos da tarefa (ou a excluiu, o que também descarta o especialista);
+    os especialistas, residentes ou hibernados, são a fonte usada para
+    reconstruir os usuários que saíram de memória.
+    
+    Args:
+        user_id: ID do usuário
+        task_id: ID da tarefa ativa, se houver
+        response: Resposta gerada para a mensagem
+        
+    Returns:
+        Optional[Dict[str, Any]]: Detalhes atualizados da tarefa, ou None sem tarefa
+    """
+    registry = app_state["agent_registry"]
+    if not task_id or registry is None:
+        return None
+        
+    specialist = await registry.get("task", (user_id, task_id))
+    before = dict(specialist.task)
+    result = await specialist.process({"intent": response.intent, "entities": response.entities})
+    
+    # Mantém o índice de busca e os dashboards em dia com o que a conversa
+    # revelou; usuários fora de memória são recarregados já com a alteração
+    if response.intent == "excluir_tarefa":
+        await registry.discard("task", (user_id, task_id))
+        task_search_index.delete(user_id, task_id)
+        dashboard_engine.delete(user_id, task_id)
+    elif result.content != before:
+        await task_search_index.ensure_user(user_id)
+        task_search_index.upsert(user_id, result.content)
+        await dashboard_engine.ensure_user(user_id)
+        dashboard_engine.upsert(user_id, result.content)
+    return result.content
 
-@router.post("/message", response_model=MessageResponse)
+@router.post("/open", response_model=OpenChatResponse, status_code=status.HTTP_202_ACCEPTED)
+async def open_chat(
+    request: OpenChatRequest,
+    nlu_agent: NLUAgent = Depends()
+) -> OpenChatResponse:
+    """
+    Notifica a abertura do chat de uma tarefa.
+    
+    Dispara em segundo plano o pré-carregamento do contexto da sessão
+    (detalhes da tarefa, histórico recente e prefixo do prompt), para que a
+    primeira mensagem o encontre pronto. Retorna sem aguardar.
+    
+    Args:
+        request: Sessão, usuário e tarefa do chat aberto
+        nlu_agent: Agente NLU obtido através de injeção de dependência
+        
+    Returns:
+        OpenChatResponse: Sessão e estado do pré-carregamento
+    """
+    entry = context_prefetcher.open(request.session_id, request.user_id, request.task_id, nlu_agent)
+    return OpenChatResponse(
+        session_id=request.session_id,
+        status="ready" if entry.ready.is_set() else "prefetching"
+    )
+
+@router.post("/message", response_model=MessageResponse, response_class=FastJSONResponse)
 @traced("api.chat.message")
 async def process_message(
     request: MessageRequest, 
-    nlu_agent: NLUAgent = Depends()
-) -> Dict[str, Any]:
+    nlu_agent: NLUAgent = Depends(),
+    nlg_agent: NLGAgent = Depends(),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128)
+) -> FastJSONResponse:
     """
     Processa uma mensagem do usuário e retorna uma resposta.
     
+    Se a requisição trouxer o header `Idempotency-Key` (ou `client_message_id`),
+    repetições retornam a resposta original sem reprocessar a mensagem.
+    Reutilizar a chave com outra mensagem retorna 422.
+    
+    A resposta já é validada ao ser montada; ela é serializada direto em
+    bytes, sem a segunda validação do `response_model` (que fica só na
+    documentação).
+    
     Args:
         request: Mensagem do usuário a ser processada
         nlu_agent: Agente NLU obtido através de injeção de dependência
+        nlg_agent: Agente NLG obtido através de injeção de dependência
+        idempotency_key: Chave de idempotência enviada pelo cliente
         
     Returns:
-        MessageResponse: Resposta da mensagem
+        FastJSONResponse: Resposta da mensagem (MessageResponse serializada)
     """
+    # A chave é qualificada pelo usuário para evitar colisões entre clientes
+    key = idempotency_key or request.client_message_id
+    scoped_key = f"{request.user_id}:{key}" if key else None
+    
+    if scoped_key:
+        store = get_idempotency_store()
+        fingerprint = request_fingerprint(request.model_dump(exclude={"client_message_id"}))
+        try:
+            stored_response = await store.acquire(scoped_key, fingerprint)
+        except IdempotencyConflictError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Uma requisição com a mesma chave de idempotência ainda está em andamento"
+            )
+        except IdempotencyKeyReusedError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="A chave de idempotência já foi usada com outra mensagem"
+            )
+            
+        if stored_response is not None:
+            record_metrics("chat_request", "idempotent_replay", {"user_id": request.user_id})
+            return FastJSONResponse(stored_response)
+    
     # Registra métricas
     start_time = record_metrics(
         "chat_request", 
@@ -92,31 +354,26 @@ async def process_message(
         
         # Aqui apenas chamamos o NLU Agent, mas em uma implementação completa,
         # chamaríamos o Orquestrador que coordenaria múltiplos agentes
-        context = {}
-        if request.task_id:
-            context["task"] = {"id": request.task_id}
+        if request.session_id:
+            # Contexto pré-carregado na abertura do chat (ou montado agora)
+            context = await context_prefetcher.get(
+                request.session_id, request.user_id, request.task_id, nlu_agent
+            )
+        else:
+            context = {}
+            if request.task_id:
+                context["task"] = {"id": request.task_id}
             
-        # Processa a mensagem com o NLU Agent
-        agent_response = await nlu_agent.process(request.content, context)
-        nlu_result = agent_response.content
-        
-        # Em uma implementação completa, daqui chamaríamos outros agentes
-        # como o NLG Agent para gerar uma resposta natural
-        
-        # Por enquanto, simulamos uma resposta simples
-        response_content = f"Entendi que você quer: {nlu_result.get('intent', 'algo')}"
-        if nlu_result.get('entities'):
-            entities_text = ", ".join([f"{e['name']}: {e['value']}" for e in nlu_result.get('entities', [])])
-            response_content += f"\nEntidades identificadas: {entities_text}"
-        
-        # Cria a resposta
-        response = MessageResponse(
-            id=f"msg-{uuid.uuid4().hex[:8]}",
-            content=response_content,
-            timestamp=datetime.utcnow(),
-            intent=nlu_result.get("intent", "unknown"),
-            entities=nlu_result.get("entities", [])
-        )
+        response, grounding_task = await run_message_pipeline(request, context, nlu_agent, nlg_agent)
+        task = await observe_task(request.user_id, request.task_id, response)
+        
+        if request.session_id:
+            context_prefetcher.remember(request.session_id, request.content, response.content, nlu_agent, task)
+        
+        if grounding_task:
+            response.external_info = await resolve_external_info(
+                grounding_task, request.user_id, response.intent, response.phase_latencies
+            )
         
         # Registra métricas de sucesso
         record_metrics(
@@ -131,9 +388,22 @@ async def process_message(
             start_time
         )
         
-        return response
+        if scoped_key:
+            await store.complete(scoped_key, fingerprint, response.model_dump(mode="json"))
+        
+        return FastJSONResponse(response)
+        
+    except asyncio.CancelledError:
+        # Cliente desconectou: libera a chave sem bloquear as repetições
+        if scoped_key:
+            await asyncio.shield(store.release(scoped_key))
+        raise
         
     except Exception as e:
+        # Libera a chave para que o cliente possa repetir a requisição
+        if scoped_key:
+            await store.release(scoped_key)
+            
         # Registra métricas de erro
         record_metrics(
             "chat_request", 
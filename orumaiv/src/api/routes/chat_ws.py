@@ -0,0 +1,375 @@
+"""
+Controlador do canal WebSocket de chat.
+
+Cada conexão é associada a um `session_id`. O contexto da sessão (tarefa
+ativa, histórico recente e prefixo do prompt) fica no `context_prefetcher`,
+o mesmo usado pelo endpoint HTTP: ele é pré-carregado na conexão e mantido
+quente a cada turno, e a sessão pode alternar entre os dois canais sem
+perder o histórico.
+
+Protocolo (JSON, um objeto por frame):
+
+- cliente -> servidor: `{"type": "message", "content": "...", "task_id": "...",
+  "client_message_id": "...", "ref": "..."}` e `{"type": "ping"}`
+- servidor -> cliente: `ready`, `response` (na ordem das mensagens),
+  `external_info` (push assíncrono da busca externa), `pong` e `error`
+
+O cliente pode enviar várias mensagens sem aguardar as respostas
+(pipelining). Os limites por conexão aplicam backpressure: com o número
+máximo de mensagens pendentes, o servidor para de ler do socket; clientes
+que não consomem as respostas a tempo são desconectados.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Any, Optional
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from src.agents.nlu_agent import NLUAgent
+from src.agents.nlg_agent import NLGAgent
+from src.api.routes.chat import MessageRequest, run_message_pipeline, resolve_external_info, observe_task
+from src.config.settings import settings
+from src.core.prefetch import context_prefetcher
+from src.infrastructure.cache.idempotency import (
+    get_idempotency_store, request_fingerprint, IdempotencyConflictError, IdempotencyKeyReusedError
+)
+from src.infrastructure.observability.metrics import record_metrics
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Definição do router
+router = APIRouter(
+    prefix="/chat",
+    tags=["chat"]
+)
+
+# Código de fechamento para clientes lentos ("try again later")
+CLOSE_SLOW_CONSUMER = 1013
+
+# Código de fechamento quando outra conexão assume a sessão
+CLOSE_REPLACED = 4001
+
+class ChatSession:
+    """
+    Identificação de uma sessão de chat durante a conexão.
+    
+    O contexto da sessão fica no `context_prefetcher`; aqui só se acompanha
+    a tarefa ativa escolhida pelo cliente.
+    """
+    
+    def __init__(self, session_id: str, user_id: str, task_id: Optional[str] = None):
+        """
+        Inicializa a sessão.
+        
+        Args:
+            session_id: ID da sessão de chat
+            user_id: ID do usuário
+            task_id: ID da tarefa ativa, se houver
+        """
+        self.session_id = session_id
+        self.user_id = user_id
+        self.task_id = task_id
+        
+    def set_task(self, task_id: Optional[str]) -> None:
+        """
+        Atualiza a tarefa ativa, se a mensagem indicar uma.
+        """
+        if task_id:
+            self.task_id = task_id
+
+# Conexões ativas por sessão, para push a partir de outros componentes
+active_connections: Dict[str, "ChatConnection"] = {}
+
+class ChatConnection:
+    """
+    Gerencia uma conexão WebSocket: leitura, processamento em pipeline e
+    escrita das respostas na ordem em que as mensagens chegaram.
+    """
+    
+    def __init__(self, websocket: WebSocket, session: ChatSession,
+                 nlu_agent: NLUAgent, nlg_agent: NLGAgent):
+        self.websocket = websocket
+        self.session = session
+        self.nlu_agent = nlu_agent
+        self.nlg_agent = nlg_agent
+        
+        self._seq = 0
+        # Limita mensagens em processamento ou aguardando envio
+        self._slots = asyncio.Semaphore(settings.WS_MAX_PENDING_MESSAGES)
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_MAX_OUTBOUND_EVENTS)
+        self._background: set = set()
+        self._closed = False
+        
+    async def run(self) -> None:
+        """
+        Executa a conexão até o cliente desconectar.
+        """
+        await self.websocket.accept()
+        
+        writer = asyncio.create_task(self._writer())
+        orderer = asyncio.create_task(self._orderer())
+        
+        await self._send({
+            "type": "ready",
+            "session_id": self.session.session_id,
+            "limits": {
+                "max_pending_messages": settings.WS_MAX_PENDING_MESSAGES,
+                "max_message_bytes": settings.WS_MAX_MESSAGE_BYTES
+            }
+        })
+        
+        try:
+            await self._reader()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            for task in (writer, orderer, *self._background):
+                task.cancel()
+            while not self._pending.empty():
+                _, _, task = self._pending.get_nowait()
+                task.cancel()
+    
+    def push(self, event: Dict[str, Any]) -> bool:
+        """
+        Envia um evento ao cliente sem aguardar (server push).
+        
+        Args:
+            event: Evento a ser enviado
+            
+        Returns:
+            bool: False se a fila de saída estiver cheia e o evento foi descartado
+        """
+        if self._closed:
+            return False
+        try:
+            self._outbox.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            record_metrics("chat_ws", "push_dropped", {})
+            return False
+    
+    async def close(self, code: int) -> None:
+        """
+        Fecha a conexão com o código informado (apenas uma vez).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        await self.websocket.close(code=code)
+    
+    async def _reader(self) -> None:
+        """
+        Lê mensagens do cliente e as enfileira para processamento.
+        """
+        while not self._closed:
+            try:
+                raw = await self.websocket.receive_text()
+            except RuntimeError:
+                # O servidor já fechou o socket (ex: cliente lento desconectado)
+                return
+            
+            if len(raw.encode("utf-8")) > settings.WS_MAX_MESSAGE_BYTES:
+                await self._send({"type": "error", "code": "message_too_large"})
+                continue
+                
+            try:
+                payload = json.loads(raw)
+            except json.JSONDecodeError:
+                await self._send({"type": "error", "code": "invalid_json"})
+                continue
+            if not isinstance(payload, dict):
+                await self._send({"type": "error", "code": "invalid_message"})
+                continue
+                
+            message_type = payload.get("type", "message")
+            if message_type == "ping":
+                await self._send({"type": "pong"})
+                continue
+            if message_type != "message":
+                await self._send({"type": "error", "code": "unknown_type", "detail": message_type})
+                continue
+            
+            # Backpressure: sem vagas, para de ler até uma resposta ser enviada
+            if self._slots.locked():
+                record_metrics("chat_ws", "backpressure", {})
+            await self._slots.acquire()
+            
+            self._seq += 1
+            task = asyncio.create_task(self._handle(payload))
+            self._pending.put_nowait((self._seq, payload.get("ref"), task))
+    
+    async def _handle(self, payload: Dict[str, Any]):
+        """
+        Processa uma mensagem do cliente.
+        
+        Returns:
+            Tuple com o evento de resposta, a tarefa da busca externa, a
+            requisição e os detalhes atualizados da tarefa (os três últimos,
+            quando houver)
+        """
+        try:
+            request = MessageRequest(
+                user_id=self.session.user_id,
+                content=payload.get("content", ""),
+                task_id=payload.get("task_id") or self.session.task_id,
+                session_id=self.session.session_id,
+                client_message_id=payload.get("client_message_id")
+            )
+        except ValidationError as e:
+            return {"type": "error", "code": "invalid_message", "detail": e.errors()}, None, None, None
+        # Só uma mensagem válida altera a tarefa ativa da sessão
+        self.session.set_task(request.task_id)
+        
+        scoped_key = f"{request.user_id}:{request.client_message_id}" if request.client_message_id else None
+        store = get_idempotency_store() if scoped_key else None
+        fingerprint = request_fingerprint(request.model_dump(exclude={"client_message_id"})) if scoped_key else None
+        
+        try:
+            if scoped_key:
+                stored_response = await store.acquire(scoped_key, fingerprint)
+                if stored_response is not None:
+                    return {"type": "response", "data": stored_response}, None, None, None
+            
+            start_time = record_metrics("chat_ws", "start", {})
+            context = await context_prefetcher.get(
+                request.session_id, request.user_id, request.task_id, self.nlu_agent
+            )
+            response, grounding_task = await run_message_pipeline(
+                request, context, self.nlu_agent, self.nlg_agent
+            )
+            record_metrics("chat_ws", "end", {}, start_time)
+            
+            # Os detalhes aprendidos pelo especialista entram no contexto da sessão
+            task = await observe_task(request.user_id, request.task_id, response)
+            
+            data = response.model_dump(mode="json")
+            if scoped_key:
+                await store.complete(scoped_key, fingerprint, data)
+            return {"type": "response", "data": data}, grounding_task, request, task
+            
+        except IdempotencyConflictError:
+            return {"type": "error", "code": "duplicate_in_progress"}, None, None, None
+        except IdempotencyKeyReusedError:
+            return {"type": "error", "code": "idempotency_key_reused"}, None, None, None
+        except asyncio.CancelledError:
+            # Cliente desconectou: libera a chave sem bloquear as repetições
+            if scoped_key:
+                await asyncio.shield(store.release(scoped_key))
+            raise
+        except Exception as e:
+            if scoped_key:
+                await store.release(scoped_key)
+            logger.error(f"Erro ao processar mensagem via WebSocket: {str(e)}", exc_info=True)
+            record_metrics("chat_ws", "error", {})
+            return {"type": "error", "code": "processing_failed", "detail": str(e)}, None, None, None
+    
+    async def _orderer(self) -> None:
+        """
+        Envia as respostas na ordem de chegada das mensagens.
+        """
+        while True:
+            seq, ref, task = await self._pending.get()
+            try:
+                event, grounding_task, request, session_task = await task
+                event["seq"] = seq
+                if ref is not None:
+                    event["ref"] = ref
+                await self._send(event)
+                
+                if request is not None:
+                    # Turnos entram no histórico na ordem em que foram respondidos
+                    context_prefetcher.remember(
+                        request.session_id, request.content, event["data"]["content"],
+                        self.nlu_agent, session_task
+                    )
+                if grounding_task is not None:
+                    self._spawn(self._push_external_info(seq, grounding_task, request.user_id, event["data"]["intent"]))
+            finally:
+                self._slots.release()
+    
+    async def _push_external_info(self, seq: int, grounding_task: asyncio.Task,
+                                  user_id: str, intent: str) -> None:
+        """
+        Envia as informações externas quando a busca termina.
+        """
+        phase_latencies: Dict[str, float] = {}
+        external_info = await resolve_external_info(grounding_task, user_id, intent, phase_latencies)
+        if external_info:
+            await self._send({
+                "type": "external_info",
+                "seq": seq,
+                "data": {"external_info": external_info, "phase_latencies": phase_latencies}
+            })
+    
+    async def _send(self, event: Dict[str, Any]) -> None:
+        """
+        Enfileira um evento para envio, desconectando clientes lentos.
+        """
+        try:
+            await asyncio.wait_for(self._outbox.put(event), settings.WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            record_metrics("chat_ws", "slow_consumer", {})
+            logger.warning(f"Cliente lento desconectado da sessão {self.session.session_id}")
+            await self.close(CLOSE_SLOW_CONSUMER)
+    
+    async def _writer(self) -> None:
+        """
+        Escreve os eventos da fila de saída no socket.
+        """
+        while True:
+            event = await self._outbox.get()
+            await self.websocket.send_text(json.dumps(event, ensure_ascii=False))
+    
+    def _spawn(self, coroutine) -> None:
+        """
+        Executa uma corrotina vinculada ao tempo de vida da conexão.
+        """
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+@router.websocket("/ws/{session_id}")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: str,
+    user_id: str = Query(..., description="ID do usuário"),
+    task_id: Optional[str] = Query(None, description="ID da tarefa ativa (se houver)"),
+    nlu_agent: NLUAgent = Depends(),
+    nlg_agent: NLGAgent = Depends()
+) -> None:
+    """
+    Canal WebSocket de chat com estado de sessão residente.
+    
+    Args:
+        websocket: Conexão WebSocket
+        session_id: ID da sessão de chat
+        user_id: ID do usuário
+        task_id: ID da tarefa ativa, se houver
+        nlu_agent: Agente NLU obtido através de injeção de dependência
+        nlg_agent: Agente NLG obtido através de injeção de dependência
+    """
+    session = ChatSession(session_id, user_id, task_id)
+    connection = ChatConnection(websocket, session, nlu_agent, nlg_agent)
+    
+    # Pré-carrega o contexto enquanto o handshake termina
+    context_prefetcher.open(session_id, user_id, task_id, nlu_agent)
+    
+    # Uma única conexão por sessão: a mais recente assume
+    previous = active_connections.get(session_id)
+    if previous is not None:
+        await previous.close(CLOSE_REPLACED)
+    active_connections[session_id] = connection
+    record_metrics("chat_ws", "connect", {})
+    
+    try:
+        await connection.run()
+    finally:
+        if active_connections.get(session_id) is connection:
+            del active_connections[session_id]
+        record_metrics("chat_ws", "disconnect", {})
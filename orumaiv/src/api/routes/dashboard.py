@@ -0,0 +1,39 @@
+"""
+Controlador para os dados dos dashboards de tarefas.
+"""
+
+from datetime import date
+from typing import Dict, Any, Optional
+
+from fastapi import APIRouter, Query
+
+from src.domain.services.dashboard import dashboard_engine
+from src.infrastructure.observability.tracing import traced
+
+# Definição do router
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"]
+)
+
+@router.get("/{user_id}")
+@traced("api.dashboard.get")
+async def get_dashboard(
+    user_id: str,
+    weeks: int = Query(8, ge=1, le=104),
+    today: Optional[date] = Query(None, description="Dia de referência (padrão: hoje)")
+) -> Dict[str, Any]:
+    """
+    Retorna as séries do dashboard de tarefas de um usuário.
+    
+    Args:
+        user_id: ID do usuário
+        weeks: Número de semanas das séries temporais
+        today: Dia de referência
+        
+    Returns:
+        Dict[str, Any]: Tarefas por status e categoria, criadas e concluídas
+            por semana, taxa de conclusão e tendência de atraso
+    """
+    await dashboard_engine.ensure_user(user_id)
+    return dashboard_engine.dashboard(user_id, weeks, today)
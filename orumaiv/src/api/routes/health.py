@@ -2,12 +2,22 @@
 Controlador para endpoints de verificação de saúde.
 """
 
-from fastapi import APIRouter, Depends
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional
+import time
 
 from src.agents.nlu_agent import NLUAgent
+from src.agents.nlg_agent import NLGAgent
+from src.api.state import app_state
 from src.config.settings import settings
 from src.infrastructure.observability.metrics import get_metrics_summary
+from src.infrastructure.observability.windows import windowed_metrics, MAX_WINDOW_SECONDS
+from src.core.scheduler import llm_scheduler
+from src.core.prefetch import context_prefetcher
+from src.core.shadow import shadow_evaluator
+from src.infrastructure.observability.loop_monitor import loop_monitor
+from src.domain.services.task_search import task_search_index
 
 router = APIRouter(
     prefix="/health",
@@ -25,24 +35,65 @@ async def health_check() -> Dict[str, Any]:
     return {
         "status": "ok",
         "version": settings.API_VERSION,
-        "environment": "development" if settings.DEBUG else "production"
+        "environment": "development" if settings.DEBUG else "production",
+        "event_loop": loop_monitor.summary()
     }
 
+@router.get("/live")
+async def liveness() -> Dict[str, Any]:
+    """
+    Liveness: indica apenas que o processo está respondendo.
+    
+    Não depende de agentes nem de serviços externos.
+    
+    Returns:
+        Dict[str, Any]: Status do processo
+    """
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness: indica se a aplicação pode receber tráfego.
+    
+    Retorna 503 enquanto os agentes não terminarem de inicializar.
+    
+    Returns:
+        Status de prontidão e tempos de inicialização de cada agente
+    """
+    startup = app_state["startup"]
+    started_at = startup["started_at"]
+    finished_at = startup["finished_at"]
+    
+    content = {
+        "status": "ready" if app_state["ready"] else "starting" if finished_at is None else "failed",
+        "startup_seconds": (finished_at or time.time()) - started_at if started_at else None,
+        "agents": startup["agents"]
+    }
+    
+    if not app_state["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content)
+    return content
+
 @router.get("/agents")
-async def agents_health(nlu_agent: NLUAgent = Depends()) -> Dict[str, Any]:
+async def agents_health(nlu_agent: NLUAgent = Depends(), nlg_agent: NLGAgent = Depends()) -> Dict[str, Any]:
     """
     Verifica a saúde dos agentes da aplicação.
     
     Args:
         nlu_agent: Agente NLU obtido através de injeção de dependência
+        nlg_agent: Agente NLG obtido através de injeção de dependência
         
     Returns:
         Dict[str, Any]: Status dos agentes
     """
+    registry = app_state["agent_registry"]
     return {
         "agents": {
-            "nlu": await nlu_agent.health_check()
-        }
+            "nlu": await nlu_agent.health_check(),
+            "nlg": await nlg_agent.health_check()
+        },
+        "registry": registry.stats() if registry else None
     }
 
 @router.get("/metrics")
@@ -53,4 +104,82 @@ async def metrics() -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Métricas coletadas
     """
-    return get_metrics_summary() 
\ No newline at end of file
+    return get_metrics_summary() 
+
+@router.get("/metrics/window")
+async def metrics_window(
+    window: float = Query(300, gt=0, le=MAX_WINDOW_SECONDS, description="Janela em segundos"),
+    metric: Optional[str] = Query(None, description="Prefixo do nome da métrica"),
+    labels: Optional[str] = Query(None, description="Texto contido nos rótulos (ex: agent:NLUAgent)"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.METRICS_WINDOW_MAX_SERIES,
+                                 description="Máximo de séries agregadas (as atualizadas mais recentemente)")
+) -> Dict[str, Any]:
+    """
+    Retorna taxas e percentis das métricas em uma janela recente.
+    
+    Usa buffers circulares de 1s (5 min), 10s (1 h) e 1 min (24 h): o
+    tamanho da resposta não cresce com o tempo de atividade.
+    
+    Args:
+        window: Tamanho da janela, terminando agora
+        metric: Filtro pelo nome da métrica
+        labels: Filtro pelos rótulos da série
+        limit: Máximo de séries agregadas
+        
+    Returns:
+        Dict[str, Any]: Contagem, taxa por segundo e, para durações e
+            histogramas, média e percentis de cada série
+    """
+    return {**windowed_metrics.query(window, metric, labels, limit=limit), "store": windowed_metrics.stats()}
+
+@router.get("/scheduler")
+async def scheduler() -> Dict[str, Any]:
+    """
+    Retorna o estado do escalonador de chamadas ao LLM.
+    
+    Returns:
+        Dict[str, Any]: Limite adaptativo atual, vagas em uso, rejeições,
+            filas e tempos de espera por prioridade
+    """
+    return llm_scheduler.stats()
+
+@router.get("/prefetch")
+async def prefetch() -> Dict[str, Any]:
+    """
+    Retorna as estatísticas do pré-carregamento de contexto dos chats.
+    
+    Returns:
+        Dict[str, Any]: Sessões, consultas por resultado e taxas de acerto
+    """
+    return context_prefetcher.stats()
+
+@router.get("/shadow")
+async def shadow() -> Dict[str, Any]:
+    """
+    Retorna a comparação entre o NLU principal e o candidato (tráfego sombra).
+    
+    Returns:
+        Dict[str, Any]: Amostras, concordância de intenção, diferenças de
+            entidades e diferenças de latência e custo
+    """
+    return shadow_evaluator.stats()
+
+@router.get("/search")
+async def search() -> Dict[str, Any]:
+    """
+    Retorna o tamanho do índice de busca de tarefas.
+    
+    Returns:
+        Dict[str, Any]: Usuários e tarefas indexados
+    """
+    return task_search_index.stats()
+
+@router.get("/loop")
+async def event_loop() -> Dict[str, Any]:
+    """
+    Retorna o lag do event loop deste worker e os bloqueios detectados.
+    
+    Returns:
+        Dict[str, Any]: Histogramas de lag e pilhas dos callbacks lentos
+    """
+    return loop_monitor.stats()
@@ -0,0 +1,234 @@
+"""
+Inicialização do servidor em modo de produção.
+
+Usa o gunicorn como gerenciador de processos (pre-fork com a aplicação
+pré-carregada no processo mestre) e workers uvicorn com uvloop/httptools
+quando disponíveis. Em plataformas sem gunicorn (ex: Windows), recorre ao
+modo multiprocesso do próprio uvicorn.
+
+Nesses dois modos os workers compartilham um único socket e o kernel
+distribui as conexões entre eles, então a afinidade de sessão
+(src/core/affinity.py) só alcança o nó. Com `worker_ports`, cada worker
+escuta em uma porta própria e é um nó do anel (`<NODE_ID>:<porta>`), para
+que o balanceador encaminhe cada sessão ao worker que guarda o seu estado.
+"""
+
+import importlib.util
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+from src.config.settings import settings
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Aplicação ASGI servida
+APP_URI = "src.api.main:app"
+
+def available_cpus() -> int:
+    """
+    Retorna o número de CPUs disponíveis para o processo.
+    
+    Respeita a afinidade de CPU (ex: limites de contêiner via cpuset).
+    
+    Returns:
+        int: Número de CPUs utilizáveis
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def default_workers() -> int:
+    """
+    Calcula o número padrão de workers.
+    
+    Workers assíncronos não bloqueiam em I/O, então um worker por CPU basta.
+    
+    Returns:
+        int: Número de workers
+    """
+    return max(available_cpus(), 1)
+
+def select_loop() -> str:
+    """
+    Seleciona a implementação do event loop (uvloop, se instalado).
+    
+    Returns:
+        str: "uvloop" ou "asyncio"
+    """
+    if sys.platform != "win32" and importlib.util.find_spec("uvloop"):
+        return "uvloop"
+    return "asyncio"
+
+def select_http() -> str:
+    """
+    Seleciona o parser HTTP (httptools, se instalado).
+    
+    Returns:
+        str: "httptools" ou "h11"
+    """
+    if importlib.util.find_spec("httptools"):
+        return "httptools"
+    return "h11"
+
+def _gunicorn_available() -> bool:
+    """
+    Indica se o gunicorn pode ser usado nesta plataforma.
+    """
+    return os.name == "posix" and importlib.util.find_spec("gunicorn") is not None
+
+def worker_nodes(port: int, workers: int) -> List[str]:
+    """
+    Nós do anel de afinidade dos workers deste nó no modo `worker_ports`.
+    
+    Args:
+        port: Porta do primeiro worker
+        workers: Número de workers
+        
+    Returns:
+        List[str]: `<NODE_ID>:<porta>` de cada worker
+    """
+    return [f"{settings.NODE_ID}:{port + index}" for index in range(workers)]
+
+def _run_worker_ports(host: str, port: int, workers: int, loop: str, http: str,
+                      max_requests: int, max_requests_jitter: int, keepalive: int,
+                      graceful_timeout: int) -> None:
+    """
+    Executa um processo uvicorn por worker, cada um na sua porta.
+    
+    Cada worker recebe `NODE_ID=<NODE_ID>:<porta>`; sem CLUSTER_NODES, o anel
+    é formado pelos workers deste nó. Workers que terminam (ex: reciclagem
+    por `max_requests`) são reiniciados na mesma porta, e SIGTERM/SIGINT
+    encerram todos com desligamento gracioso.
+    """
+    nodes = worker_nodes(port, workers)
+    cluster_nodes = ",".join(settings.CLUSTER_NODES or nodes)
+    
+    def spawn(index: int) -> subprocess.Popen:
+        command = [
+            sys.executable, "-m", "uvicorn", APP_URI,
+            "--host", host,
+            "--port", str(port + index),
+            "--loop", loop,
+            "--http", http,
+            "--timeout-keep-alive", str(keepalive),
+            "--timeout-graceful-shutdown", str(graceful_timeout),
+        ]
+        if max_requests:
+            # Mesmo efeito do jitter do gunicorn: workers não reciclam juntos
+            jitter = (index * 7919) % (max_requests_jitter + 1)
+            command += ["--limit-max-requests", str(max_requests + jitter)]
+        env = {**os.environ, "NODE_ID": nodes[index], "CLUSTER_NODES": cluster_nodes}
+        return subprocess.Popen(command, env=env)
+    
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    processes = [spawn(index) for index in range(workers)]
+    try:
+        while not stopping:
+            time.sleep(1)
+            for index, process in enumerate(processes):
+                if process.poll() is not None and not stopping:
+                    logger.info(f"Worker {nodes[index]} terminou ({process.returncode}); reiniciando")
+                    processes[index] = spawn(index)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in processes:
+            try:
+                process.wait(graceful_timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def run_production(host: str, port: int, workers: Optional[int] = None,
+                   max_requests: int = 10000, max_requests_jitter: int = 1000,
+                   keepalive: int = 5, worker_ports: bool = False) -> None:
+    """
+    Executa a aplicação em modo de produção.
+    
+    Args:
+        host: Endereço de escuta
+        port: Porta de escuta (com `worker_ports`, a do primeiro worker)
+        workers: Número de workers (padrão: um por CPU)
+        max_requests: Requisições atendidas antes de reciclar o worker (0 desativa)
+        max_requests_jitter: Variação aleatória do limite, para não reciclar todos juntos
+        keepalive: Segundos para manter conexões keep-alive abertas
+        worker_ports: Um processo por porta (port, port + 1, ...), endereçável
+            pelo anel de afinidade, em vez de um socket compartilhado
+    """
+    workers = workers or default_workers()
+    loop, http = select_loop(), select_http()
+    
+    # O desligamento do worker precisa cobrir a drenagem das chamadas ao Gemini
+    graceful_timeout = int(settings.SHUTDOWN_DRAIN_SECONDS) + 10
+    
+    if worker_ports:
+        logger.info(
+            f"Iniciando {workers} worker(s) em {host}:{port}-{port + workers - 1} "
+            f"(loop: {loop}, http: {http})"
+        )
+        _run_worker_ports(host, port, workers, loop, http, max_requests,
+                          max_requests_jitter, keepalive, graceful_timeout)
+        return
+    
+    logger.info(f"Iniciando {workers} worker(s) em {host}:{port} (loop: {loop}, http: {http})")
+    
+    if _gunicorn_available():
+        from gunicorn.app.base import BaseApplication
+        
+        class ProductionApplication(BaseApplication):
+            """Aplicação gunicorn configurada programaticamente."""
+            
+            def __init__(self, options: Dict[str, Any]):
+                self.options = options
+                super().__init__()
+                
+            def load_config(self):
+                for key, value in self.options.items():
+                    self.cfg.set(key, value)
+                    
+            def load(self):
+                # Com preload_app, executado uma única vez no processo mestre
+                from src.api.main import app
+                return app
+        
+        ProductionApplication({
+            "bind": f"{host}:{port}",
+            "workers": workers,
+            "worker_class": "src.api.worker.OrumaivUvicornWorker",
+            "preload_app": True,
+            "max_requests": max_requests,
+            "max_requests_jitter": max_requests_jitter,
+            "graceful_timeout": graceful_timeout,
+            "keepalive": keepalive,
+        }).run()
+        return
+    
+    import uvicorn
+    
+    logger.warning("gunicorn indisponível; usando o modo multiprocesso do uvicorn (sem preload)")
+    uvicorn.run(
+        APP_URI,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        limit_max_requests=max_requests or None,
+        timeout_keep_alive=keepalive,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level="info"
+    )
@@ -0,0 +1,23 @@
+"""
+Estado compartilhado da aplicação.
+
+Mantém as instâncias de agentes e o estado de prontidão em um módulo
+próprio, para que as rotas possam consultá-los sem importar `src.api.main`.
+"""
+
+from typing import Dict, Any
+
+# Variáveis globais para armazenar instâncias de agentes
+app_state: Dict[str, Any] = {
+    "nlu_agent": None,
+    "nlg_agent": None,
+    # Agentes especialistas por tarefa, criados sob demanda
+    "agent_registry": None,
+    # Prontidão dos agentes: preenchida quando a preparação termina
+    "ready": False,
+    "startup": {
+        "started_at": None,
+        "finished_at": None,
+        "agents": {}
+    }
+}
@@ -0,0 +1,24 @@
+"""
+Worker uvicorn para o gunicorn.
+
+Seleciona uvloop e httptools quando disponíveis, com fallback para as
+implementações puras em Python.
+"""
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:
+    from uvicorn.workers import UvicornWorker
+
+from src.api.server import select_loop, select_http
+
+class OrumaivUvicornWorker(UvicornWorker):
+    """
+    Worker uvicorn com loop e parser HTTP escolhidos na inicialização.
+    """
+    
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "loop": select_loop(),
+        "http": select_http(),
+    }
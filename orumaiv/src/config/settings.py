@@ -6,6 +6,7 @@ ou um arquivo .env na raiz do projeto.
 """
 
 import os
+import socket
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
@@ -32,6 +33,26 @@ class Settings:
     # Configurações do Google AI
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GEMINI_MODEL_ID: str = os.getenv("GEMINI_MODEL_ID", "gemini-2.0-flash")
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "")
+    
+    # Escalonamento das chamadas ao Gemini
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_INTERACTIVE_RESERVED: int = int(os.getenv("LLM_INTERACTIVE_RESERVED", "8"))
+    # Limite adaptativo: gradient, aimd ou fixed (LLM_MAX_CONCURRENCY é o teto)
+    LLM_LIMIT_ALGORITHM: str = os.getenv("LLM_LIMIT_ALGORITHM", "gradient")
+    LLM_LIMIT_INITIAL: int = int(os.getenv("LLM_LIMIT_INITIAL", "16"))
+    LLM_LIMIT_MIN: int = int(os.getenv("LLM_LIMIT_MIN", "2"))
+    LLM_MAX_QUEUE_WAIT_SECONDS: float = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "10"))
+    
+    # Transporte das chamadas ao Gemini: passthrough, record ou replay
+    GEMINI_TRANSPORT_MODE: str = os.getenv("GEMINI_TRANSPORT_MODE", "passthrough")
+    GEMINI_RECORDINGS_PATH: str = os.getenv("GEMINI_RECORDINGS_PATH", str(BASE_DIR / "recordings" / "gemini.jsonl"))
+    GEMINI_REPLAY_HONOUR_LATENCY: bool = os.getenv("GEMINI_REPLAY_HONOUR_LATENCY", "False").lower() == "true"
+    
+    # Cache de resultados do NLU
+    NLU_CACHE_SIZE: int = int(os.getenv("NLU_CACHE_SIZE", "2048"))
+    NLU_CACHE_TTL_SECONDS: int = int(os.getenv("NLU_CACHE_TTL_SECONDS", "3600"))
+    NLU_CACHE_WARMUP: bool = os.getenv("NLU_CACHE_WARMUP", "False").lower() == "true"
     
     # Configurações do banco de dados
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017/orumaiv")
@@ -39,6 +60,30 @@ class Settings:
     # Configurações de cache
     REDIS_URI: str = os.getenv("REDIS_URI", "redis://localhost:6379/0")
     
+    # Idempotência de mensagens de chat: memory ou redis
+    IDEMPOTENCY_BACKEND: str = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+    # Validade do marcador "em processamento" no Redis (deve cobrir o processamento mais longo)
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_PENDING_TTL_SECONDS", "300"))
+    
+    # Registro de agentes especialistas: memory ou redis para os hibernados
+    AGENT_REGISTRY_MAX_RESIDENT: int = int(os.getenv("AGENT_REGISTRY_MAX_RESIDENT", "256"))
+    HIBERNATION_BACKEND: str = os.getenv("HIBERNATION_BACKEND", "memory")
+    HIBERNATION_TTL_SECONDS: int = int(os.getenv("HIBERNATION_TTL_SECONDS", "604800"))
+    HIBERNATION_MAX_ENTRIES: int = int(os.getenv("HIBERNATION_MAX_ENTRIES", "100000"))
+    
+    # Afinidade de sessão: identificador deste nó e nós do cluster (separados por vírgula)
+    NODE_ID: str = os.getenv("NODE_ID", socket.gethostname())
+    CLUSTER_NODES: list = [node for node in os.getenv("CLUSTER_NODES", "").split(",") if node]
+    AFFINITY_VNODES: int = int(os.getenv("AFFINITY_VNODES", "128"))
+    
+    # Estado de sessões que sobrevive a remanejamentos: memory ou redis
+    SHARED_STATE_BACKEND: str = os.getenv("SHARED_STATE_BACKEND", "memory")
+    SHARED_STATE_TTL_SECONDS: int = int(os.getenv("SHARED_STATE_TTL_SECONDS", "86400"))
+    SHARED_STATE_MAX_ENTRIES: int = int(os.getenv("SHARED_STATE_MAX_ENTRIES", "10000"))
+    
     # Configurações do Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
     KAFKA_EVENTS_TOPIC: str = os.getenv("KAFKA_EVENTS_TOPIC", "orumaiv-events")
@@ -46,10 +91,61 @@ class Settings:
     # Configurações de observabilidade
     JAEGER_HOST: str = os.getenv("JAEGER_HOST", "localhost")
     JAEGER_PORT: int = int(os.getenv("JAEGER_PORT", "6831"))
+    # Séries mantidas nas janelas deslizantes de métricas (/health/metrics/window);
+    # cada série ocupa ~34 KB (contador) ou ~250 KB (histograma) pré-alocados
+    METRICS_WINDOW_MAX_SERIES: int = int(os.getenv("METRICS_WINDOW_MAX_SERIES", "1000"))
+    # Máximo de séries agregadas por consulta
+    METRICS_WINDOW_QUERY_MAX_SERIES: int = int(os.getenv("METRICS_WINDOW_QUERY_MAX_SERIES", "200"))
+    
+    # Tempo máximo para drenar chamadas ao Gemini em andamento no desligamento
+    SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+    
+    # Configurações de contabilização de tokens e custo
+    USAGE_RETENTION_DAYS: int = int(os.getenv("USAGE_RETENTION_DAYS", "30"))
+    USAGE_MAX_KEYS: int = int(os.getenv("USAGE_MAX_KEYS", "1000"))
     
     # Configurações de segurança
     SECRET_KEY: str = os.getenv("SECRET_KEY", "insecure-dev-key-change-this-in-production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+    # Token dos endpoints administrativos (header X-Admin-Token); vazio os desativa
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    
+    # Limites por conexão do canal WebSocket de chat
+    WS_MAX_PENDING_MESSAGES: int = int(os.getenv("WS_MAX_PENDING_MESSAGES", "8"))
+    WS_MAX_MESSAGE_BYTES: int = int(os.getenv("WS_MAX_MESSAGE_BYTES", "16384"))
+    WS_MAX_OUTBOUND_EVENTS: int = int(os.getenv("WS_MAX_OUTBOUND_EVENTS", "32"))
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+    
+    # Pré-carregamento do contexto ao abrir o chat de uma tarefa
+    PREFETCH_MAX_SESSIONS: int = int(os.getenv("PREFETCH_MAX_SESSIONS", "1024"))
+    PREFETCH_TTL_SECONDS: int = int(os.getenv("PREFETCH_TTL_SECONDS", "1800"))
+    CHAT_HISTORY_SIZE: int = int(os.getenv("CHAT_HISTORY_SIZE", "10"))
+    
+    # Índice de busca de tarefas (buscar_tarefa): usuários mantidos em memória
+    TASK_INDEX_MAX_USERS: int = int(os.getenv("TASK_INDEX_MAX_USERS", "10000"))
+    # Agregações dos dashboards: usuários com tarefas carregadas em memória
+    DASHBOARD_MAX_USERS: int = int(os.getenv("DASHBOARD_MAX_USERS", "10000"))
+    
+    # Avaliação sombra de um NLU candidato (fração das mensagens; 0 desativa).
+    # SHADOW_NLU_AGENT (módulo:atributo) substitui o candidato padrão, que é o
+    # NLUAgent com SHADOW_NLU_MODEL_ID
+    SHADOW_SAMPLE_RATE: float = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+    SHADOW_NLU_MODEL_ID: str = os.getenv("SHADOW_NLU_MODEL_ID", "")
+    SHADOW_NLU_AGENT: str = os.getenv("SHADOW_NLU_AGENT", "")
+    SHADOW_MAX_IN_FLIGHT: int = int(os.getenv("SHADOW_MAX_IN_FLIGHT", "4"))
+    SHADOW_MAX_INTENTS: int = int(os.getenv("SHADOW_MAX_INTENTS", "100"))
+    SHADOW_RECENT_SAMPLES: int = int(os.getenv("SHADOW_RECENT_SAMPLES", "1000"))
+    
+    # Arquivo colunar do histórico de conversas e resultados do NLU
+    ARCHIVE_ROOT: str = os.getenv("ARCHIVE_ROOT", str(BASE_DIR / "archive"))
+    ARCHIVE_SEGMENT_MAX_ROWS: int = int(os.getenv("ARCHIVE_SEGMENT_MAX_ROWS", "65536"))
+    
+    # Monitor do event loop; o detector de bloqueios é opt-in
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+    LOOP_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.5"))
+    LOOP_BLOCKING_DETECTOR: bool = os.getenv("LOOP_BLOCKING_DETECTOR", "False").lower() == "true"
+    LOOP_BLOCKING_THRESHOLD_SECONDS: float = float(os.getenv("LOOP_BLOCKING_THRESHOLD_SECONDS", "0.1"))
+    LOOP_BLOCKING_MAX_REPORTS: int = int(os.getenv("LOOP_BLOCKING_MAX_REPORTS", "20"))
     
     # Lista de origens permitidas para CORS
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -73,9 +169,5 @@ class Settings:
         return None
 
 # Instância de configurações para uso em toda a aplicação
-settings = Settings()
-
-# Validação básica das configurações
-validation_error = settings.validate()
-if validation_error:
-    print(f"ERRO DE CONFIGURAÇÃO: {validation_error}") 
\ No newline at end of file
+# A validação é feita na inicialização da aplicação (lifespan), não na importação
+settings = Settings() 
\ No newline at end of file
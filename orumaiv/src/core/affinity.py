@@ -0,0 +1,167 @@
+"""
+Afinidade de sessão por hashing consistente.
+
+O estado por processo (contexto pré-carregado das sessões, agentes
+especialistas residentes, caches do NLU) só se mantém quente se as
+mensagens de uma sessão chegarem sempre ao mesmo worker ou nó. Este módulo
+define o contrato de headers e o anel de hashing consistente usados para
+isso:
+
+- o cliente (ou o gateway) envia `X-Orumaiv-Affinity-Key` com
+  `session:<session_id>` ou, sem sessão, `user:<user_id>` (ver `affinity_key`)
+- o balanceador escolhe o nó pelo hash consistente desse header (ex: nginx
+  `hash $http_x_orumaiv_affinity_key consistent;`) ou com `HashRing.node_for`
+- cada resposta traz `X-Orumaiv-Node` (nó que atendeu) e
+  `X-Orumaiv-Affinity-Owner` (nó dono da chave no anel), para que clientes
+  e gateways detectem roteamentos fora da afinidade
+
+Com o anel, adicionar ou remover um nó remaneja apenas ~1/N das chaves; o
+estado que precisa sobreviver ao remanejamento fica no armazenamento
+compartilhado (src/infrastructure/cache/shared.py).
+"""
+
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from src.config.settings import settings
+from src.infrastructure.observability.metrics import record_metrics
+
+# Header com a chave de afinidade enviado pelo cliente ou gateway
+AFFINITY_HEADER = "X-Orumaiv-Affinity-Key"
+# Headers de resposta
+NODE_HEADER = "X-Orumaiv-Node"
+OWNER_HEADER = "X-Orumaiv-Affinity-Owner"
+
+# Nomes em bytes minúsculos, como exige o ASGI
+_AFFINITY_HEADER = AFFINITY_HEADER.lower().encode("latin-1")
+_NODE_HEADER = NODE_HEADER.lower().encode("latin-1")
+_OWNER_HEADER = OWNER_HEADER.lower().encode("latin-1")
+
+def affinity_key(session_id: Optional[str] = None, user_id: Optional[str] = None) -> Optional[str]:
+    """
+    Chave de afinidade de uma requisição: a sessão e, sem ela, o usuário.
+
+    Args:
+        session_id: ID da sessão de chat
+        user_id: ID do usuário
+
+    Returns:
+        Optional[str]: `session:<id>`, `user:<id>` ou None
+    """
+    if session_id:
+        return f"session:{session_id}"
+    if user_id:
+        return f"user:{user_id}"
+    return None
+
+def _hash(value: str) -> int:
+    """
+    Hash estável entre processos (o `hash()` do Python é aleatorizado).
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Anel de hashing consistente com nós virtuais.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        """
+        Args:
+            nodes: Nós iniciais (ex: "10.0.0.5:8000")
+            vnodes: Pontos do anel por nó; mais pontos equilibram melhor a carga
+        """
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """
+        Adiciona um nó ao anel.
+        """
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        """
+        Remove um nó do anel; suas chaves passam aos nós seguintes.
+        """
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def node_for(self, key: str) -> Optional[str]:
+        """
+        Nó responsável por uma chave.
+
+        Args:
+            key: Chave de afinidade
+
+        Returns:
+            Optional[str]: Nó dono da chave, ou None se o anel estiver vazio
+        """
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key))
+        if index == len(self._points):
+            index = 0
+        return self._owners[self._points[index]]
+
+class AffinityMiddleware:
+    """
+    Middleware ASGI que informa, em cada resposta, o nó que atendeu e o nó
+    dono da chave de afinidade, e mede o roteamento.
+    """
+
+    def __init__(self, app, ring: HashRing, node_id: str):
+        """
+        Args:
+            app: Aplicação ASGI
+            ring: Anel com os nós do cluster
+            node_id: Identificador deste nó no anel
+        """
+        self.app = app
+        self.ring = ring
+        self.node_id = node_id
+        self._node_bytes = node_id.encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        key = None
+        for name, value in scope["headers"]:
+            if name == _AFFINITY_HEADER:
+                key = value.decode("latin-1")
+                break
+
+        owner = self.ring.node_for(key) if key else None
+        if owner is not None:
+            record_metrics("affinity", "local" if owner == self.node_id else "misrouted", {})
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((_NODE_HEADER, self._node_bytes))
+                if owner is not None:
+                    headers.append((_OWNER_HEADER, owner.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+# Anel com os nós configurados (um único nó se CLUSTER_NODES estiver vazio)
+cluster_ring = HashRing(settings.CLUSTER_NODES or [settings.NODE_ID], settings.AFFINITY_VNODES)
@@ -0,0 +1,228 @@
+"""
+Algoritmos de limite adaptativo de concorrência.
+
+Inspirados na biblioteca concurrency-limits da Netflix: o limite de chamadas
+simultâneas ao Gemini é ajustado continuamente a partir da latência (RTT)
+medida e dos erros, em vez de um valor fixo.
+
+- AIMDLimit: aumento aditivo enquanto não há erros nem latência acima do
+  limiar; redução multiplicativa em caso de erro ou timeout
+- GradientLimit: compara o RTT de longo prazo com o de curto prazo; quando
+  o RTT recente sobe (fila se formando no servidor), o limite cai na mesma
+  proporção. As médias são mantidas por tipo de chamada (understanding,
+  grounding, generation), cujas latências normais são muito diferentes
+- FixedLimit: limite constante (comportamento anterior)
+
+Também define `TokenBucket`, um limitador de taxa (requisições por segundo)
+para processos em lote.
+"""
+
+import asyncio
+import math
+import time
+from typing import Dict, Any
+
+class FixedLimit:
+    """
+    Limite constante.
+    """
+    
+    name = "fixed"
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        
+    def update(self, rtt: float, in_flight: int, dropped: bool, kind: str = "default") -> int:
+        """
+        Registra uma amostra e retorna o novo limite.
+        
+        Args:
+            rtt: Latência da chamada em segundos
+            in_flight: Chamadas em andamento quando esta começou
+            dropped: Se a chamada falhou (erro ou timeout)
+            kind: Tipo da chamada (ex: understanding, grounding, generation)
+            
+        Returns:
+            int: Limite de concorrência atualizado
+        """
+        return self.limit
+        
+    def state(self) -> Dict[str, Any]:
+        return {"algorithm": self.name, "limit": self.limit}
+
+class AIMDLimit(FixedLimit):
+    """
+    Aumento aditivo, redução multiplicativa.
+    """
+    
+    name = "aimd"
+    
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 backoff_ratio: float = 0.9, rtt_threshold: float = 5.0):
+        """
+        Args:
+            initial: Limite inicial
+            min_limit: Limite mínimo
+            max_limit: Limite máximo
+            backoff_ratio: Fator aplicado ao limite em caso de erro
+            rtt_threshold: RTT (segundos) a partir do qual a chamada conta como lenta
+        """
+        super().__init__(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.rtt_threshold = rtt_threshold
+        self._limit = float(initial)
+        
+    def update(self, rtt: float, in_flight: int, dropped: bool, kind: str = "default") -> int:
+        if dropped or rtt > self.rtt_threshold:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        elif in_flight * 2 >= self._limit:
+            # Só cresce quando o limite está de fato sendo usado
+            self._limit = min(self.max_limit, self._limit + 1)
+        self.limit = int(self._limit)
+        return self.limit
+
+class GradientLimit(FixedLimit):
+    """
+    Limite por gradiente de latência (semelhante ao Gradient2 da Netflix).
+    
+    `gradiente = clamp(tolerância * rtt_longo / rtt_curto, 0.5, 1.0)` e
+    `novo_limite = limite * gradiente + sqrt(limite)`, suavizado.
+    
+    Os RTTs de longo e curto prazo são mantidos por tipo de chamada: uma
+    busca externa lenta compara com o histórico das buscas, não com o das
+    classificações rápidas. O limite resultante é único.
+    """
+    
+    name = "gradient"
+    
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 smoothing: float = 0.2, rtt_tolerance: float = 1.5,
+                 long_window: int = 600, backoff_ratio: float = 0.9):
+        """
+        Args:
+            initial: Limite inicial
+            min_limit: Limite mínimo
+            max_limit: Limite máximo
+            smoothing: Peso do novo valor calculado (0 a 1)
+            rtt_tolerance: Aumento tolerado do RTT recente sobre o de longo prazo
+            long_window: Número de amostras da média de longo prazo
+            backoff_ratio: Fator aplicado ao limite em caso de erro
+        """
+        super().__init__(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.rtt_tolerance = rtt_tolerance
+        self.backoff_ratio = backoff_ratio
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._short_alpha = 0.5
+        # RTTs de longo e curto prazo por tipo de chamada
+        self._long_rtt: Dict[str, float] = {}
+        self._short_rtt: Dict[str, float] = {}
+        self._limit = float(initial)
+        
+    def update(self, rtt: float, in_flight: int, dropped: bool, kind: str = "default") -> int:
+        if dropped:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            self.limit = int(self._limit)
+            return self.limit
+            
+        long_rtt = self._long_rtt.get(kind, rtt)
+        short_rtt = self._short_rtt.get(kind, rtt)
+        short_rtt += self._short_alpha * (rtt - short_rtt)
+        long_rtt += self._long_alpha * (rtt - long_rtt)
+        
+        # Se o RTT de longo prazo ficou muito acima do recente, ele se recupera mais rápido
+        if long_rtt / max(short_rtt, 1e-9) > 2:
+            long_rtt *= 0.95
+        self._long_rtt[kind] = long_rtt
+        self._short_rtt[kind] = short_rtt
+        
+        # Sem uso suficiente do limite, a latência não diz nada sobre ele
+        if in_flight * 2 < self._limit:
+            return self.limit
+            
+        gradient = max(0.5, min(1.0, self.rtt_tolerance * long_rtt / max(short_rtt, 1e-9)))
+        new_limit = self._limit * gradient + math.sqrt(self._limit)
+        self._limit = self._limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self._limit = max(self.min_limit, min(self.max_limit, self._limit))
+        self.limit = int(self._limit)
+        return self.limit
+        
+    def state(self) -> Dict[str, Any]:
+        return {
+            "algorithm": self.name,
+            "limit": self.limit,
+            "long_rtt_seconds": dict(self._long_rtt),
+            "short_rtt_seconds": dict(self._short_rtt)
+        }
+
+def create_limit(algorithm: str, initial: int, min_limit: int, max_limit: int) -> FixedLimit:
+    """
+    Cria o algoritmo de limite configurado.
+    
+    Args:
+        algorithm: gradient, aimd ou fixed
+        initial: Limite inicial
+        min_limit: Limite mínimo
+        max_limit: Limite máximo
+        
+    Returns:
+        FixedLimit: Instância do algoritmo
+        
+    Raises:
+        ValueError: Se o algoritmo for desconhecido
+    """
+    if algorithm == "gradient":
+        return GradientLimit(initial, min_limit, max_limit)
+    if algorithm == "aimd":
+        return AIMDLimit(initial, min_limit, max_limit)
+    if algorithm == "fixed":
+        return FixedLimit(max_limit)
+        
+    raise ValueError(f"Algoritmo de limite desconhecido: {algorithm}")
+
+class TokenBucket:
+    """
+    Limitador de taxa assíncrono (token bucket).
+    """
+    
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Tokens repostos por segundo
+            burst: Capacidade máxima do balde
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        
+    async def acquire(self) -> None:
+        """
+        Aguarda até haver um token disponível e o consome.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                    
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                
+    def pause(self, seconds: float) -> None:
+        """
+        Suspende a emissão de tokens (ex: após um erro de cota do provedor).
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
@@ -0,0 +1,296 @@
+"""
+Pré-carregamento especulativo do contexto de chats de tarefa.
+
+Quando o usuário abre o chat de uma tarefa, o contexto da sessão (detalhes
+da tarefa, histórico recente e o prefixo do prompt do especialista) é
+montado em segundo plano, antes da primeira mensagem. `process_message`
+encontra então o contexto pronto, fora do caminho crítico.
+
+O mesmo cache mantém o contexto das sessões quente entre as mensagens:
+cada turno respondido atualiza o histórico e o prefixo. Com um armazenamento
+compartilhado configurado, a tarefa e o histórico também são gravados nele,
+para que a sessão continue de onde parou se passar a outro worker ou nó.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+from src.infrastructure.observability.metrics import record_metrics
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega os detalhes de uma tarefa: (user_id, task_id) -> dados da tarefa
+TaskLoader = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+async def default_task_loader(user_id: str, task_id: str) -> Dict[str, Any]:
+    """
+    Carregador padrão: sem repositório de tarefas, a tarefa é só o seu ID.
+    """
+    return {"id": task_id}
+
+class SessionContext:
+    """
+    Contexto pré-carregado de uma sessão de chat.
+    """
+    
+    __slots__ = ("session_id", "user_id", "task_id", "task", "history",
+                 "prompt_prefix", "ready", "served", "opened_at")
+    
+    def __init__(self, session_id: str, user_id: str, task_id: Optional[str], history_size: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.task_id = task_id
+        self.task: Optional[Dict[str, Any]] = None
+        self.history = deque(maxlen=history_size)
+        self.prompt_prefix: Optional[str] = None
+        self.ready = asyncio.Event()
+        self.served = False
+        self.opened_at = time.time()
+        
+    def base_context(self) -> Dict[str, Any]:
+        """
+        Retorna a tarefa e o histórico recente, sem o prefixo do prompt.
+        """
+        context: Dict[str, Any] = {}
+        if self.task:
+            context["task"] = self.task
+        if self.history:
+            context["recent_history"] = list(self.history)
+        return context
+        
+    def context(self) -> Dict[str, Any]:
+        """
+        Retorna um instantâneo do contexto no formato esperado pelos agentes.
+        """
+        context = self.base_context()
+        if self.prompt_prefix is not None:
+            context["prompt_prefix"] = self.prompt_prefix
+        return context
+
+class ContextPrefetcher:
+    """
+    Cache LRU de contextos de sessão com pré-carregamento em segundo plano.
+    
+    Cada consulta é classificada como:
+    
+    - hit: o contexto já estava pronto
+    - pending: o pré-carregamento estava em andamento e foi aguardado
+    - miss: não houve pré-carregamento (ou a tarefa mudou); o contexto é
+      montado no caminho crítico
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 history_size: int = 10, task_loader: Optional[TaskLoader] = None,
+                 shared_store=None):
+        """
+        Inicializa o pré-carregador.
+        
+        Args:
+            maxsize: Número máximo de sessões mantidas
+            ttl: Tempo de vida de uma sessão sem uso, em segundos
+            history_size: Número de turnos mantidos no histórico recente
+            task_loader: Função que carrega os detalhes de uma tarefa
+            shared_store: Armazenamento compartilhado do estado das sessões (opcional)
+        """
+        self.sessions = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.history_size = history_size
+        self.task_loader = task_loader or default_task_loader
+        self.shared_store = shared_store
+        self._tasks: set = set()
+        self._stats = {"opened": 0, "hit": 0, "pending": 0, "miss": 0, "first_hit": 0, "first_total": 0,
+                       "restored": 0}
+        
+    def open(self, session_id: str, user_id: str, task_id: Optional[str], nlu_agent) -> SessionContext:
+        """
+        Registra a abertura de um chat e dispara o pré-carregamento.
+        
+        Não bloqueia: o contexto é montado em uma tarefa em segundo plano.
+        
+        Args:
+            session_id: ID da sessão de chat
+            user_id: ID do usuário
+            task_id: ID da tarefa do chat, se houver
+            nlu_agent: Agente NLU usado para montar o prefixo do prompt
+            
+        Returns:
+            SessionContext: Entrada da sessão (pronta quando `ready` for sinalizado)
+        """
+        entry = self.sessions.get(session_id)
+        if entry is not None and entry.user_id == user_id and entry.task_id == task_id:
+            # Chat reaberto: o contexto existente continua válido
+            return entry
+            
+        entry = SessionContext(session_id, user_id, task_id, self.history_size)
+        self.sessions.set(session_id, entry)
+        self._stats["opened"] += 1
+        
+        self._spawn(self._prefetch(entry, nlu_agent))
+        return entry
+        
+    async def get(self, session_id: str, user_id: str, task_id: Optional[str], nlu_agent) -> Dict[str, Any]:
+        """
+        Obtém o contexto de uma sessão para processar uma mensagem.
+        
+        Args:
+            session_id: ID da sessão de chat
+            user_id: ID do usuário
+            task_id: ID da tarefa ativa, se houver
+            nlu_agent: Agente NLU usado para montar o prefixo do prompt
+            
+        Returns:
+            Dict[str, Any]: Contexto da conversa
+        """
+        entry = self.sessions.get(session_id)
+        
+        # Contexto de outro usuário ou de outra tarefa nunca é reaproveitado
+        if entry is None or entry.user_id != user_id or (task_id and entry.task_id != task_id):
+            outcome = "miss"
+            entry = SessionContext(session_id, user_id, task_id, self.history_size)
+            self.sessions.set(session_id, entry)
+            await self._prefetch(entry, nlu_agent)
+        elif entry.ready.is_set():
+            outcome = "hit"
+        else:
+            outcome = "pending"
+            await entry.ready.wait()
+            
+        self._stats[outcome] += 1
+        if not entry.served:
+            entry.served = True
+            self._stats["first_total"] += 1
+            if outcome != "miss":
+                self._stats["first_hit"] += 1
+        record_metrics("context_prefetch", outcome, {})
+        
+        return entry.context()
+        
+    def remember(self, session_id: str, user_text: str, bot_text: str, nlu_agent,
+                 task: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Acrescenta um turno ao histórico da sessão e atualiza o prefixo do prompt.
+        
+        Args:
+            session_id: ID da sessão de chat
+            user_text: Mensagem do usuário
+            bot_text: Resposta enviada
+            nlu_agent: Agente NLU usado para montar o prefixo do prompt
+            task: Detalhes atualizados da tarefa, se houver
+        """
+        entry = self.sessions.get(session_id)
+        if entry is None or not entry.ready.is_set():
+            return
+            
+        if task is not None:
+            entry.task = task
+        entry.history.append({"user": user_text, "bot": bot_text})
+        entry.prompt_prefix = nlu_agent.prompt_prefix(entry.base_context())
+        
+        if self.shared_store is not None:
+            self._spawn(self._share(entry))
+        
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas de pré-carregamento.
+        
+        Returns:
+            Dict[str, Any]: Sessões, consultas por resultado e taxas de acerto
+        """
+        stats = self._stats
+        lookups = stats["hit"] + stats["pending"] + stats["miss"]
+        return {
+            "sessions": len(self.sessions),
+            "opened": stats["opened"],
+            "in_progress": len(self._tasks),
+            "lookups": {outcome: stats[outcome] for outcome in ("hit", "pending", "miss")},
+            "hit_rate": (stats["hit"] + stats["pending"]) / lookups if lookups else 0.0,
+            "first_message_hit_rate": stats["first_hit"] / stats["first_total"] if stats["first_total"] else 0.0,
+            "restored_from_shared": stats["restored"],
+            "evictions": self.sessions.evictions
+        }
+        
+    async def close(self) -> None:
+        """
+        Cancela os pré-carregamentos em andamento.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def _spawn(self, coroutine) -> None:
+        """
+        Executa uma corrotina em segundo plano, cancelada em `close`.
+        """
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _share(self, entry: SessionContext) -> None:
+        """
+        Grava a tarefa e o histórico da sessão no armazenamento compartilhado.
+        """
+        try:
+            await self.shared_store.save(f"session:{entry.session_id}", {
+                "user_id": entry.user_id,
+                "task_id": entry.task_id,
+                "task": entry.task,
+                "history": list(entry.history)
+            })
+        except Exception as e:
+            logger.warning(f"Falha ao compartilhar a sessão {entry.session_id}: {str(e)}")
+    
+    async def _restore(self, entry: SessionContext) -> bool:
+        """
+        Recupera a tarefa e o histórico gravados por outro worker ou nó.
+        
+        Returns:
+            bool: Se havia estado compartilhado da mesma sessão, usuário e tarefa
+        """
+        try:
+            state = await self.shared_store.load(f"session:{entry.session_id}")
+        except Exception as e:
+            logger.warning(f"Falha ao ler a sessão compartilhada {entry.session_id}: {str(e)}")
+            return False
+            
+        if not state or state.get("user_id") != entry.user_id or state.get("task_id") != entry.task_id:
+            return False
+            
+        entry.task = state.get("task")
+        entry.history.extend(state.get("history") or [])
+        self._stats["restored"] += 1
+        return True
+    
+    async def _prefetch(self, entry: SessionContext, nlu_agent) -> None:
+        """
+        Monta o contexto da sessão e aquece o agente NLU.
+        """
+        start_time = record_metrics("context_prefetch", "start", {})
+        try:
+            restored = self.shared_store is not None and await self._restore(entry)
+            if entry.task_id and not restored:
+                entry.task = await self.task_loader(entry.user_id, entry.task_id)
+                
+            # Garante o transporte pronto para a primeira chamada
+            if not nlu_agent.transport:
+                await nlu_agent.prepare()
+                
+            entry.prompt_prefix = nlu_agent.prompt_prefix(entry.base_context())
+        except Exception as e:
+            # Sem contexto pré-carregado, a mensagem segue com o que houver
+            logger.warning(f"Falha no pré-carregamento da sessão {entry.session_id}: {str(e)}")
+        finally:
+            entry.ready.set()
+            record_metrics("context_prefetch", "end", {}, start_time)
+
+# Pré-carregador compartilhado pelas rotas de chat
+context_prefetcher = ContextPrefetcher(
+    maxsize=settings.PREFETCH_MAX_SESSIONS,
+    ttl=settings.PREFETCH_TTL_SECONDS,
+    history_size=settings.CHAT_HISTORY_SIZE
+)
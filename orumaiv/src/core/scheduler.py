@@ -0,0 +1,341 @@
+"""
+Escalonador central das chamadas ao LLM.
+
+Todas as chamadas ao Gemini passam por este escalonador, que aplica:
+
+- classes de prioridade (interactive > background > batch), com vagas
+  reservadas para tráfego interativo
+- enfileiramento justo ponderado (WFQ) por usuário dentro de cada classe
+- um limite global de chamadas simultâneas, ajustado continuamente por um
+  algoritmo de limite adaptativo (src/core/limiter.py) a partir da latência
+  e dos erros observados
+- rejeição de chamadas que esperam na fila além do tempo máximo
+- métricas de tempo de espera na fila
+
+A prioridade e o usuário de uma chamada são definidos pelo chamador com
+`llm_call_context`, propagados por contextvars (como o ID de correlação).
+Chamadas que não representam o tráfego servido (ex: o NLU candidato da
+avaliação sombra) podem ficar fora das amostras do limite adaptativo.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
+
+from src.config.settings import settings
+from src.core.limiter import FixedLimit, create_limit
+from src.infrastructure.observability.metrics import record_metrics
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Classes de prioridade, da mais para a menos prioritária
+PRIORITY_CLASSES = ("interactive", "background", "batch")
+
+# Contexto da chamada corrente
+llm_priority = contextvars.ContextVar("llm_priority", default="interactive")
+llm_user = contextvars.ContextVar("llm_user", default="anonymous")
+llm_limit_sampling = contextvars.ContextVar("llm_limit_sampling", default=True)
+
+@contextmanager
+def llm_call_context(priority: str, user_id: Optional[str] = None,
+                     sample_limit: bool = True) -> Iterator[None]:
+    """
+    Define a prioridade e o usuário das chamadas ao LLM feitas no bloco.
+    
+    Tarefas criadas dentro do bloco herdam o contexto.
+    
+    Args:
+        priority: Uma das classes em PRIORITY_CLASSES
+        user_id: Usuário a quem a chamada é atribuída
+        sample_limit: Se a latência e os erros das chamadas alimentam o
+            limite adaptativo de concorrência
+    """
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Prioridade desconhecida: {priority}")
+        
+    priority_token = llm_priority.set(priority)
+    user_token = llm_user.set(user_id or "anonymous")
+    sampling_token = llm_limit_sampling.set(sample_limit)
+    try:
+        yield
+    finally:
+        llm_priority.reset(priority_token)
+        llm_user.reset(user_token)
+        llm_limit_sampling.reset(sampling_token)
+
+class LLMRejectedError(Exception):
+    """Chamada rejeitada por ter esperado demais por uma vaga."""
+    pass
+
+class _Waiter:
+    """Chamada aguardando uma vaga."""
+    
+    __slots__ = ("future", "priority", "user_id", "enqueued_at")
+    
+    def __init__(self, future: asyncio.Future, priority: str, user_id: str):
+        self.future = future
+        self.priority = priority
+        self.user_id = user_id
+        self.enqueued_at = time.time()
+
+class LLMScheduler:
+    """
+    Escalonador de chamadas ao LLM com prioridades e justiça por usuário.
+    
+    Dentro de cada classe, cada chamada recebe uma marca de término virtual
+    `max(relógio_virtual, último_término_do_usuário) + 1 / peso_do_usuário`;
+    a de menor marca é atendida primeiro, de modo que um usuário com muitas
+    chamadas não monopoliza a fila.
+    """
+    
+    def __init__(self, max_concurrency: int, interactive_reserved: int = 0,
+                 limit: Optional[FixedLimit] = None, max_wait: Optional[float] = None):
+        """
+        Inicializa o escalonador.
+        
+        Args:
+            max_concurrency: Limite global de chamadas simultâneas
+            interactive_reserved: Vagas que só podem ser usadas por chamadas interativas
+            limit: Algoritmo que ajusta o limite a partir de latência e erros
+            max_wait: Tempo máximo de espera na fila em segundos (None = sem limite)
+        """
+        self.limit = limit
+        self.max_concurrency = limit.limit if limit else max_concurrency
+        self.interactive_reserved = interactive_reserved
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._queues: Dict[str, List] = {priority: [] for priority in PRIORITY_CLASSES}
+        self._virtual_time: Dict[str, float] = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self._last_finish: Dict[str, Dict[str, float]] = {priority: {} for priority in PRIORITY_CLASSES}
+        self._weights: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._stats = {
+            priority: {"dispatched": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+            for priority in PRIORITY_CLASSES
+        }
+        
+    def set_user_weight(self, user_id: str, weight: float) -> None:
+        """
+        Define o peso de um usuário (padrão 1.0); pesos maiores recebem mais vazão.
+        """
+        if weight <= 0:
+            raise ValueError("O peso deve ser positivo")
+        self._weights[user_id] = weight
+    
+    def set_limit(self, limit: int) -> None:
+        """
+        Ajusta o limite global de chamadas simultâneas e libera chamadas em espera.
+        """
+        self.max_concurrency = max(limit, 1)
+        self._dispatch()
+        
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None, user_id: Optional[str] = None,
+                   kind: str = "default") -> AsyncIterator[None]:
+        """
+        Aguarda uma vaga para uma chamada ao LLM e a libera ao final do bloco.
+        
+        Args:
+            priority: Classe de prioridade (padrão: a do contexto corrente)
+            user_id: Usuário da chamada (padrão: o do contexto corrente)
+            kind: Tipo da chamada; o limite adaptativo compara a latência só
+                com a de chamadas do mesmo tipo
+        """
+        await self.acquire(priority or llm_priority.get(), user_id or llm_user.get())
+        sampled = llm_limit_sampling.get()
+        in_flight = self.in_flight
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if sampled:
+                self._sample(time.perf_counter() - start, in_flight, True, kind)
+            raise
+        else:
+            if sampled:
+                self._sample(time.perf_counter() - start, in_flight, False, kind)
+        finally:
+            self.release()
+    
+    async def acquire(self, priority: str, user_id: str) -> None:
+        """
+        Aguarda uma vaga, respeitando prioridade e justiça entre usuários.
+        
+        Raises:
+            LLMRejectedError: Se a espera ultrapassar `max_wait`
+        """
+        if self._can_start(priority) and not self._has_waiters(priority):
+            self.in_flight += 1
+            self._account(priority, 0.0)
+            return
+            
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(future, priority, user_id)
+        self._enqueue(waiter)
+        # Atende imediatamente se houver vaga (ex: fila só com chamadas canceladas)
+        self._dispatch()
+        
+        try:
+            # asyncio.wait não cancela o future no timeout, evitando corrida com _dispatch
+            await asyncio.wait((future,), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            future.cancel()
+            # A vaga pode ter sido concedida no mesmo instante do cancelamento
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+            
+        if not future.done():
+            future.cancel()
+            self.rejected += 1
+            record_metrics("llm_limiter", "rejected", {"priority": priority})
+            raise LLMRejectedError(
+                f"Chamada {priority} rejeitada após {self.max_wait}s aguardando vaga "
+                f"(limite atual: {self.max_concurrency})"
+            )
+            
+        wait = time.time() - waiter.enqueued_at
+        record_metrics("llm_scheduler_wait", "end", {"priority": priority}, waiter.enqueued_at)
+        self._account(priority, wait)
+    
+    def release(self) -> None:
+        """
+        Libera uma vaga e atende as próximas chamadas em espera.
+        """
+        self.in_flight -= 1
+        self._dispatch()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do escalonador e os tempos de espera por classe.
+        
+        Returns:
+            Dict[str, Any]: Vagas em uso, filas e estatísticas por prioridade
+        """
+        classes = {}
+        for priority in PRIORITY_CLASSES:
+            stats = self._stats[priority]
+            dispatched = stats["dispatched"]
+            classes[priority] = {
+                "queued": sum(1 for _, _, waiter in self._queues[priority] if not waiter.future.done()),
+                "dispatched": dispatched,
+                "wait_seconds_avg": stats["wait_seconds_total"] / dispatched if dispatched else 0.0,
+                "wait_seconds_max": stats["wait_seconds_max"]
+            }
+            
+        return {
+            "max_concurrency": self.max_concurrency,
+            "interactive_reserved": self._reserved(),
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "limiter": {
+                **(self.limit.state() if self.limit else {"algorithm": None}),
+                "dropped": self.dropped,
+                "max_wait_seconds": self.max_wait
+            },
+            "classes": classes
+        }
+    
+    def _sample(self, rtt: float, in_flight: int, dropped: bool, kind: str) -> None:
+        """
+        Alimenta o algoritmo de limite com uma amostra e aplica o novo limite.
+        """
+        if dropped:
+            self.dropped += 1
+        if self.limit is None:
+            return
+            
+        limit = self.limit.update(rtt, in_flight, dropped, kind)
+        if limit != self.max_concurrency:
+            logger.debug(f"Limite de concorrência do LLM: {self.max_concurrency} -> {limit}")
+            self.set_limit(limit)
+    
+    def _reserved(self) -> int:
+        """
+        Vagas reservadas para chamadas interativas dentro do limite atual.
+        """
+        return max(0, min(self.interactive_reserved, self.max_concurrency - 1))
+    
+    def _can_start(self, priority: str) -> bool:
+        """
+        Indica se uma chamada da classe pode ocupar uma vaga agora.
+        """
+        limit = self.max_concurrency
+        if priority != "interactive":
+            limit -= self._reserved()
+        return self.in_flight < limit
+    
+    def _has_waiters(self, priority: str) -> bool:
+        """
+        Indica se há chamadas de prioridade igual ou maior aguardando.
+        """
+        for current in PRIORITY_CLASSES:
+            if self._queues[current]:
+                return True
+            if current == priority:
+                return False
+        return False
+    
+    def _enqueue(self, waiter: _Waiter) -> None:
+        """
+        Insere a chamada na fila da sua classe com a marca de término virtual.
+        """
+        priority = waiter.priority
+        last_finish = self._last_finish[priority]
+        start = max(self._virtual_time[priority], last_finish.get(waiter.user_id, 0.0))
+        finish = start + 1.0 / self._weights.get(waiter.user_id, 1.0)
+        last_finish[waiter.user_id] = finish
+        heapq.heappush(self._queues[priority], (finish, next(self._sequence), waiter))
+        
+    def _dispatch(self) -> None:
+        """
+        Concede vagas às chamadas em espera, da maior para a menor prioridade.
+        """
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                finish, _, waiter = heapq.heappop(queue)
+                if waiter.future.done():
+                    # Chamada cancelada enquanto aguardava
+                    continue
+                    
+                self._virtual_time[priority] = finish
+                self.in_flight += 1
+                waiter.future.set_result(None)
+                
+            if not queue:
+                # Sem fila, as marcas por usuário não são mais necessárias
+                self._last_finish[priority].clear()
+            if queue:
+                # Classes de menor prioridade aguardam enquanto esta tiver fila
+                return
+    
+    def _account(self, priority: str, wait: float) -> None:
+        """
+        Atualiza as estatísticas de espera da classe.
+        """
+        stats = self._stats[priority]
+        stats["dispatched"] += 1
+        stats["wait_seconds_total"] += wait
+        stats["wait_seconds_max"] = max(stats["wait_seconds_max"], wait)
+
+# Escalonador compartilhado por todos os agentes do processo
+llm_scheduler = LLMScheduler(
+    settings.LLM_MAX_CONCURRENCY,
+    settings.LLM_INTERACTIVE_RESERVED,
+    limit=create_limit(
+        settings.LLM_LIMIT_ALGORITHM,
+        settings.LLM_LIMIT_INITIAL,
+        settings.LLM_LIMIT_MIN,
+        settings.LLM_MAX_CONCURRENCY
+    ),
+    max_wait=settings.LLM_MAX_QUEUE_WAIT_SECONDS or None
+)
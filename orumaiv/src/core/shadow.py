@@ -0,0 +1,365 @@
+"""
+Avaliação de configurações candidatas do NLU com tráfego sombra.
+
+Uma fração das mensagens de chat é enviada também a um NLU candidato
+(outro modelo, outro prompt ou um classificador local), depois que o NLU
+principal respondeu. O candidato roda em uma tarefa em segundo plano, com
+prioridade `batch` no escalonador de chamadas ao LLM, e o seu resultado
+nunca chega ao usuário: apenas é comparado com o principal.
+
+A resposta principal nunca espera pelo candidato:
+
+- `submit` é síncrono e O(1): sorteia a amostra e cria a tarefa
+- com `max_in_flight` avaliações em andamento, novas amostras são
+  descartadas (e contadas) em vez de enfileiradas
+- chamadas do candidato não ocupam as vagas reservadas ao tráfego interativo
+  nem alimentam o limite adaptativo de concorrência, e as métricas do
+  agente candidato ficam em séries próprias
+
+As comparações são agregadas em memória limitada: concordância de
+intenção (geral e por intenção principal), diferenças de entidades, e
+diferenças de latência e custo sobre as últimas amostras.
+"""
+
+import asyncio
+import importlib
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Dict, Any, Callable, Deque, List, Optional
+
+from src.agents.base_agent import BaseAgent
+from src.config.settings import settings
+from src.core.scheduler import llm_call_context
+from src.infrastructure.observability.metrics import record_metrics
+from src.infrastructure.observability.usage import estimate_cost
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Chave usada para intenções além do limite de intenções acompanhadas
+OTHER = "_other"
+
+def _percentiles(values) -> Dict[str, Optional[float]]:
+    """
+    Média e percentis 50/95/99 de uma amostra.
+    """
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[round(last * 0.50)],
+        "p95": ordered[round(last * 0.95)],
+        "p99": ordered[round(last * 0.99)]
+    }
+
+def entity_diff(primary: List[Dict[str, Any]], candidate: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Compara as entidades de dois resultados do NLU pelo nome.
+
+    Valores são comparados sem diferenciar maiúsculas e espaços nas pontas.
+
+    Args:
+        primary: Entidades do NLU principal
+        candidate: Entidades do candidato
+
+    Returns:
+        Dict[str, List[str]]: Nomes só no candidato (added), só no principal
+            (removed) e com valores diferentes (changed)
+    """
+    def by_name(entities) -> Dict[str, str]:
+        values = {}
+        for entity in entities or []:
+            if isinstance(entity, dict) and entity.get("name"):
+                values[str(entity["name"])] = str(entity.get("value", "")).strip().lower()
+        return values
+
+    before, after = by_name(primary), by_name(candidate)
+    return {
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+        "changed": sorted(name for name in before.keys() & after.keys() if before[name] != after[name])
+    }
+
+def _cost(response) -> Optional[float]:
+    """
+    Custo estimado da chamada de um resultado do NLU (None sem uso informado).
+    """
+    usage = response.metadata.get("usage")
+    if not usage:
+        return None
+    return estimate_cost(usage["model"], usage["prompt_tokens"], usage["response_tokens"])
+
+class ShadowEvaluator:
+    """
+    Envia amostras do tráfego ao NLU candidato e agrega as comparações.
+    """
+
+    def __init__(self, candidate_factory: Callable[[], Any], sample_rate: float, max_in_flight: int = 4,
+                 max_intents: int = 100, recent_size: int = 1000,
+                 rng: Optional[Callable[[], float]] = None):
+        """
+        Inicializa o avaliador.
+
+        Args:
+            candidate_factory: Cria o agente candidato, com a interface do
+                NLUAgent (`process(text, context)` retornando AgentResponse);
+                chamada na primeira amostra
+            sample_rate: Fração das mensagens avaliadas (0 a 1)
+            max_in_flight: Avaliações simultâneas; além disso, amostras são descartadas
+            max_intents: Intenções principais acompanhadas individualmente
+            recent_size: Amostras mantidas para os percentis de latência e custo
+            rng: Gerador de números em [0, 1) para o sorteio (padrão: random.random)
+        """
+        self.candidate_factory = candidate_factory
+        self.candidate = None
+        self.sample_rate = sample_rate
+        self.max_in_flight = max_in_flight
+        self.max_intents = max_intents
+        self._random = rng or random.random
+        self._tasks: set = set()
+        self._prepare_lock = asyncio.Lock()
+        self._counts = Counter()
+        self._intents: Dict[str, Counter] = {}
+        self._confusion = Counter()
+        self._entity_names = Counter()
+        self._latency: Dict[str, Deque[float]] = {
+            name: deque(maxlen=recent_size) for name in ("primary", "candidate", "delta")
+        }
+        self._cost: Dict[str, Deque[float]] = {
+            name: deque(maxlen=recent_size) for name in ("primary", "candidate", "delta")
+        }
+        self._disagreements: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def submit(self, text: str, context: Optional[Dict[str, Any]], primary) -> bool:
+        """
+        Sorteia a mensagem e, se amostrada, avalia o candidato em segundo plano.
+
+        Não bloqueia nem lança exceções: deve ser chamado no caminho crítico
+        logo após o NLU principal.
+
+        Args:
+            text: Texto do usuário
+            context: Contexto usado pelo NLU principal
+            primary: Resposta (AgentResponse) do NLU principal
+
+        Returns:
+            bool: Se a mensagem foi enviada ao candidato
+        """
+        if self.sample_rate <= 0 or self._random() >= self.sample_rate:
+            return False
+        if primary.content.get("intent") == "error":
+            # Sem resultado principal não há o que comparar
+            self._counts["skipped"] += 1
+            return False
+        if len(self._tasks) >= self.max_in_flight:
+            self._counts["dropped"] += 1
+            record_metrics("nlu_shadow", "dropped", {})
+            return False
+
+        # O prefixo do prompt foi montado pelo agente principal; o candidato
+        # monta o seu, já que o prompt pode ser justamente o que mudou
+        candidate_context = {key: value for key, value in (context or {}).items() if key != "prompt_prefix"}
+
+        # Chamadas do candidato ficam atrás do tráfego interativo no escalonador,
+        # e um candidato lento ou com falhas não reduz o limite do principal
+        with llm_call_context("batch", "shadow", sample_limit=False):
+            task = asyncio.create_task(self._evaluate(text, candidate_context, primary))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _evaluate(self, text: str, context: Dict[str, Any], primary) -> None:
+        """
+        Executa o candidato e registra a comparação.
+        """
+        try:
+            if self.candidate is None:
+                await self._prepare()
+            start_time = time.perf_counter()
+            candidate = await self.candidate.process(text, context)
+            elapsed = time.perf_counter() - start_time
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._counts["errors"] += 1
+            record_metrics("nlu_shadow", "error", {})
+            logger.warning(f"Falha na avaliação sombra do NLU: {str(e)}")
+            return
+
+        if candidate.content.get("intent") == "error":
+            self._counts["errors"] += 1
+            record_metrics("nlu_shadow", "error", {})
+            return
+
+        self.observe(primary, candidate, elapsed)
+
+    async def _prepare(self) -> None:
+        """
+        Cria e prepara o candidato (uma única vez).
+        """
+        async with self._prepare_lock:
+            if self.candidate is None:
+                candidate = self.candidate_factory()
+                if isinstance(candidate, BaseAgent):
+                    # Separa as métricas do candidato das do agente principal
+                    candidate.set_metric_labels(agent=f"{candidate.__class__.__name__}.shadow")
+                await candidate.prepare()
+                self.candidate = candidate
+
+    def observe(self, primary, candidate, candidate_elapsed: Optional[float] = None) -> None:
+        """
+        Agrega a comparação entre o resultado principal e o do candidato.
+
+        Args:
+            primary: Resposta do NLU principal
+            candidate: Resposta do candidato
+            candidate_elapsed: Tempo total do candidato, usado quando ele não
+                informa a latência da fase de compreensão (ex: classificador local)
+        """
+        primary_intent = str(primary.content.get("intent", "unknown"))
+        candidate_intent = str(candidate.content.get("intent", "unknown"))
+        agreed = primary_intent == candidate_intent
+
+        self._counts["compared"] += 1
+        self._counts["agreed"] += agreed
+        record_metrics("nlu_shadow", "agreed" if agreed else "disagreed", {})
+
+        key = primary_intent if primary_intent in self._intents or len(self._intents) < self.max_intents else OTHER
+        intent = self._intents.setdefault(key, Counter())
+        intent["compared"] += 1
+        intent["agreed"] += agreed
+        if not agreed:
+            pair = (key, candidate_intent) if len(self._confusion) < self.max_intents * 4 else (key, OTHER)
+            self._confusion[pair] += 1
+
+        diff = entity_diff(primary.content.get("entities"), candidate.content.get("entities"))
+        if any(diff.values()):
+            self._counts["entities_differ"] += 1
+            for kind, names in diff.items():
+                self._counts[f"entities_{kind}"] += len(names)
+                for name in names:
+                    if name in self._entity_names or len(self._entity_names) < self.max_intents:
+                        self._entity_names[name] += 1
+        else:
+            self._counts["entities_match"] += 1
+
+        if not agreed or any(diff.values()):
+            self._disagreements.append({
+                "timestamp": time.time(),
+                "primary_intent": primary_intent,
+                "candidate_intent": candidate_intent,
+                "entities": diff
+            })
+
+        # Latências só são comparáveis quando nenhum dos dois veio do cache
+        if primary.metadata.get("cached") or candidate.metadata.get("cached"):
+            self._counts["cached"] += 1
+        else:
+            primary_latency = primary.metadata.get("phase_latencies", {}).get("understanding")
+            candidate_latency = candidate.metadata.get("phase_latencies", {}).get("understanding", candidate_elapsed)
+            if primary_latency is not None and candidate_latency is not None:
+                self._latency["primary"].append(primary_latency)
+                self._latency["candidate"].append(candidate_latency)
+                self._latency["delta"].append(candidate_latency - primary_latency)
+
+        primary_cost, candidate_cost = _cost(primary), _cost(candidate)
+        if primary_cost is not None or candidate_cost is not None:
+            primary_cost, candidate_cost = primary_cost or 0.0, candidate_cost or 0.0
+            self._cost["primary"].append(primary_cost)
+            self._cost["candidate"].append(candidate_cost)
+            self._cost["delta"].append(candidate_cost - primary_cost)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna os agregados da avaliação.
+
+        Returns:
+            Dict[str, Any]: Amostras, concordância de intenção (geral, por
+                intenção e pares divergentes mais comuns), diferenças de
+                entidades, percentis de latência e custo, e divergências recentes
+        """
+        counts = self._counts
+        compared = counts["compared"]
+        return {
+            "enabled": self.sample_rate > 0,
+            "candidate": settings.SHADOW_NLU_AGENT or settings.SHADOW_NLU_MODEL_ID or settings.GEMINI_MODEL_ID,
+            "sample_rate": self.sample_rate,
+            "in_flight": len(self._tasks),
+            "samples": {
+                name: counts[name] for name in ("compared", "dropped", "skipped", "errors", "cached")
+            },
+            "intent_agreement": counts["agreed"] / compared if compared else None,
+            "by_intent": {
+                intent: {
+                    "compared": values["compared"],
+                    "agreement": values["agreed"] / values["compared"]
+                }
+                for intent, values in sorted(self._intents.items())
+            },
+            "top_disagreements": [
+                {"primary": primary, "candidate": candidate, "count": count}
+                for (primary, candidate), count in self._confusion.most_common(10)
+            ],
+            "entities": {
+                "match_rate": counts["entities_match"] / compared if compared else None,
+                "added": counts["entities_added"],
+                "removed": counts["entities_removed"],
+                "changed": counts["entities_changed"],
+                "top_names": dict(self._entity_names.most_common(10))
+            },
+            "latency_seconds": {name: _percentiles(values) for name, values in self._latency.items()},
+            "cost_usd": {name: _percentiles(values) for name, values in self._cost.items()},
+            "recent_disagreements": list(self._disagreements)
+        }
+
+    async def close(self) -> None:
+        """
+        Cancela as avaliações em andamento e libera o candidato.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.candidate is not None:
+            await self.candidate.cleanup()
+            self.candidate = None
+
+def load_candidate():
+    """
+    Cria o NLU candidato configurado.
+
+    SHADOW_NLU_AGENT (`módulo:atributo`) aponta para uma classe ou fábrica
+    sem argumentos (ex: um NLUAgent com outro `_prepare_prompt`, ou um
+    classificador local); sem ele, o candidato é o NLUAgent com o modelo
+    SHADOW_NLU_MODEL_ID.
+
+    Returns:
+        Agente candidato
+    """
+    if settings.SHADOW_NLU_AGENT:
+        module_name, _, attribute = settings.SHADOW_NLU_AGENT.partition(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+        return factory()
+
+    from src.agents.nlu_agent import NLUAgent
+
+    # O modo record gravaria no mesmo arquivo do agente principal
+    mode = settings.GEMINI_TRANSPORT_MODE
+    return NLUAgent(
+        name="nlu_shadow",
+        model_id=settings.SHADOW_NLU_MODEL_ID or None,
+        transport_mode="passthrough" if mode == "record" else mode
+    )
+
+# Avaliador compartilhado pelas rotas de chat (inativo com SHADOW_SAMPLE_RATE=0)
+shadow_evaluator = ShadowEvaluator(
+    load_candidate,
+    settings.SHADOW_SAMPLE_RATE,
+    max_in_flight=settings.SHADOW_MAX_IN_FLIGHT,
+    max_intents=settings.SHADOW_MAX_INTENTS,
+    recent_size=settings.SHADOW_RECENT_SAMPLES
+)
@@ -0,0 +1,492 @@
+"""
+Agregações colunares das tarefas para os dashboards.
+
+As tarefas de um usuário são carregadas uma vez em arrays NumPy (status e
+categoria codificados como inteiros, datas como datetime64[D]); agrupamentos
+e agregações por semana são feitos de forma vetorizada e retornados como
+séries prontas para os gráficos.
+
+Contagens por status, categoria e semana são mantidas incrementalmente a
+cada criação, alteração ou remoção de tarefa, de modo que dashboards
+repetidos não varrem todas as tarefas; só a tendência de atraso, que
+depende do dia corrente, é recalculada (e guardada até a próxima mudança).
+As colunas de um usuário que não está em memória (removido pelo LRU ou após
+um reinício) são recarregadas com `tasks_loader`.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega todas as tarefas de um usuário: (user_id) -> tarefas
+TasksLoader = Callable[[str], Awaitable[Iterable[Dict[str, Any]]]]
+
+# Status conhecidos, na ordem exibida nos gráficos
+STATUSES = ("pendente", "em andamento", "concluída")
+DEFAULT_STATUS = "pendente"
+DONE_STATUS = "concluída"
+DEFAULT_CATEGORY = "sem categoria"
+
+NAT = np.datetime64("NaT", "D")
+
+# 1970-01-01 foi uma quinta-feira: semanas começam na segunda
+_WEEK_OFFSET = 3
+
+def to_day(value: Any) -> np.datetime64:
+    """
+    Converte uma data (date, datetime ou texto ISO) para datetime64[D].
+
+    Returns:
+        np.datetime64: A data, ou NaT se ausente ou em formato não ISO
+            (ex: "amanhã", como extraído pelo NLU)
+    """
+    if isinstance(value, datetime):
+        return np.datetime64(value.date(), "D")
+    if isinstance(value, date):
+        return np.datetime64(value, "D")
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return np.datetime64(value[:10], "D")
+        except ValueError:
+            pass
+    return NAT
+
+def week_of(days: np.ndarray) -> np.ndarray:
+    """
+    Número da semana (segunda a domingo) de cada dia.
+    """
+    return (days.astype("int64") + _WEEK_OFFSET) // 7
+
+def week_start(week: int) -> np.datetime64:
+    """
+    Segunda-feira da semana.
+    """
+    return np.datetime64(week * 7 - _WEEK_OFFSET, "D")
+
+class _Vocabulary:
+    """
+    Codificação de rótulos (status, categorias) em inteiros.
+    """
+
+    def __init__(self, labels: Iterable[str] = ()):
+        self.labels: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+class UserTaskColumns:
+    """
+    Tarefas de um usuário em colunas, com as contagens agregadas.
+
+    Linhas de tarefas removidas ficam marcadas em `alive` e são compactadas
+    quando passam da metade do array.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.statuses = _Vocabulary(STATUSES)
+        self.categories = _Vocabulary((DEFAULT_CATEGORY,))
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.size = 0
+        self.removed = 0
+        self.version = 0
+        self._allocate(capacity)
+
+        self.status_counts: Counter = Counter()
+        self.category_counts: Counter = Counter()
+        self.created_weeks: Counter = Counter()
+        self.completed_weeks: Counter = Counter()
+        self._overdue_cache: Dict[Tuple[int, int, np.datetime64], Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def load(self, tasks: Iterable[Dict[str, Any]], today: Optional[np.datetime64] = None) -> None:
+        """
+        Carrega todas as tarefas de uma vez, substituindo o conteúdo atual.
+
+        Args:
+            tasks: Tarefas do usuário
+            today: Data usada para tarefas sem `created_at` (padrão: hoje)
+        """
+        today = today or np.datetime64(date.today(), "D")
+        rows = [self._encode(task, today) for task in tasks]
+
+        self.ids = [row[0] for row in rows]
+        self.rows = {task_id: index for index, task_id in enumerate(self.ids)}
+        self.size = len(rows)
+        self.removed = 0
+        self._allocate(max(64, self.size * 2))
+        if rows:
+            _, status, category, created, due, completed = zip(*rows)
+            n = self.size
+            self.status[:n] = status
+            self.category[:n] = category
+            self.created[:n] = created
+            self.due[:n] = due
+            self.completed[:n] = completed
+            self.alive[:n] = True
+        self._rebuild_rollups()
+
+    def upsert(self, task: Dict[str, Any], today: Optional[np.datetime64] = None) -> None:
+        """
+        Cria ou atualiza uma tarefa, ajustando as contagens agregadas.
+
+        Args:
+            task: Tarefa com `id` e, opcionalmente, `status`, `category`,
+                `created_at`, `due_date` e `completed_at`
+            today: Data usada para `created_at`/`completed_at` ausentes
+        """
+        today = today or np.datetime64(date.today(), "D")
+        task_id = str(task["id"])
+        row = self.rows.get(task_id)
+
+        if row is None:
+            if self.size == len(self.alive):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.ids.append(task_id)
+            self.rows[task_id] = row
+            self.alive[row] = True
+        else:
+            self._apply(row, -1)
+            # Datas já registradas valem quando a atualização não as traz
+            if not task.get("created_at"):
+                task = {**task, "created_at": str(self.created[row])}
+            if not task.get("completed_at") and not np.isnat(self.completed[row]):
+                task = {**task, "completed_at": str(self.completed[row])}
+
+        _, self.status[row], self.category[row], self.created[row], self.due[row], self.completed[row] = \
+            self._encode(task, today)
+        self._apply(row, 1)
+        self._changed()
+
+    def delete(self, task_id: str) -> bool:
+        """
+        Remove uma tarefa.
+
+        Returns:
+            bool: False se a tarefa não existia
+        """
+        row = self.rows.pop(str(task_id), None)
+        if row is None:
+            return False
+
+        self._apply(row, -1)
+        self.alive[row] = False
+        self.ids[row] = None
+        self.removed += 1
+        if self.removed > 32 and self.removed * 2 > self.size:
+            self._compact()
+        self._changed()
+        return True
+
+    def count_by(self, column: str) -> Dict[str, List]:
+        """
+        Agrupa e conta as tarefas por `status` ou `category` (varredura vetorizada).
+
+        Returns:
+            Dict[str, List]: Série com `labels` e `values`
+        """
+        vocabulary = self.statuses if column == "status" else self.categories
+        codes = getattr(self, column)[:self.size][self.alive[:self.size]]
+        counts = np.bincount(codes, minlength=len(vocabulary.labels))
+        return {"labels": list(vocabulary.labels), "values": counts.tolist()}
+
+    def by_status(self) -> Dict[str, List]:
+        """
+        Tarefas por status, a partir das contagens agregadas.
+        """
+        return self._series(self.statuses, self.status_counts)
+
+    def by_category(self) -> Dict[str, List]:
+        """
+        Tarefas por categoria, a partir das contagens agregadas.
+        """
+        return self._series(self.categories, self.category_counts)
+
+    def weekly(self, weeks: int, today: np.datetime64) -> Dict[str, List]:
+        """
+        Tarefas criadas e concluídas por semana e a taxa de conclusão.
+
+        Args:
+            weeks: Número de semanas, terminando na semana de `today`
+            today: Dia de referência
+
+        Returns:
+            Dict[str, List]: Séries `labels` (segunda-feira de cada semana),
+                `created`, `completed` e `completion_rate`
+        """
+        last = int(week_of(np.array([today]))[0])
+        week_range = range(last - weeks + 1, last + 1)
+        created = np.array([self.created_weeks.get(week, 0) for week in week_range], dtype=np.int64)
+        completed = np.array([self.completed_weeks.get(week, 0) for week in week_range], dtype=np.int64)
+        rate = np.divide(completed, created, out=np.zeros(weeks), where=created > 0)
+        return {
+            "labels": [str(week_start(week)) for week in week_range],
+            "created": created.tolist(),
+            "completed": completed.tolist(),
+            "completion_rate": np.round(rate, 4).tolist()
+        }
+
+    def overdue(self, weeks: int, today: np.datetime64) -> Dict[str, List]:
+        """
+        Tarefas atrasadas ao final de cada semana.
+
+        Uma tarefa está atrasada no início do dia t se venceu antes de t e
+        não foi concluída antes de t. Com as datas ordenadas, cada semana é
+        contada com duas buscas binárias:
+        `#(vencimento < t) - #(max(vencimento, conclusão) < t)`.
+
+        Args:
+            weeks: Número de semanas, terminando na semana de `today`
+            today: Dia de referência (a semana corrente é contada até hoje)
+
+        Returns:
+            Dict[str, List]: Séries `labels` e `values`
+        """
+        key = (self.version, weeks, today)
+        cached = self._overdue_cache.get(key)
+        if cached is not None:
+            return cached
+
+        alive = self.alive[:self.size]
+        due = self.due[:self.size][alive]
+        completed = self.completed[:self.size][alive]
+        has_due = ~np.isnat(due)
+        due_days = np.sort(due[has_due].astype("int64"))
+        done = has_due & ~np.isnat(completed)
+        resolved = np.sort(np.maximum(due[done], completed[done]).astype("int64"))
+
+        last = int(week_of(np.array([today]))[0])
+        week_range = np.arange(last - weeks + 1, last + 1)
+        # Fim de cada semana (dia seguinte ao domingo); a corrente termina amanhã
+        ends = np.minimum(week_range * 7 - _WEEK_OFFSET + 7, today.astype("int64") + 1)
+        values = np.searchsorted(due_days, ends, side="left") - np.searchsorted(resolved, ends, side="left")
+
+        result = {
+            "labels": [str(week_start(int(week))) for week in week_range],
+            "values": values.tolist()
+        }
+        self._overdue_cache = {key: result}
+        return result
+
+    def memory_bytes(self) -> int:
+        """
+        Memória ocupada pelas colunas.
+        """
+        return sum(column.nbytes for column in (
+            self.status, self.category, self.created, self.due, self.completed, self.alive
+        ))
+
+    def _encode(self, task: Dict[str, Any], today: np.datetime64) -> Tuple:
+        """
+        Converte uma tarefa na tupla de valores das colunas.
+        """
+        status = task.get("status") or DEFAULT_STATUS
+        completed = to_day(task.get("completed_at"))
+        if status == DONE_STATUS and np.isnat(completed):
+            completed = today
+        elif status != DONE_STATUS:
+            completed = NAT
+        created = to_day(task.get("created_at"))
+        return (
+            str(task["id"]),
+            self.statuses.code(status),
+            self.categories.code(task.get("category") or DEFAULT_CATEGORY),
+            today if np.isnat(created) else created,
+            to_day(task.get("due_date")),
+            completed
+        )
+
+    def _apply(self, row: int, delta: int) -> None:
+        """
+        Soma (delta=1) ou subtrai (delta=-1) a linha das contagens agregadas.
+        """
+        self.status_counts[int(self.status[row])] += delta
+        self.category_counts[int(self.category[row])] += delta
+        self.created_weeks[int(week_of(self.created[row:row + 1])[0])] += delta
+        if not np.isnat(self.completed[row]):
+            self.completed_weeks[int(week_of(self.completed[row:row + 1])[0])] += delta
+
+    def _rebuild_rollups(self) -> None:
+        """
+        Recalcula todas as contagens agregadas com uma varredura vetorizada.
+        """
+        alive = self.alive[:self.size]
+        self.status_counts = self._counter(self.status[:self.size][alive])
+        self.category_counts = self._counter(self.category[:self.size][alive])
+        self.created_weeks = self._counter(week_of(self.created[:self.size][alive]))
+        completed = self.completed[:self.size][alive]
+        self.completed_weeks = self._counter(week_of(completed[~np.isnat(completed)]))
+        self._changed()
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def _allocate(self, capacity: int) -> None:
+        self.status = np.zeros(capacity, dtype=np.int16)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.created = np.full(capacity, NAT)
+        self.due = np.full(capacity, NAT)
+        self.completed = np.full(capacity, NAT)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self) -> None:
+        """
+        Dobra a capacidade das colunas.
+        """
+        old = (self.status, self.category, self.created, self.due, self.completed, self.alive)
+        self._allocate(len(self.alive) * 2)
+        for target, source in zip(
+            (self.status, self.category, self.created, self.due, self.completed, self.alive), old
+        ):
+            target[:len(source)] = source
+
+    def _compact(self) -> None:
+        """
+        Descarta as linhas de tarefas removidas.
+        """
+        alive = self.alive[:self.size]
+        for name in ("status", "category", "created", "due", "completed"):
+            column = getattr(self, name)
+            kept = column[:self.size][alive]
+            column[:len(kept)] = kept
+        self.size = int(alive.sum())
+        self.alive[:] = False
+        self.alive[:self.size] = True
+        self.ids = [task_id for task_id in self.ids if task_id is not None]
+        self.rows = {task_id: index for index, task_id in enumerate(self.ids)}
+        self.removed = 0
+
+    @staticmethod
+    def _counter(values: np.ndarray) -> Counter:
+        keys, counts = np.unique(values, return_counts=True)
+        return Counter(dict(zip(keys.tolist(), counts.tolist())))
+
+    @staticmethod
+    def _series(vocabulary: _Vocabulary, counts: Counter) -> Dict[str, List]:
+        return {
+            "labels": list(vocabulary.labels),
+            "values": [counts.get(code, 0) for code in range(len(vocabulary.labels))]
+        }
+
+class DashboardEngine:
+    """
+    Colunas de tarefas de todos os usuários, limitadas por LRU.
+
+    Usuários removidos por LRU perdem as colunas; com `tasks_loader`, elas
+    são recarregadas no próximo acesso (ver `ensure_user`).
+    """
+
+    def __init__(self, max_users: int = 10000, tasks_loader: TasksLoader = None):
+        """
+        Args:
+            max_users: Número máximo de usuários com tarefas em memória
+            tasks_loader: Carrega todas as tarefas de um usuário
+        """
+        self._users = LRUCache(maxsize=max_users)
+        self.tasks_loader = tasks_loader
+
+    def load_user(self, user_id: str, tasks: Iterable[Dict[str, Any]]) -> None:
+        """
+        Carrega de uma vez todas as tarefas de um usuário.
+        """
+        columns = UserTaskColumns()
+        columns.load(tasks)
+        self._users.set(user_id, columns)
+
+    async def ensure_user(self, user_id: str) -> None:
+        """
+        Recarrega as colunas do usuário com `tasks_loader`, se não estiverem em memória.
+
+        Usuários sem tarefas não ocupam o LRU.
+        """
+        if user_id in self._users or self.tasks_loader is None:
+            return
+        try:
+            tasks = list(await self.tasks_loader(user_id))
+        except Exception as e:
+            logger.error(f"Falha ao carregar as tarefas do usuário {user_id}: {str(e)}")
+            return
+        # Outra chamada pode ter carregado as colunas durante o carregamento
+        if tasks and user_id not in self._users:
+            self.load_user(user_id, tasks)
+
+    def upsert(self, user_id: str, task: Dict[str, Any]) -> None:
+        """
+        Registra a criação ou alteração de uma tarefa.
+        """
+        self._columns(user_id).upsert(task)
+
+    def delete(self, user_id: str, task_id: str) -> bool:
+        """
+        Registra a remoção de uma tarefa.
+
+        Returns:
+            bool: False se a tarefa não estava carregada
+        """
+        columns = self._users.get(user_id)
+        return columns.delete(task_id) if columns is not None else False
+
+    def dashboard(self, user_id: str, weeks: int = 8, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Monta as séries do dashboard de um usuário.
+
+        Args:
+            user_id: ID do usuário
+            weeks: Número de semanas das séries temporais
+            today: Dia de referência (padrão: hoje)
+
+        Returns:
+            Dict[str, Any]: Séries por status, por categoria, semanais
+                (criadas, concluídas, taxa de conclusão) e de atraso
+        """
+        # Consultar um usuário sem tarefas não o insere no LRU
+        columns = self._users.get(user_id)
+        if columns is None:
+            columns = UserTaskColumns()
+        day = np.datetime64(today or date.today(), "D")
+        return {
+            "total": len(columns),
+            "by_status": columns.by_status(),
+            "by_category": columns.by_category(),
+            "weekly": columns.weekly(weeks, day),
+            "overdue": columns.overdue(weeks, day)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o número de usuários carregados e o uso do cache.
+        """
+        return {
+            "users": len(self._users),
+            "cache": self._users.stats()
+        }
+
+    def _columns(self, user_id: str) -> UserTaskColumns:
+        columns = self._users.get(user_id)
+        if columns is None:
+            columns = UserTaskColumns()
+            self._users.set(user_id, columns)
+        return columns
+
+# Motor compartilhado do processo
+dashboard_engine = DashboardEngine(settings.DASHBOARD_MAX_USERS)
@@ -0,0 +1,300 @@
+"""
+Índice de busca de tarefas em memória, por usuário.
+
+Atende a intenção `buscar_tarefa` sem varrer o banco: um índice invertido
+sobre título, descrição, categoria e data de cada tarefa, com tokenização
+em português sem acentos, busca por prefixo e ranking BM25. O índice é
+atualizado incrementalmente quando tarefas são criadas, alteradas ou
+removidas, e o de um usuário que não está em memória (removido pelo LRU
+ou após um reinício) é reconstruído com `tasks_loader`.
+"""
+
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+import logging
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Tuple
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega todas as tarefas de um usuário: (user_id) -> tarefas
+TasksLoader = Callable[[str], Awaitable[Iterable[Dict[str, Any]]]]
+
+# Peso de cada campo na frequência dos termos (BM25F simplificado)
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "category": 2.0,
+    "description": 1.0,
+    "due_date": 1.0
+}
+
+# Palavras sem valor de busca
+STOPWORDS = frozenset("""
+a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos
+por que se sem um uma umas uns me meu minha meus minhas
+""".split())
+
+# Palavras comuns nas consultas que não descrevem a tarefa
+QUERY_STOPWORDS = STOPWORDS | frozenset("""
+buscar busque busca procurar procure mostrar mostre listar liste ver quais qual tarefa tarefas
+""".split())
+
+# Datas ISO (2024-05-10) são indexadas como um único termo
+_TOKEN_RE = re.compile(r"\d{4}-\d{2}-\d{2}|[a-z0-9]+")
+
+# Parâmetros do BM25
+K1 = 1.2
+B = 0.75
+
+# Peso de um termo encontrado por prefixo em relação ao termo exato
+PREFIX_WEIGHT = 0.7
+
+# Máximo de termos expandidos por prefixo para cada termo da consulta
+MAX_PREFIX_EXPANSIONS = 32
+
+def normalize(text: str) -> str:
+    """
+    Converte para minúsculas e remove acentos.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def tokenize(text: str, stopwords: frozenset = STOPWORDS) -> List[str]:
+    """
+    Divide o texto em termos normalizados, sem stopwords.
+    
+    Args:
+        text: Texto em português
+        stopwords: Palavras descartadas
+        
+    Returns:
+        List[str]: Termos na ordem em que aparecem
+    """
+    return [token for token in _TOKEN_RE.findall(normalize(text)) if token not in stopwords]
+
+class UserTaskIndex:
+    """
+    Índice invertido das tarefas de um usuário.
+    """
+    
+    def __init__(self):
+        # termo -> {task_id: frequência ponderada}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        # Termos ordenados, para a busca por prefixo
+        self.terms: List[str] = []
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_length: Dict[str, float] = {}
+        self.total_length = 0.0
+        # Tarefas indexadas, para devolver os dados nos resultados
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+        
+    def upsert(self, task: Dict[str, Any]) -> None:
+        """
+        Indexa uma tarefa, substituindo a versão anterior.
+        
+        Args:
+            task: Tarefa com `id` e os campos de FIELD_WEIGHTS
+        """
+        task_id = str(task["id"])
+        self.delete(task_id)
+        
+        frequencies: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = task.get(field)
+            if value:
+                for token in tokenize(str(value)):
+                    frequencies[token] += weight
+                    
+        self.doc_terms[task_id] = frequencies
+        self.tasks[task_id] = dict(task)
+        length = sum(frequencies.values())
+        self.doc_length[task_id] = length
+        self.total_length += length
+        
+        for token, frequency in frequencies.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.terms, token)
+            posting[task_id] = frequency
+            
+    def delete(self, task_id: str) -> bool:
+        """
+        Remove uma tarefa do índice.
+        
+        Returns:
+            bool: False se a tarefa não estava indexada
+        """
+        frequencies = self.doc_terms.pop(task_id, None)
+        if frequencies is None:
+            return False
+            
+        self.total_length -= self.doc_length.pop(task_id)
+        del self.tasks[task_id]
+        for token in frequencies:
+            posting = self.postings[token]
+            del posting[task_id]
+            if not posting:
+                del self.postings[token]
+                del self.terms[bisect.bisect_left(self.terms, token)]
+        return True
+        
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Busca tarefas pelos termos da consulta, com prefixo e ranking BM25.
+        
+        Cada termo da consulta casa com o termo exato ou com termos que o
+        têm como prefixo (ex: "relat" encontra "relatorio"); por tarefa,
+        conta a melhor correspondência de cada termo.
+        
+        Args:
+            query: Texto da consulta
+            limit: Número máximo de resultados
+            
+        Returns:
+            List[Tuple[str, float]]: Pares (task_id, pontuação), do mais relevante
+        """
+        documents = len(self.doc_terms)
+        if not documents:
+            return []
+            
+        average_length = self.total_length / documents
+        scores: Dict[str, float] = {}
+        
+        for query_token in set(tokenize(query, QUERY_STOPWORDS)):
+            best: Dict[str, float] = {}
+            for term, weight in self._expand(query_token):
+                posting = self.postings[term]
+                idf = math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5))
+                for task_id, frequency in posting.items():
+                    norm = K1 * (1 - B + B * self.doc_length[task_id] / average_length)
+                    score = weight * idf * frequency * (K1 + 1) / (frequency + norm)
+                    if score > best.get(task_id, 0.0):
+                        best[task_id] = score
+            for task_id, score in best.items():
+                scores[task_id] = scores.get(task_id, 0.0) + score
+                
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        
+    def _expand(self, token: str) -> Iterable[Tuple[str, float]]:
+        """
+        Termos do índice que casam com um termo da consulta, com o seu peso.
+        """
+        index = bisect.bisect_left(self.terms, token)
+        expansions = 0
+        while index < len(self.terms) and expansions < MAX_PREFIX_EXPANSIONS:
+            term = self.terms[index]
+            if not term.startswith(token):
+                break
+            yield term, 1.0 if term == token else PREFIX_WEIGHT
+            index += 1
+            expansions += 1
+
+class TaskSearchIndex:
+    """
+    Índices de busca de todos os usuários, limitados por LRU.
+    
+    Usuários removidos por LRU perdem o índice; com `tasks_loader`, ele é
+    reconstruído a partir de todas as tarefas do usuário no próximo acesso
+    (ver `ensure_user`).
+    """
+    
+    def __init__(self, max_users: int = 10000, tasks_loader: TasksLoader = None):
+        """
+        Args:
+            max_users: Número máximo de usuários com índice em memória
+            tasks_loader: Carrega todas as tarefas de um usuário
+        """
+        self._users = LRUCache(maxsize=max_users)
+        self.tasks_loader = tasks_loader
+        
+    def index_user(self, user_id: str, tasks: Iterable[Dict[str, Any]]) -> None:
+        """
+        Reconstrói o índice de um usuário a partir de todas as suas tarefas.
+        """
+        index = UserTaskIndex()
+        for task in tasks:
+            index.upsert(task)
+        self._users.set(user_id, index)
+        
+    async def ensure_user(self, user_id: str) -> None:
+        """
+        Reconstrói o índice do usuário com `tasks_loader`, se não estiver em memória.
+        
+        Usuários sem tarefas não ocupam o LRU.
+        """
+        if user_id in self._users or self.tasks_loader is None:
+            return
+        try:
+            tasks = list(await self.tasks_loader(user_id))
+        except Exception as e:
+            logger.error(f"Falha ao carregar as tarefas do usuário {user_id}: {str(e)}")
+            return
+        # Outra chamada pode ter criado o índice durante o carregamento
+        if tasks and user_id not in self._users:
+            self.index_user(user_id, tasks)
+        
+    def upsert(self, user_id: str, task: Dict[str, Any]) -> None:
+        """
+        Indexa uma tarefa criada ou alterada.
+        
+        Args:
+            user_id: Dono da tarefa
+            task: Tarefa com `id`, `title` e, opcionalmente, `description`,
+                `category` e `due_date`
+        """
+        index = self._users.get(user_id)
+        if index is None:
+            index = UserTaskIndex()
+            self._users.set(user_id, index)
+        index.upsert(task)
+        
+    def delete(self, user_id: str, task_id: str) -> bool:
+        """
+        Remove uma tarefa excluída.
+        
+        Returns:
+            bool: False se a tarefa não estava indexada
+        """
+        index = self._users.get(user_id)
+        return index is not None and index.delete(str(task_id))
+        
+    def search(self, user_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Busca as tarefas de um usuário.
+        
+        Args:
+            user_id: ID do usuário
+            query: Texto da consulta
+            limit: Número máximo de resultados
+            
+        Returns:
+            List[Dict[str, Any]]: Tarefas encontradas com a pontuação em `score`
+        """
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        return [{**index.tasks[task_id], "score": score} for task_id, score in index.search(query, limit)]
+        
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o tamanho dos índices.
+        """
+        return {
+            "users": len(self._users),
+            "tasks": sum(len(index) for index in self._users.values()),
+            "cache": self._users.stats()
+        }
+
+# Índice compartilhado do processo
+task_search_index = TaskSearchIndex(settings.TASK_INDEX_MAX_USERS)
@@ -0,0 +1,3 @@
+"""
+Pacote de arquivamento colunar do histórico de conversas e resultados do NLU.
+"""
@@ -0,0 +1,237 @@
+"""
+Arquivo de conversas particionado por usuário e mês.
+
+As mensagens antigas (texto do usuário, resposta e resultado do NLU) são
+gravadas em segmentos colunares imutáveis (ver `segments.py`):
+
+    <raiz>/user=<user_id>/month=<AAAA-MM>/part-<início>-<hash>.seg
+
+Novos dados geram novos segmentos (o arquivo só cresce por acréscimo).
+
+Cada partição tem um manifesto (`_manifest.jsonl`) com a identidade das
+mensagens de cada segmento (instante, sessão e textos). Mensagens que já
+estão no arquivo são ignoradas, de modo que repetir o arquivamento (job
+interrompido, ou nova execução com um corte posterior sobre a mesma
+entrada) não as duplica. O nome de cada segmento é derivado das
+identidades que ele contém.
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+from urllib.parse import quote, unquote
+
+from src.infrastructure.archive.segments import SegmentReader, write_segment
+
+# Manifesto de cada partição: uma linha JSON por segmento, com as identidades das mensagens
+MANIFEST_NAME = "_manifest.jsonl"
+
+# Colunas que definem a identidade de uma mensagem
+KEY_COLUMNS = ("timestamp", "session_id", "user_text", "bot_text")
+
+def month_of(timestamp: float) -> str:
+    """
+    Mês (UTC) de um timestamp, no formato AAAA-MM.
+    """
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+
+def row_key(record: Dict[str, Any]) -> str:
+    """
+    Identidade estável de uma mensagem: instante (ms), sessão e textos.
+
+    Usa os valores como ficam gravados no segmento (ausentes viram vazios),
+    para que a mesma mensagem lida da entrada ou do arquivo tenha a mesma
+    identidade.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(repr((
+        round(record["timestamp"] * 1000), record.get("session_id") or "",
+        record.get("user_text") or "", record.get("bot_text") or ""
+    )).encode("utf-8"))
+    return digest.hexdigest()
+
+class ChatArchive:
+    """
+    Arquivo de mensagens em segmentos colunares.
+    """
+
+    def __init__(self, root: str, segment_max_rows: int = 65536):
+        """
+        Args:
+            root: Diretório raiz do arquivo
+            segment_max_rows: Número máximo de mensagens por segmento
+        """
+        self.root = Path(root)
+        self.segment_max_rows = segment_max_rows
+        # Mensagens ignoradas por já estarem arquivadas
+        self.duplicates = 0
+        self._archived: Dict[Path, Set[str]] = {}
+
+    def partition(self, user_id: str, month: str) -> Path:
+        """
+        Diretório da partição de um usuário em um mês.
+        """
+        return self.root / f"user={quote(str(user_id), safe='')}" / f"month={month}"
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> List[Path]:
+        """
+        Arquiva mensagens, agrupadas por usuário e mês.
+
+        Mensagens que já estão no arquivo (ou repetidas na entrada) são
+        ignoradas e contadas em `duplicates`.
+
+        Args:
+            records: Mensagens com `user_id`, `timestamp` (segundos) e os
+                campos de `segments.SCHEMA`
+
+        Returns:
+            List[Path]: Segmentos gravados
+        """
+        partitions: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            partitions[(str(record["user_id"]), month_of(record["timestamp"]))].append(record)
+
+        paths = []
+        for (user_id, month), rows in partitions.items():
+            directory = self.partition(user_id, month)
+            directory.mkdir(parents=True, exist_ok=True)
+            archived = self._archived_keys(directory)
+
+            fresh: Dict[str, Dict[str, Any]] = {}
+            for record in rows:
+                key = row_key(record)
+                if key not in archived and key not in fresh:
+                    fresh[key] = record
+            self.duplicates += len(rows) - len(fresh)
+
+            ordered = sorted(fresh.items(), key=lambda item: item[1]["timestamp"])
+            for start in range(0, len(ordered), self.segment_max_rows):
+                keys = [key for key, _ in ordered[start:start + self.segment_max_rows]]
+                chunk = [fresh[key] for key in keys]
+                path = directory / f"part-{round(chunk[0]['timestamp'] * 1000)}-{self._digest(keys)}.seg"
+                write_segment(str(path), chunk, {"user_id": user_id, "month": month})
+                # O manifesto só registra segmentos já gravados em disco
+                self._record(directory, path.name, keys)
+                archived.update(keys)
+                paths.append(path)
+        return paths
+
+    def segments(self, user_id: Optional[str] = None, months: Optional[Iterable[str]] = None) -> List[Path]:
+        """
+        Segmentos do arquivo, em ordem de usuário, mês e início.
+
+        Args:
+            user_id: Restringe a um usuário
+            months: Restringe a estes meses (AAAA-MM)
+        """
+        users = f"user={quote(str(user_id), safe='')}" if user_id is not None else "user=*"
+        paths = sorted(self.root.glob(f"{users}/month=*/part-*.seg"))
+        if months is not None:
+            wanted = {f"month={month}" for month in months}
+            paths = [path for path in paths if path.parent.name in wanted]
+        return paths
+
+    def users(self) -> List[str]:
+        """
+        Usuários com mensagens arquivadas.
+        """
+        return sorted(unquote(path.name[len("user="):]) for path in self.root.glob("user=*"))
+
+    def scan(self, user_id: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+             columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as mensagens arquivadas sob demanda, um segmento por vez.
+
+        Segmentos fora do intervalo são descartados pelo rodapé, sem ler as
+        colunas.
+
+        Args:
+            user_id: Restringe a um usuário
+            start: Timestamp inicial (inclusivo)
+            end: Timestamp final (exclusivo)
+            columns: Colunas a ler (padrão: todas); `timestamp` é sempre lida
+
+        Yields:
+            Dict[str, Any]: Mensagens com `user_id`, em ordem de tempo por partição
+        """
+        names = None
+        if columns is not None:
+            names = list(columns)
+            if "timestamp" not in names:
+                names.append("timestamp")
+
+        for path in self.segments(user_id):
+            with SegmentReader(str(path)) as reader:
+                footer = reader.footer
+                if not reader.rows:
+                    continue
+                if start is not None and footer["max_timestamp"] < start:
+                    continue
+                if end is not None and footer["min_timestamp"] >= end:
+                    continue
+                for record in reader.records(names):
+                    timestamp = record["timestamp"]
+                    if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                        record["user_id"] = footer["user_id"]
+                        yield record
+
+    def _archived_keys(self, directory: Path) -> Set[str]:
+        """
+        Identidades das mensagens já arquivadas em uma partição.
+
+        Lê o manifesto (descartando uma última linha incompleta) e inclui
+        os segmentos gravados sem entrada no manifesto, lendo as suas
+        colunas (execução interrompida entre o segmento e o manifesto).
+        """
+        keys = self._archived.get(directory)
+        if keys is not None:
+            return keys
+
+        keys = self._archived[directory] = set()
+        listed = set()
+        manifest = directory / MANIFEST_NAME
+        if manifest.exists():
+            valid_size = 0
+            with open(manifest, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    valid_size += len(raw)
+                    entry = json.loads(raw)
+                    listed.add(entry["segment"])
+                    keys.update(entry["keys"])
+            if valid_size != manifest.stat().st_size:
+                with open(manifest, "r+b") as f:
+                    f.truncate(valid_size)
+
+        for path in sorted(directory.glob("part-*.seg")):
+            if path.name not in listed:
+                with SegmentReader(str(path)) as reader:
+                    segment_keys = [row_key(record) for record in reader.records(KEY_COLUMNS)]
+                self._record(directory, path.name, segment_keys)
+                keys.update(segment_keys)
+        return keys
+
+    @staticmethod
+    def _record(directory: Path, segment: str, keys: List[str]) -> None:
+        """
+        Acrescenta um segmento ao manifesto da partição.
+        """
+        with open(directory / MANIFEST_NAME, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"segment": segment, "keys": keys}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _digest(keys: List[str]) -> str:
+        """
+        Hash das identidades das mensagens de um segmento, usado no nome do arquivo.
+        """
+        digest = hashlib.blake2b(digest_size=6)
+        for key in keys:
+            digest.update(key.encode("ascii"))
+        return digest.hexdigest()
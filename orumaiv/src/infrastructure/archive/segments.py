@@ -0,0 +1,278 @@
+"""
+Formato colunar de segmentos para o arquivo de conversas e resultados do NLU.
+
+Cada segmento é um arquivo imutável com as mensagens de um usuário em um
+mês, organizadas por coluna:
+
+    ORUMSEG1 | bloco | bloco | ... | rodapé JSON | tamanho do rodapé (u32) | ORUMSEG1
+
+- colunas numéricas (timestamp, confidence) e códigos de colunas
+  categóricas (intent, session_id, task_id) são gravados sem compressão,
+  alinhados a 8 bytes: o leitor os expõe como arrays NumPy sobre o mmap do
+  arquivo, sem cópia, para varreduras rápidas dos relatórios
+- colunas de texto (mensagens, entidades em JSON) são comprimidas com zlib
+  e descomprimidas só quando lidas
+
+O rodapé descreve as colunas, os dicionários das colunas categóricas e o
+intervalo de tempo do segmento.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"ORUMSEG1"
+FORMAT_VERSION = 1
+_FOOTER_SIZE = struct.Struct("<I")
+
+# Esquema das mensagens arquivadas: (coluna, tipo)
+#   timestamp: segundos desde a época, gravados como int64 em milissegundos
+#   float: float32 (NaN para ausente)
+#   category: string codificada em dicionário (int32, -1 para ausente)
+#   text: string UTF-8 comprimida (vazia para ausente)
+#   json: valor serializado em JSON e comprimido
+SCHEMA = (
+    ("timestamp", "timestamp"),
+    ("session_id", "category"),
+    ("task_id", "category"),
+    ("intent", "category"),
+    ("confidence", "float"),
+    ("user_text", "text"),
+    ("bot_text", "text"),
+    ("entities", "json"),
+)
+
+class SegmentFormatError(Exception):
+    """Arquivo que não é um segmento válido."""
+    pass
+
+def _encode_strings(values: Sequence[str]) -> tuple:
+    """
+    Concatena strings em UTF-8 com os deslocamentos de cada uma.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+def write_segment(path: str, records: Sequence[Dict[str, Any]], metadata: Dict[str, Any],
+                  level: int = 6) -> Dict[str, Any]:
+    """
+    Grava um segmento com as mensagens, de forma atômica.
+
+    Args:
+        path: Caminho do segmento
+        records: Mensagens no formato de SCHEMA, ordenadas por timestamp
+        metadata: Dados do particionamento gravados no rodapé (ex: user_id, month)
+        level: Nível de compressão zlib das colunas de texto
+
+    Returns:
+        Dict[str, Any]: Rodapé gravado
+    """
+    columns: Dict[str, Any] = {}
+    blocks: List[bytes] = []
+    position = len(MAGIC)
+
+    def add_block(data: bytes, dtype: Optional[str], codec: str, raw_length: int) -> Dict[str, Any]:
+        nonlocal position
+        padding = -position % 8
+        if padding:
+            blocks.append(b"\0" * padding)
+            position += padding
+        blocks.append(data)
+        block = {"offset": position, "length": len(data), "dtype": dtype, "codec": codec, "raw_length": raw_length}
+        position += len(data)
+        return block
+
+    for name, kind in SCHEMA:
+        values = [record.get(name) for record in records]
+        column: Dict[str, Any] = {"kind": kind}
+
+        if kind == "timestamp":
+            array = np.array([round(value * 1000) for value in values], dtype="<i8")
+            column["values"] = add_block(array.tobytes(), "<i8", "raw", array.nbytes)
+        elif kind == "float":
+            array = np.array([np.nan if value is None else value for value in values], dtype="<f4")
+            column["values"] = add_block(array.tobytes(), "<f4", "raw", array.nbytes)
+        elif kind == "category":
+            dictionary: Dict[str, int] = {}
+            codes = np.array(
+                [-1 if value is None else dictionary.setdefault(str(value), len(dictionary)) for value in values],
+                dtype="<i4"
+            )
+            column["dictionary"] = list(dictionary)
+            column["values"] = add_block(codes.tobytes(), "<i4", "raw", codes.nbytes)
+        else:
+            if kind == "json":
+                strings = [json.dumps(value, ensure_ascii=False) for value in values]
+            else:
+                strings = ["" if value is None else str(value) for value in values]
+            offsets, data = _encode_strings(strings)
+            column["offsets"] = add_block(offsets.astype("<i8").tobytes(), "<i8", "raw", offsets.nbytes)
+            column["values"] = add_block(zlib.compress(data, level), None, "zlib", len(data))
+
+        columns[name] = column
+
+    timestamps = [record["timestamp"] for record in records]
+    footer = {
+        **metadata,
+        "version": FORMAT_VERSION,
+        "rows": len(records),
+        "min_timestamp": min(timestamps) if timestamps else None,
+        "max_timestamp": max(timestamps) if timestamps else None,
+        "columns": columns
+    }
+    footer_bytes = json.dumps(footer, ensure_ascii=False).encode("utf-8")
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        for block in blocks:
+            f.write(block)
+        f.write(footer_bytes)
+        f.write(_FOOTER_SIZE.pack(len(footer_bytes)))
+        f.write(MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return footer
+
+class SegmentReader:
+    """
+    Leitor de um segmento via mmap.
+
+    Colunas numéricas e categóricas são arrays sobre o mmap (sem cópia);
+    colunas de texto são descomprimidas na primeira leitura e mantidas até
+    `close`. Use como context manager.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre o segmento e lê o rodapé.
+
+        Raises:
+            SegmentFormatError: Se o arquivo não for um segmento válido
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SegmentFormatError(f"Segmento vazio: {path}")
+
+        size = len(self._map)
+        tail = len(MAGIC) + _FOOTER_SIZE.size
+        if size < len(MAGIC) + tail or self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise SegmentFormatError(f"Arquivo não é um segmento: {path}")
+
+        (footer_length,) = _FOOTER_SIZE.unpack_from(self._map, size - tail)
+        footer_start = size - tail - footer_length
+        self.footer: Dict[str, Any] = json.loads(bytes(self._map[footer_start:size - tail]))
+        if self.footer.get("version") != FORMAT_VERSION:
+            self.close()
+            raise SegmentFormatError(f"Versão de segmento não suportada: {self.footer.get('version')}")
+        self.rows: int = self.footer["rows"]
+        self._decoded: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> "SegmentReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Libera o mmap e o arquivo.
+        """
+        self._decoded.clear()
+        if getattr(self, "_map", None) is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Arrays ainda referenciam o mmap; ele é liberado com eles
+                pass
+            self._map = None
+        self._file.close()
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Array de uma coluna numérica ou dos códigos de uma coluna categórica.
+
+        Não copia os dados: o array é uma visão do arquivo mapeado.
+
+        Args:
+            name: Nome da coluna (timestamp, confidence, intent, ...)
+
+        Returns:
+            np.ndarray: int64 (timestamp em ms), float32 ou int32 (códigos)
+        """
+        block = self.footer["columns"][name]["values"]
+        if block["codec"] != "raw":
+            raise ValueError(f"A coluna {name} não é numérica nem categórica")
+        return np.frombuffer(self._map, dtype=block["dtype"], count=block["raw_length"] // np.dtype(block["dtype"]).itemsize,
+                             offset=block["offset"])
+
+    def dictionary(self, name: str) -> List[str]:
+        """
+        Valores distintos de uma coluna categórica, na ordem dos códigos.
+        """
+        return self.footer["columns"][name]["dictionary"]
+
+    def strings(self, name: str) -> List[str]:
+        """
+        Valores de uma coluna de texto (descomprimida na primeira chamada).
+        """
+        decoded = self._decoded.get(name)
+        if decoded is None:
+            column = self.footer["columns"][name]
+            block = column["values"]
+            data = zlib.decompress(self._map[block["offset"]:block["offset"] + block["length"]])
+            offsets = np.frombuffer(self._map, dtype="<i8", count=self.rows + 1,
+                                    offset=column["offsets"]["offset"]).tolist()
+            decoded = self._decoded[name] = [
+                data[offsets[index]:offsets[index + 1]].decode("utf-8") for index in range(self.rows)
+            ]
+        return decoded
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Valores de uma coluna convertidos para tipos Python.
+        """
+        kind = self.footer["columns"][name]["kind"]
+        if kind == "timestamp":
+            return (self.array(name) / 1000.0).tolist()
+        if kind == "float":
+            # float32 tem ~7 dígitos significativos; o arredondamento evita 0.8999999761...
+            return [None if value != value else round(value, 6) for value in self.array(name).tolist()]
+        if kind == "category":
+            dictionary = self.dictionary(name)
+            return [dictionary[code] if code >= 0 else None for code in self.array(name).tolist()]
+        if kind == "json":
+            return [json.loads(value) for value in self.strings(name)]
+        return self.strings(name)
+
+    def records(self, columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as mensagens do segmento.
+
+        Args:
+            columns: Colunas a ler (padrão: todas); ler menos colunas evita
+                descomprimir os textos
+
+        Yields:
+            Dict[str, Any]: Uma mensagem por vez
+        """
+        names = list(columns) if columns is not None else [name for name, _ in SCHEMA]
+        values = [self.column(name) for name in names]
+        for row in range(self.rows):
+            yield {name: column[row] for name, column in zip(names, values)}
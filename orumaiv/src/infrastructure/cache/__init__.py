@@ -0,0 +1,3 @@
+"""
+Pacote de cache que contém implementações de cache em memória e distribuído.
+"""
@@ -0,0 +1,171 @@
+"""
+Armazenamento do estado de agentes hibernados.
+
+Agentes especialistas removidos da memória pelo registro de agentes têm o
+seu estado (`BaseAgent.snapshot()`) gravado aqui e restaurado quando
+voltam a ser usados.
+
+Estados podem ser gravados em um grupo (ex: as tarefas de um usuário), para
+que todos os estados do grupo sejam listados sem varrer o armazenamento.
+
+Há duas implementações: em memória (por processo) e Redis (compartilhada
+entre workers e nós, sobrevive a reinícios).
+"""
+
+import json
+import logging
+from typing import Dict, Any, Optional, Set
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+class MemoryHibernationStore:
+    """
+    Armazenamento de estados em memória, limitado e com TTL.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            max_entries: Número máximo de estados guardados
+            ttl: Tempo de vida dos estados em segundos
+        """
+        self._states = LRUCache(max_entries, ttl)
+        # Grupo -> chaves; as removidas pelo LRU saem na próxima listagem
+        self._groups: Dict[str, Set[str]] = {}
+        
+    async def save(self, key: str, state: Dict[str, Any], group: Optional[str] = None) -> None:
+        """
+        Grava o estado de um agente.
+        
+        Args:
+            key: Chave do agente no registro
+            state: Estado serializável em JSON
+            group: Grupo do estado, se houver
+        """
+        # Serializa para não compartilhar objetos mutáveis com o agente
+        self._states.set(key, json.dumps(state))
+        if group is not None:
+            self._groups.setdefault(group, set()).add(key)
+        
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém o estado de um agente hibernado.
+        
+        Args:
+            key: Chave do agente no registro
+            
+        Returns:
+            Optional[Dict[str, Any]]: Estado gravado, ou None se não houver
+        """
+        value = self._states.get(key)
+        return json.loads(value) if value is not None else None
+        
+    async def delete(self, key: str, group: Optional[str] = None) -> None:
+        """
+        Remove o estado de um agente.
+        """
+        self._states.pop(key)
+        members = self._groups.get(group)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self._groups[group]
+                
+    async def load_group(self, group: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtém todos os estados de um grupo.
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Estados gravados, por chave
+        """
+        states = {}
+        members = self._groups.get(group, set())
+        for key in list(members):
+            value = self._states.get(key)
+            if value is None:
+                members.discard(key)
+            else:
+                states[key] = json.loads(value)
+        if not members:
+            self._groups.pop(group, None)
+        return states
+
+class RedisHibernationStore:
+    """
+    Armazenamento de estados no Redis, compartilhado entre processos.
+    """
+    
+    def __init__(self, redis_uri: str, ttl: float):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            redis_uri: URI de conexão do Redis
+            ttl: Tempo de vida dos estados em segundos
+        """
+        import redis.asyncio as redis
+        
+        self._redis = redis.from_url(redis_uri, decode_responses=True)
+        self.ttl = int(ttl)
+        
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"agent_state:{key}"
+        
+    @staticmethod
+    def _group_key(group: str) -> str:
+        return f"agent_group:{group}"
+        
+    async def save(self, key: str, state: Dict[str, Any], group: Optional[str] = None) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), json.dumps(state), ex=self.ttl)
+            if group is not None:
+                pipe.sadd(self._group_key(group), key)
+                pipe.expire(self._group_key(group), self.ttl)
+            await pipe.execute()
+        
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._redis.get(self._key(key))
+        return json.loads(value) if value is not None else None
+        
+    async def delete(self, key: str, group: Optional[str] = None) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.delete(self._key(key))
+            if group is not None:
+                pipe.srem(self._group_key(group), key)
+            await pipe.execute()
+        
+    async def load_group(self, group: str) -> Dict[str, Dict[str, Any]]:
+        members = sorted(await self._redis.smembers(self._group_key(group)))
+        if not members:
+            return {}
+        values = await self._redis.mget([self._key(key) for key in members])
+        expired = [key for key, value in zip(members, values) if value is None]
+        if expired:
+            await self._redis.srem(self._group_key(group), *expired)
+        return {key: json.loads(value) for key, value in zip(members, values) if value is not None}
+
+# Instância única, criada sob demanda
+_store = None
+
+def get_hibernation_store():
+    """
+    Obtém o armazenamento de estados configurado.
+    
+    Returns:
+        MemoryHibernationStore ou RedisHibernationStore, conforme HIBERNATION_BACKEND
+    """
+    global _store
+    if _store is None:
+        if settings.HIBERNATION_BACKEND == "redis":
+            _store = RedisHibernationStore(settings.REDIS_URI, settings.HIBERNATION_TTL_SECONDS)
+        else:
+            _store = MemoryHibernationStore(settings.HIBERNATION_MAX_ENTRIES, settings.HIBERNATION_TTL_SECONDS)
+        logger.info(f"Armazenamento de agentes hibernados: {settings.HIBERNATION_BACKEND}")
+    return _store
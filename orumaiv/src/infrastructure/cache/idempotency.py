@@ -0,0 +1,220 @@
+"""
+Armazenamento de chaves de idempotência para mensagens de chat.
+
+Clientes que repetem uma requisição (ex: rede móvel instável) enviam a mesma
+chave; a resposta já calculada é devolvida sem uma nova passagem pelo NLU.
+Enquanto a primeira requisição está em andamento, as duplicadas aguardam o
+seu resultado em vez de recalcular. Cada chave guarda a impressão digital do
+corpo da requisição: reutilizar a chave com outro corpo é rejeitado.
+
+Há duas implementações: em memória (por processo) e Redis (compartilhada
+entre workers e nós).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Valor que marca uma chave em processamento no Redis
+_PENDING = "__pending__"
+
+class IdempotencyConflictError(Exception):
+    """A requisição original com a mesma chave não terminou dentro do prazo."""
+
+class IdempotencyKeyReusedError(Exception):
+    """A chave já foi usada com um corpo de requisição diferente."""
+
+def request_fingerprint(body: Dict[str, Any]) -> str:
+    """
+    Calcula a impressão digital do corpo de uma requisição.
+    
+    Args:
+        body: Campos da requisição que definem a resposta
+        
+    Returns:
+        str: Hash SHA-256 do corpo em JSON canônico
+    """
+    canonical = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class MemoryIdempotencyStore:
+    """
+    Armazenamento de idempotência em memória, limitado e com TTL.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float, wait_timeout: float):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            max_entries: Número máximo de respostas guardadas
+            ttl: Tempo de vida das respostas em segundos
+            wait_timeout: Tempo máximo de espera por uma requisição em andamento
+        """
+        # Chave -> (impressão digital, resposta) e (impressão digital, futuro)
+        self._completed = LRUCache(max_entries, ttl)
+        self._in_progress: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.wait_timeout = wait_timeout
+        
+    async def acquire(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Reserva a chave ou obtém a resposta já calculada.
+        
+        Args:
+            key: Chave de idempotência (já qualificada pelo usuário)
+            fingerprint: Impressão digital do corpo da requisição
+            
+        Returns:
+            Optional[Dict[str, Any]]: A resposta armazenada, ou None se o
+            chamador reservou a chave e deve processar a requisição
+            
+        Raises:
+            IdempotencyConflictError: Se a requisição original não terminar a tempo
+            IdempotencyKeyReusedError: Se a chave foi usada com outro corpo
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        
+        while True:
+            completed = self._completed.get(key)
+            if completed is not None:
+                stored_fingerprint, response = completed
+                if stored_fingerprint != fingerprint:
+                    raise IdempotencyKeyReusedError(key)
+                return response
+                
+            in_progress = self._in_progress.get(key)
+            if in_progress is None:
+                self._in_progress[key] = (fingerprint, loop.create_future())
+                return None
+            
+            pending_fingerprint, pending = in_progress
+            if pending_fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError(key)
+            
+            # Aguarda a requisição original; se ela falhar, tenta reservar de novo
+            remaining = deadline - loop.time()
+            try:
+                response = await asyncio.wait_for(asyncio.shield(pending), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise IdempotencyConflictError(key)
+            if response is not None:
+                return response
+                
+    async def complete(self, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+        """
+        Armazena a resposta e libera as requisições duplicadas em espera.
+        """
+        self._completed.set(key, (fingerprint, response))
+        in_progress = self._in_progress.pop(key, None)
+        if in_progress is not None and not in_progress[1].done():
+            in_progress[1].set_result(response)
+            
+    async def release(self, key: str) -> None:
+        """
+        Libera a chave sem resposta (a requisição falhou e pode ser repetida).
+        """
+        in_progress = self._in_progress.pop(key, None)
+        if in_progress is not None and not in_progress[1].done():
+            in_progress[1].set_result(None)
+
+class RedisIdempotencyStore:
+    """
+    Armazenamento de idempotência no Redis, compartilhado entre processos.
+    
+    A reserva usa `SET NX` com um marcador que expira em `pending_ttl` (o
+    processamento mais longo esperado, para não bloquear a chave se o worker
+    cair); as duplicadas consultam a chave periodicamente até a resposta ser
+    gravada. Marcador e resposta carregam a impressão digital do corpo.
+    """
+    
+    POLL_INTERVAL = 0.05
+    
+    def __init__(self, redis_uri: str, ttl: float, wait_timeout: float, pending_ttl: float):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            redis_uri: URI de conexão do Redis
+            ttl: Tempo de vida das respostas em segundos
+            wait_timeout: Tempo máximo de espera por uma requisição em andamento
+            pending_ttl: Tempo de vida do marcador de processamento em segundos
+        """
+        import redis.asyncio as redis
+        
+        self._redis = redis.from_url(redis_uri, decode_responses=True)
+        self.ttl = int(ttl)
+        self.wait_timeout = wait_timeout
+        self.pending_ttl = max(int(pending_ttl), int(wait_timeout) + 1)
+        
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"idempotency:{key}"
+        
+    async def acquire(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        redis_key = self._key(key)
+        marker = f"{_PENDING}:{fingerprint}"
+        
+        while True:
+            if await self._redis.set(redis_key, marker, nx=True, ex=self.pending_ttl):
+                return None
+                
+            value = await self._redis.get(redis_key)
+            if value is not None:
+                if value.startswith(_PENDING):
+                    if value != marker:
+                        raise IdempotencyKeyReusedError(key)
+                else:
+                    stored = json.loads(value)
+                    if stored["fingerprint"] != fingerprint:
+                        raise IdempotencyKeyReusedError(key)
+                    return stored["response"]
+                
+            if loop.time() >= deadline:
+                raise IdempotencyConflictError(key)
+            await asyncio.sleep(self.POLL_INTERVAL)
+            
+    async def complete(self, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+        value = json.dumps({"fingerprint": fingerprint, "response": response})
+        await self._redis.set(self._key(key), value, ex=self.ttl)
+        
+    async def release(self, key: str) -> None:
+        await self._redis.delete(self._key(key))
+
+# Instância única, criada sob demanda
+_store = None
+
+def get_idempotency_store():
+    """
+    Obtém o armazenamento de idempotência configurado.
+    
+    Returns:
+        MemoryIdempotencyStore ou RedisIdempotencyStore, conforme IDEMPOTENCY_BACKEND
+    """
+    global _store
+    if _store is None:
+        if settings.IDEMPOTENCY_BACKEND == "redis":
+            _store = RedisIdempotencyStore(
+                settings.REDIS_URI,
+                settings.IDEMPOTENCY_TTL_SECONDS,
+                settings.IDEMPOTENCY_WAIT_SECONDS,
+                settings.IDEMPOTENCY_PENDING_TTL_SECONDS
+            )
+        else:
+            _store = MemoryIdempotencyStore(
+                settings.IDEMPOTENCY_MAX_ENTRIES,
+                settings.IDEMPOTENCY_TTL_SECONDS,
+                settings.IDEMPOTENCY_WAIT_SECONDS
+            )
+        logger.info(f"Armazenamento de idempotência: {settings.IDEMPOTENCY_BACKEND}")
+    return _store
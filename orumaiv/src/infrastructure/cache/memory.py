@@ -0,0 +1,121 @@
+"""
+Módulo de cache em memória.
+
+Este módulo fornece um cache LRU limitado com expiração opcional por TTL,
+usado para resultados de NLU e outros dados quentes do processo.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+class LRUCache:
+    """
+    Cache LRU de tamanho limitado com TTL opcional.
+    
+    Não é thread-safe: deve ser usado a partir do event loop.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Inicializa o cache.
+        
+        Args:
+            maxsize: Número máximo de entradas
+            ttl: Tempo de vida das entradas em segundos (None para não expirar)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtém um valor do cache, atualizando sua posição LRU.
+        
+        Args:
+            key: Chave da entrada
+            default: Valor retornado se a chave não existir ou tiver expirado
+            
+        Returns:
+            Any: Valor armazenado ou o default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+            
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+            
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+        
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Armazena um valor, removendo a entrada menos usada se necessário.
+        
+        Args:
+            key: Chave da entrada
+            value: Valor a armazenar
+            ttl: TTL específico desta entrada (usa o TTL do cache se None)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+            
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove e retorna uma entrada.
+        """
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+        
+    def clear(self) -> None:
+        """
+        Remove todas as entradas.
+        """
+        self._data.clear()
+        
+    def values(self) -> List[Any]:
+        """
+        Retorna os valores não expirados, sem alterar as posições LRU.
+        """
+        now = time.monotonic()
+        return [value for value, expires_at in self._data.values() if expires_at is None or expires_at >= now]
+        
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] >= time.monotonic())
+        
+    def __len__(self) -> int:
+        return len(self._data)
+        
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de uso do cache.
+        
+        Returns:
+            Dict[str, Any]: Tamanho, acertos, falhas, taxa de acerto e remoções
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,113 @@
+"""
+Armazenamento compartilhado do estado de sessões.
+
+Com afinidade de sessão (src/core/affinity.py) o estado quente fica no
+processo que atende a sessão; o que precisa sobreviver a um remanejamento
+(nó adicionado ou removido, worker reiniciado) é gravado aqui e lido pelo
+novo dono na primeira mensagem.
+
+Há duas implementações: em memória (por processo, útil em desenvolvimento)
+e Redis (compartilhada entre workers e nós).
+"""
+
+import json
+import logging
+from typing import Dict, Any, Optional
+
+from src.config.settings import settings
+from src.infrastructure.cache.memory import LRUCache
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+class MemorySharedStore:
+    """
+    Armazenamento em memória, limitado e com TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            max_entries: Número máximo de valores guardados
+            ttl: Tempo de vida dos valores em segundos
+        """
+        self._values = LRUCache(max_entries, ttl)
+
+    async def save(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Grava um valor serializável em JSON.
+
+        Args:
+            key: Chave do valor (ex: session:<id>)
+            value: Valor a gravar
+        """
+        self._values.set(key, json.dumps(value))
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém um valor gravado.
+
+        Returns:
+            Optional[Dict[str, Any]]: Valor, ou None se não houver
+        """
+        value = self._values.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def delete(self, key: str) -> None:
+        """
+        Remove um valor.
+        """
+        self._values.pop(key)
+
+class RedisSharedStore:
+    """
+    Armazenamento no Redis, compartilhado entre workers e nós.
+    """
+
+    def __init__(self, redis_uri: str, ttl: float):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            redis_uri: URI de conexão do Redis
+            ttl: Tempo de vida dos valores em segundos
+        """
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_uri, decode_responses=True)
+        self.ttl = int(ttl)
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"shared_state:{key}"
+
+    async def save(self, key: str, value: Dict[str, Any]) -> None:
+        await self._redis.set(self._key(key), json.dumps(value), ex=self.ttl)
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._redis.get(self._key(key))
+        return json.loads(value) if value is not None else None
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self._key(key))
+
+# Instância única, criada sob demanda
+_store = None
+
+def get_shared_store():
+    """
+    Obtém o armazenamento compartilhado configurado.
+
+    Returns:
+        MemorySharedStore ou RedisSharedStore, conforme SHARED_STATE_BACKEND
+    """
+    global _store
+    if _store is None:
+        if settings.SHARED_STATE_BACKEND == "redis":
+            _store = RedisSharedStore(settings.REDIS_URI, settings.SHARED_STATE_TTL_SECONDS)
+        else:
+            _store = MemorySharedStore(settings.SHARED_STATE_MAX_ENTRIES, settings.SHARED_STATE_TTL_SECONDS)
+        logger.info(f"Armazenamento compartilhado de sessões: {settings.SHARED_STATE_BACKEND}")
+    return _store
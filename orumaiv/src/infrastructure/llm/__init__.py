@@ -0,0 +1,3 @@
+"""
+Pacote de integração com modelos de linguagem (transportes do Gemini).
+"""
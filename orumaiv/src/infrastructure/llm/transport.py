@@ -0,0 +1,305 @@
+"""
+Transportes para chamadas ao Gemini.
+
+Os agentes enviam prompts por meio de um transporte, que pode operar em
+três modos:
+
+- passthrough: chama o Gemini diretamente
+- record: chama o Gemini e grava pares prompt/resposta com latência
+- replay: responde a partir de uma gravação, sem acesso à rede
+
+As gravações são arquivos JSONL compactos e somente de acréscimo, uma
+chamada por linha.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
+import logging
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Modos de transporte suportados
+TRANSPORT_MODES = ("passthrough", "record", "replay")
+
+class ReplayMissError(LookupError):
+    """Nenhuma gravação corresponde ao prompt solicitado em modo replay."""
+
+class InFlightCalls:
+    """
+    Contador de chamadas ao modelo em andamento no processo.
+    
+    Permite que o desligamento aguarde (drene) as chamadas ao Gemini que
+    ainda estão em curso, inclusive as disparadas fora de uma requisição HTTP.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self._idle: Optional[asyncio.Event] = None
+        
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        """
+        Marca uma chamada como em andamento enquanto o bloco executa.
+        """
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            
+        self.count += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.count -= 1
+            if self.count == 0:
+                self._idle.set()
+                
+    async def drain(self, timeout: float) -> bool:
+        """
+        Aguarda o fim das chamadas em andamento.
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos
+            
+        Returns:
+            bool: True se todas as chamadas terminaram dentro do prazo
+        """
+        if self.count == 0:
+            return True
+            
+        logger.info(f"Aguardando {self.count} chamada(s) ao modelo em andamento...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.count} chamada(s) ao modelo não terminaram em {timeout}s")
+            return False
+
+# Chamadas ao modelo em andamento neste processo (compartilhado entre agentes)
+in_flight_calls = InFlightCalls()
+
+class RecordedResponse:
+    """
+    Resposta reconstruída a partir de uma gravação.
+    
+    Expõe os mesmos atributos usados da resposta do Gemini API
+    (`text`, `usage_metadata` e `model_version`).
+    """
+    
+    def __init__(self, text: str, model_version: str, usage: Optional[List[int]] = None):
+        prompt_tokens, response_tokens, total_tokens = usage or (0, 0, 0)
+        self.text = text
+        self.model_version = model_version
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+            total_token_count=total_tokens
+        )
+
+def recording_key(model_id: str, prompt: str, config: Dict[str, Any]) -> str:
+    """
+    Calcula a chave determinística de uma chamada.
+    
+    Args:
+        model_id: ID do modelo
+        prompt: Prompt enviado
+        config: Configuração de geração
+        
+    Returns:
+        str: Hash hexadecimal que identifica a chamada
+    """
+    payload = json.dumps([model_id, prompt, config], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def load_recordings(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê as gravações de um arquivo, ignorando linhas corrompidas.
+    
+    Args:
+        path: Caminho do arquivo de gravações
+        
+    Yields:
+        Dict[str, Any]: Uma gravação por chamada
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Uma linha truncada pode existir se o processo morreu durante a escrita
+                logger.warning(f"Gravação inválida ignorada em {path}:{line_number}")
+
+class GeminiTransport:
+    """
+    Transporte direto (passthrough) para o Gemini API.
+    """
+    
+    mode = "passthrough"
+    
+    def __init__(self, client, model_id: str):
+        """
+        Inicializa o transporte.
+        
+        Args:
+            client: Cliente `genai.Client` já configurado
+            model_id: ID do modelo a ser chamado
+        """
+        self.client = client
+        self.model_id = model_id
+        
+    async def generate(self, prompt: str, config: Dict[str, Any]):
+        """
+        Gera conteúdo fora do event loop.
+        
+        Args:
+            prompt: Prompt a ser enviado
+            config: Configuração de geração
+            
+        Returns:
+            Resposta do Gemini API
+        """
+        return await asyncio.to_thread(
+            self.client.models.generate_content,
+            model=self.model_id,
+            contents=prompt,
+            config=config
+        )
+        
+    async def close(self) -> None:
+        """
+        Libera recursos do transporte.
+        """
+        pass
+
+class RecordingTransport(GeminiTransport):
+    """
+    Transporte que chama o Gemini e grava cada par prompt/resposta.
+    """
+    
+    mode = "record"
+    
+    def __init__(self, client, model_id: str, path: str):
+        """
+        Inicializa o transporte de gravação.
+        
+        Args:
+            client: Cliente `genai.Client` já configurado
+            model_id: ID do modelo a ser chamado
+            path: Arquivo de gravações (aberto em modo de acréscimo)
+        """
+        super().__init__(client, model_id)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        
+    async def generate(self, prompt: str, config: Dict[str, Any]):
+        start_time = time.perf_counter()
+        response = await super().generate(prompt, config)
+        latency = time.perf_counter() - start_time
+        
+        usage = getattr(response, "usage_metadata", None)
+        record = {
+            "k": recording_key(self.model_id, prompt, config),
+            "m": getattr(response, "model_version", None) or self.model_id,
+            "p": prompt,
+            "c": config,
+            "r": response.text,
+            "u": [
+                getattr(usage, "prompt_token_count", None) or 0,
+                getattr(usage, "candidates_token_count", None) or 0,
+                getattr(usage, "total_token_count", None) or 0
+            ],
+            "l": round(latency * 1000, 1),
+            "t": round(time.time(), 3)
+        }
+        
+        # Uma linha por chamada; o flush mantém o arquivo íntegro em caso de queda
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        
+        return response
+        
+    async def close(self) -> None:
+        self._file.close()
+
+class ReplayTransport:
+    """
+    Transporte que responde de forma determinística a partir de gravações.
+    
+    Chamadas repetidas com o mesmo prompt percorrem as gravações na ordem
+    em que foram feitas, voltando ao início quando se esgotam.
+    """
+    
+    mode = "replay"
+    
+    def __init__(self, model_id: str, path: str, honour_latency: bool = False):
+        """
+        Inicializa o transporte de replay.
+        
+        Args:
+            model_id: ID do modelo (faz parte da chave das gravações)
+            path: Arquivo de gravações
+            honour_latency: Se True, aguarda a latência gravada antes de responder
+        """
+        self.model_id = model_id
+        self.honour_latency = honour_latency
+        self._recordings: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        
+        for record in load_recordings(path):
+            self._recordings[record["k"]].append(record)
+            
+        logger.info(f"Replay carregado com {len(self._recordings)} prompts distintos de {path}")
+        
+    async def generate(self, prompt: str, config: Dict[str, Any]) -> RecordedResponse:
+        key = recording_key(self.model_id, prompt, config)
+        records = self._recordings.get(key)
+        if not records:
+            raise ReplayMissError(f"Nenhuma gravação para o prompt {key}")
+            
+        cursor = self._cursors[key]
+        self._cursors[key] = cursor + 1
+        record = records[cursor % len(records)]
+        
+        if self.honour_latency:
+            await asyncio.sleep(record.get("l", 0) / 1000)
+            
+        return RecordedResponse(record["r"], record.get("m", self.model_id), record.get("u"))
+        
+    async def close(self) -> None:
+        pass
+
+def create_transport(mode: str, model_id: str, client=None, path: Optional[str] = None,
+                     honour_latency: bool = False):
+    """
+    Cria o transporte correspondente ao modo configurado.
+    
+    Args:
+        mode: passthrough, record ou replay
+        model_id: ID do modelo
+        client: Cliente `genai.Client` (obrigatório exceto em replay)
+        path: Arquivo de gravações (obrigatório em record e replay)
+        honour_latency: Respeita latências gravadas em replay
+        
+    Returns:
+        Transporte pronto para uso
+        
+    Raises:
+        ValueError: Se o modo for desconhecido
+    """
+    if mode == "passthrough":
+        return GeminiTransport(client, model_id)
+    if mode == "record":
+        return RecordingTransport(client, model_id, path)
+    if mode == "replay":
+        return ReplayTransport(model_id, path, honour_latency)
+        
+    raise ValueError(f"Modo de transporte desconhecido: {mode}. Use um de {TRANSPORT_MODES}")
@@ -85,7 +85,7 @@ def setup_logging(app: Optional[FastAPI] = None) -> None:
         app.add_middleware(LoggingMiddleware)
         
     # Log inicial
-    logging.info("Logging configurado", extras={"app_version": "0.1.0"})
+    logging.info("Logging configurado", extra={"extras": {"app_version": "0.1.0"}})
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     """
@@ -105,13 +105,13 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # Log da requisição
         logging.info(
             f"Requisição iniciada: {request.method} {request.url.path}",
-            extras={
+            extra={"extras": {
                 "correlation_id": correlation_id,
                 "method": request.method,
                 "path": request.url.path,
                 "query_params": str(request.query_params),
                 "client_host": request.client.host if request.client else None
-            }
+            }}
         )
         
         # Processa a requisição
@@ -124,13 +124,13 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             # Log da resposta
             logging.info(
                 f"Requisição completada: {request.method} {request.url.path} - {response.status_code}",
-                extras={
+                extra={"extras": {
                     "correlation_id": correlation_id,
                     "method": request.method,
                     "path": request.url.path,
                     "status_code": response.status_code,
                     "duration_seconds": duration
-                }
+                }}
             )
             
             return response
@@ -142,13 +142,13 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             # Log de erro
             logging.error(
                 f"Erro ao processar requisição: {request.method} {request.url.path}",
-                extras={
+                extra={"extras": {
                     "correlation_id": correlation_id,
                     "method": request.method,
                     "path": request.url.path,
                     "error": str(e),
                     "duration_seconds": duration
-                },
+                }},
                 exc_info=True
             )
             
@@ -0,0 +1,260 @@
+"""
+Monitor do event loop.
+
+Mede o atraso (lag) do event loop e, opcionalmente, detecta callbacks que
+o bloqueiam, capturando a pilha de execução do código que estava rodando.
+
+- Amostragem de lag: uma tarefa dorme `interval` segundos e mede quanto
+  além disso levou para acordar. Custa um despertar por intervalo.
+- Detector de bloqueio (opt-in): uma thread de vigia agenda um callback
+  no loop com `call_soon_threadsafe`; se ele não rodar dentro do limiar,
+  a pilha da thread do loop é capturada com `sys._current_frames()`.
+  Diferente do modo debug do asyncio, não instrumenta cada callback.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Any, Optional
+
+from src.config.settings import settings
+from src.infrastructure.observability.metrics import record_metrics
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Limites superiores dos buckets do histograma de lag, em milissegundos
+LAG_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class LagHistogram:
+    """
+    Histograma de lag com buckets fixos.
+    """
+    
+    def __init__(self, buckets: tuple = LAG_BUCKETS_MS):
+        self.buckets = buckets
+        # Último bucket: acima do maior limite
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        
+    def observe(self, value_ms: float) -> None:
+        """
+        Registra uma amostra em milissegundos.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+        
+    def quantile(self, q: float) -> float:
+        """
+        Estima um quantil pelo limite superior do bucket que o contém.
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(self.buckets[index]) if index < len(self.buckets) else self.max
+        return self.max
+        
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in self.buckets] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+class LoopMonitor:
+    """
+    Monitor de lag e de bloqueios do event loop de um processo.
+    """
+    
+    def __init__(self, interval: float = 0.5, blocking_detector: bool = False,
+                 blocking_threshold: float = 0.1, max_reports: int = 20, recent_samples: int = 120):
+        """
+        Inicializa o monitor.
+        
+        Args:
+            interval: Intervalo entre amostras de lag em segundos
+            blocking_detector: Ativa a captura de pilhas de callbacks lentos
+            blocking_threshold: Tempo bloqueado a partir do qual a pilha é capturada
+            max_reports: Número de capturas mantidas
+            recent_samples: Amostras mantidas para os quantis recentes (1 min com o intervalo padrão)
+        """
+        self.interval = interval
+        self.blocking_detector = blocking_detector
+        self.blocking_threshold = blocking_threshold
+        self.histogram = LagHistogram()
+        self.recent_samples = deque(maxlen=recent_samples)
+        self.last_lag_ms = 0.0
+        self.reports = deque(maxlen=max_reports)
+        self.blocked_count = 0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        
+    def start(self) -> None:
+        """
+        Inicia o monitor no event loop corrente.
+        """
+        if self._task is not None:
+            return
+            
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._task = loop.create_task(self._sample())
+        
+        if self.blocking_detector:
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                args=(loop, threading.get_ident()),
+                name="loop-blocking-detector",
+                daemon=True
+            )
+            self._watchdog.start()
+            
+    async def stop(self) -> None:
+        """
+        Interrompe o monitor.
+        """
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+            
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o histograma de lag e as últimas capturas de bloqueio.
+        
+        Returns:
+            Dict[str, Any]: Lag atual, histogramas total e recente e bloqueios
+        """
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "last_lag_ms": self.last_lag_ms,
+            "lag": self.histogram.to_dict(),
+            "recent_lag": self._recent_quantiles(),
+            "blocking_detector": {
+                "enabled": self.blocking_detector,
+                "threshold_seconds": self.blocking_threshold,
+                "blocked_count": self.blocked_count,
+                "reports": list(self.reports)
+            }
+        }
+        
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumo compacto para o health check básico.
+        """
+        return {
+            "last_lag_ms": self.last_lag_ms,
+            "recent_p99_ms": self._recent_quantiles()["p99_ms"],
+            "max_lag_ms": self.histogram.max,
+            "blocked_count": self.blocked_count
+        }
+        
+    def _recent_quantiles(self) -> Dict[str, Any]:
+        """
+        Quantis (nearest-rank) das amostras recentes.
+        """
+        samples = sorted(self.recent_samples)
+        if not samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "p50_ms": samples[math.ceil(0.5 * len(samples)) - 1],
+            "p99_ms": samples[math.ceil(0.99 * len(samples)) - 1],
+            "max_ms": samples[-1]
+        }
+        
+    async def _sample(self) -> None:
+        """
+        Mede o lag do loop continuamente.
+        """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - start - self.interval) * 1000)
+            self.last_lag_ms = lag_ms
+            self.histogram.observe(lag_ms)
+            self.recent_samples.append(lag_ms)
+            
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        """
+        Thread de vigia: detecta bloqueios e captura a pilha do loop.
+        """
+        while not self._stop.wait(self.blocking_threshold):
+            answered = threading.Event()
+            sent_at = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                # Loop encerrado
+                return
+                
+            if answered.wait(self.blocking_threshold):
+                continue
+                
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            
+            # Aguarda o loop voltar para medir a duração do bloqueio
+            while not answered.wait(0.05):
+                if self._stop.is_set():
+                    return
+            blocked_seconds = time.perf_counter() - sent_at
+            
+            # As métricas e o estado do monitor só são alterados no próprio loop
+            report = {
+                "at": time.time(),
+                "blocked_seconds": blocked_seconds,
+                "stack": [line.rstrip() for line in stack[-15:]]
+            }
+            try:
+                loop.call_soon_threadsafe(self._record_block, report)
+            except RuntimeError:
+                return
+            logger.warning(
+                f"Event loop bloqueado por {blocked_seconds * 1000:.0f}ms em: "
+                f"{stack[-1].strip() if stack else 'pilha indisponível'}"
+            )
+
+    def _record_block(self, report: Dict[str, Any]) -> None:
+        """
+        Registra um bloqueio detectado pela thread de vigia (executado no loop).
+        """
+        self.blocked_count += 1
+        self.reports.append(report)
+        record_metrics("event_loop", "blocked", {})
+
+# Monitor do processo (cada worker tem o seu)
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    blocking_detector=settings.LOOP_BLOCKING_DETECTOR,
+    blocking_threshold=settings.LOOP_BLOCKING_THRESHOLD_SECONDS,
+    max_reports=settings.LOOP_BLOCKING_MAX_REPORTS
+)
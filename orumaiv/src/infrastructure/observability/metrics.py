@@ -7,10 +7,14 @@ da aplicação.
 
 import time
 import asyncio
+import bisect
+import sys
 from typing import Dict, Any, Optional
 import logging
 from functools import wraps
 
+from src.infrastructure.observability.windows import windowed_metrics
+
 # Logger para este módulo
 logger = logging.getLogger(__name__)
 
@@ -58,15 +62,105 @@ logger = logging.getLogger(__name__)
 _metrics_cache = {
     "http_requests": {},
     "agent_calls": {},
-    "processing_times": {}
+    "processing_times": {},
+    "histograms": {},
+    "gauges": {}
 }
 
+# Buckets padrão de latência, em segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Chaves de rótulos já montadas, indexadas pelos pares (rótulo, valor)
+_label_keys: Dict[tuple, str] = {}
+# Limite do cache de chaves (rótulos como user_id têm alta cardinalidade)
+_LABEL_KEYS_MAX = 4096
+
+def _labels_key(labels: Dict[str, str]) -> str:
+    """
+    Chave textual de um conjunto de rótulos.
+    
+    As chaves são montadas uma vez e internadas: chamadas repetidas com os
+    mesmos rótulos não alocam novas strings.
+    """
+    items = tuple(labels.items())
+    key = _label_keys.get(items)
+    if key is None:
+        key = sys.intern("_".join([f"{k}:{v}" for k, v in sorted(items)]))
+        if len(_label_keys) >= _LABEL_KEYS_MAX:
+            _label_keys.clear()
+        _label_keys[items] = key
+    return key
+
+# Rótulos mantidos nas séries em janelas: cada série pré-aloca seus buffers,
+# então rótulos de alta cardinalidade (user_id, texto de erro) são descartados
+_WINDOW_LABELS = frozenset({"agent", "function", "intent", "kind", "phase", "priority"})
+
+# Chaves de rótulos das janelas, indexadas pelos pares (rótulo, valor)
+_window_label_keys: Dict[tuple, str] = {}
+
+def _window_labels_key(labels: Dict[str, str]) -> str:
+    """
+    Chave dos rótulos de baixa cardinalidade, usada nas séries em janelas.
+    """
+    items = tuple(labels.items())
+    key = _window_label_keys.get(items)
+    if key is None:
+        key = _labels_key({k: v for k, v in items if k in _WINDOW_LABELS})
+        if len(_window_label_keys) >= _LABEL_KEYS_MAX:
+            _window_label_keys.clear()
+        _window_label_keys[items] = key
+    return key
+
+def observe_histogram(metric_type: str, labels: Dict[str, str], value: float,
+                      buckets: tuple = LATENCY_BUCKETS) -> None:
+    """
+    Registra uma observação em um histograma de buckets fixos.
+    
+    Diferente das durações de `record_metrics`, a memória usada não cresce
+    com o número de observações.
+    
+    Args:
+        metric_type: Nome do histograma
+        labels: Rótulos para categorizar a métrica
+        value: Valor observado
+        buckets: Limites superiores dos buckets (o último bucket é +inf)
+    """
+    series = _metrics_cache["histograms"].setdefault(metric_type, {})
+    labels_key = _labels_key(labels)
+    histogram = series.get(labels_key)
+    if histogram is None:
+        histogram = series[labels_key] = {
+            "bounds": list(buckets),
+            "counts": [0] * (len(buckets) + 1),
+            "count": 0,
+            "sum": 0.0
+        }
+        
+    histogram["counts"][bisect.bisect_left(histogram["bounds"], value)] += 1
+    histogram["count"] += 1
+    histogram["sum"] += value
+    windowed_metrics.observe(metric_type, _window_labels_key(labels), value, buckets)
+
+def adjust_gauge(metric_type: str, labels: Dict[str, str], delta: float) -> None:
+    """
+    Soma `delta` a um gauge (ex: +1 ao iniciar, -1 ao terminar).
+    
+    Args:
+        metric_type: Nome do gauge
+        labels: Rótulos para categorizar a métrica
+        delta: Variação do valor
+    """
+    series = _metrics_cache["gauges"].setdefault(metric_type, {})
+    labels_key = _labels_key(labels)
+    series[labels_key] = series.get(labels_key, 0) + delta
+
 def record_metrics(metric_type: str, action: str, labels: Dict[str, str], 
                   start_time: Optional[float] = None) -> float:
     """
     Registra métricas para várias ações na aplicação.
     
-    Esta implementação inicial armazena as métricas em memória para análise simples.
+    Esta implementação inicial armazena as métricas em memória para análise simples,
+    acumuladas e em janelas deslizantes (ver `windows.py`).
     Quando a integração com Prometheus estiver pronta, ela substituirá esta implementação.
     
     Args:
@@ -80,15 +174,15 @@ def record_metrics(metric_type: str, action: str, labels: Dict[str, str],
     """
     current_time = time.time()
     
-    # Cria uma chave baseada nos rótulos
-    labels_key = "_".join([f"{k}:{v}" for k, v in sorted(labels.items())])
-    
     if action == "start":
         # Registra início de uma operação
-        logger.debug(f"[METRIC] {metric_type}.{action} - {labels_key}")
+        logger.debug("[METRIC] %s.%s - %s", metric_type, action, labels)
         return current_time
         
-    elif action == "end" and start_time:
+    # Cria uma chave baseada nos rótulos
+    labels_key = _labels_key(labels)
+    
+    if action == "end" and start_time:
         # Calcula e registra a duração de uma operação
         duration = current_time - start_time
         
@@ -99,8 +193,9 @@ def record_metrics(metric_type: str, action: str, labels: Dict[str, str],
             _metrics_cache["processing_times"][metric_type][labels_key] = []
             
         _metrics_cache["processing_times"][metric_type][labels_key].append(duration)
+        windowed_metrics.observe(metric_type, _window_labels_key(labels), duration, LATENCY_BUCKETS, current_time)
         
-        logger.debug(f"[METRIC] {metric_type}.{action} - {labels_key} - duration: {duration:.3f}s")
+        logger.debug("[METRIC] %s.%s - %s - duration: %.3fs", metric_type, action, labels_key, duration)
         
     elif action == "error":
         # Registra erro
@@ -114,8 +209,9 @@ def record_metrics(metric_type: str, action: str, labels: Dict[str, str],
             _metrics_cache[metric_type]["errors"][labels_key] = 0
             
         _metrics_cache[metric_type]["errors"][labels_key] += 1
+        windowed_metrics.count(f"{metric_type}.errors", _window_labels_key(labels), current_time)
         
-        logger.debug(f"[METRIC] {metric_type}.{action} - {labels_key}")
+        logger.debug("[METRIC] %s.%s - %s", metric_type, action, labels_key)
         
     else:
         # Incrementa contadores simples
@@ -129,8 +225,9 @@ def record_metrics(metric_type: str, action: str, labels: Dict[str, str],
             _metrics_cache[metric_type][action][labels_key] = 0
             
         _metrics_cache[metric_type][action][labels_key] += 1
+        windowed_metrics.count(f"{metric_type}.{action}", _window_labels_key(labels), current_time)
         
-        logger.debug(f"[METRIC] {metric_type}.{action} - {labels_key}")
+        logger.debug("[METRIC] %s.%s - %s", metric_type, action, labels_key)
     
     return current_time
     
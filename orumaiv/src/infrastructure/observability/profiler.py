@@ -0,0 +1,227 @@
+"""
+Profiler por amostragem de pilhas.
+
+Uma thread coleta periodicamente as pilhas de todas as threads do processo
+com `sys._current_frames()` e as agrega no formato "collapsed" (uma linha
+`frame;frame;frame contagem` por pilha), pronto para flamegraph.pl,
+speedscope ou inferno. O custo é proporcional à frequência de amostragem,
+e não ao volume de chamadas, e só existe enquanto uma sessão está ativa.
+
+Amostras da thread do event loop são marcadas com o ID de correlação da
+tarefa em execução (registrado pelas funções com @traced), permitindo
+isolar as requisições mais custosas.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional
+
+from src.infrastructure.observability import tracing
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Folhas (arquivo, função) de threads ociosas, aguardando trabalho ou I/O
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+
+class ProfilerBusyError(Exception):
+    """Já existe uma sessão de profiling em andamento."""
+    pass
+
+def _frame_label(frame) -> str:
+    """
+    Rótulo de um frame: `pacote/módulo.py:função`.
+    """
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, "/")
+    short = "/".join(path.rsplit("/", 2)[-2:])
+    return f"{short}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def _in_fraction(correlation_id: str, fraction: float) -> bool:
+    """
+    Decide de forma determinística se uma requisição está na fração amostrada.
+    """
+    digest = hashlib.blake2b(correlation_id.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 0xFFFFFFFF < fraction
+
+class ProfileSession:
+    """
+    Resultado de uma sessão de amostragem.
+    """
+    
+    def __init__(self, interval: float, fraction: Optional[float], correlation_id: Optional[str],
+                 include_idle: bool):
+        self.interval = interval
+        self.fraction = fraction
+        self.correlation_id = correlation_id
+        self.include_idle = include_idle
+        # (ID de correlação ou None, pilha colapsada) -> amostras
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+        
+    def collapsed(self, by_request: bool = False) -> str:
+        """
+        Gera a saída "collapsed", uma pilha por linha, mais frequentes primeiro.
+        
+        Args:
+            by_request: Inclui o ID de correlação como frame raiz
+        """
+        totals: Counter = Counter()
+        for (correlation_id, stack), count in self.stacks.items():
+            if by_request:
+                stack = f"correlation_id={correlation_id or '-'};{stack}"
+            totals[stack] += count
+        return "\n".join(f"{stack} {count}" for stack, count in totals.most_common()) + "\n"
+        
+    def to_dict(self, top: int = 50) -> Dict[str, Any]:
+        """
+        Resumo da sessão com as pilhas e as requisições mais amostradas.
+        """
+        by_request: Counter = Counter()
+        for (correlation_id, _), count in self.stacks.items():
+            if correlation_id:
+                by_request[correlation_id] += count
+                
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "stacks": [
+                {"correlation_id": correlation_id, "stack": stack, "count": count}
+                for (correlation_id, stack), count in self.stacks.most_common(top)
+            ],
+            "hot_requests": dict(by_request.most_common(top))
+        }
+
+class StackSampler:
+    """
+    Amostrador de pilhas do processo; uma sessão por vez.
+    """
+    
+    def __init__(self, max_depth: int = 64):
+        """
+        Args:
+            max_depth: Número máximo de frames por pilha
+        """
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+        
+    async def profile(self, seconds: float, interval: float = 0.01, fraction: Optional[float] = None,
+                      correlation_id: Optional[str] = None, include_idle: bool = False) -> ProfileSession:
+        """
+        Amostra o processo por `seconds` segundos sem bloquear o event loop.
+        
+        Args:
+            seconds: Duração da sessão
+            interval: Intervalo entre amostras em segundos
+            fraction: Fração das requisições (por ID de correlação) a manter;
+                amostras sem ID de correlação são descartadas
+            correlation_id: Mantém apenas as amostras desta requisição
+            include_idle: Mantém as amostras de threads ociosas
+            
+        Returns:
+            ProfileSession: Pilhas agregadas
+            
+        Raises:
+            ProfilerBusyError: Se já houver uma sessão em andamento
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError()
+            
+        loop = asyncio.get_running_loop()
+        loop_thread_id = threading.get_ident()
+        session = ProfileSession(interval, fraction, correlation_id, include_idle)
+        done = loop.create_future()
+        
+        def run() -> None:
+            try:
+                self._sample(session, seconds, loop, threading.get_ident(), loop_thread_id)
+            finally:
+                loop.call_soon_threadsafe(done.set_result, None)
+        
+        tracing.set_task_tagging(True)
+        try:
+            thread = threading.Thread(target=run, name="stack-sampler", daemon=True)
+            thread.start()
+            await asyncio.shield(done)
+        finally:
+            tracing.set_task_tagging(False)
+            self._lock.release()
+            
+        return session
+        
+    def _sample(self, session: ProfileSession, seconds: float, loop: asyncio.AbstractEventLoop,
+                sampler_thread_id: int, loop_thread_id: int) -> None:
+        """
+        Laço de amostragem, executado na thread do amostrador.
+        """
+        start = time.perf_counter()
+        deadline = start + seconds
+        thread_names = {}
+        
+        while time.perf_counter() < deadline:
+            if len(thread_names) != threading.active_count():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_thread_id:
+                    continue
+                self._record(session, thread_id, frame, thread_names, loop, loop_thread_id)
+                
+            time.sleep(session.interval)
+            
+        session.duration = time.perf_counter() - start
+        
+    def _record(self, session: ProfileSession, thread_id: int, frame, thread_names: Dict[int, str],
+                loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        """
+        Colapsa e registra a pilha de uma thread.
+        """
+        leaf = frame.f_code
+        leaf_key = (os.path.basename(leaf.co_filename), leaf.co_name)
+        if not session.include_idle and leaf_key in IDLE_LEAVES:
+            session.idle_samples += 1
+            return
+            
+        correlation_id = None
+        if thread_id == loop_thread_id:
+            task = asyncio.current_task(loop)
+            correlation_id = tracing.task_correlation.get(task) if task is not None else None
+            
+        if session.correlation_id and correlation_id != session.correlation_id:
+            return
+        if session.fraction is not None and (not correlation_id or not _in_fraction(correlation_id, session.fraction)):
+            return
+            
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+        
+        session.stacks[(correlation_id, ";".join(reversed(labels)))] += 1
+        session.samples += 1
+
+# Amostrador compartilhado do processo
+stack_sampler = StackSampler()
@@ -11,10 +11,16 @@ import asyncio
 from uuid import uuid4
 import contextvars
 import logging
+import weakref
 
 # Contexto para correlação
 correlation_id = contextvars.ContextVar('correlation_id', default=None)
 
+# Tarefa asyncio -> ID de correlação, para quem observa o loop de outra thread
+# (ex: o profiler); só é preenchido enquanto `task_tagging` estiver ativo
+task_correlation: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+task_tagging = False
+
 # Logger para este módulo
 logger = logging.getLogger(__name__)
 
@@ -63,10 +69,11 @@ def traced(span_name):
                 current_correlation_id = str(uuid4())
                 correlation_id.set(current_correlation_id)
             
+            if task_tagging:
+                task_correlation[asyncio.current_task()] = current_correlation_id
+            
             # Log de início da função
-            logger.debug(
-                f"[{current_correlation_id}] Starting {span_name} ({func.__name__})"
-            )
+            logger.debug("[%s] Starting %s (%s)", current_correlation_id, span_name, func.__name__)
             
             start_time = time.time()
             try:
@@ -74,9 +81,7 @@ def traced(span_name):
                 duration = time.time() - start_time
                 
                 # Log de conclusão da função
-                logger.debug(
-                    f"[{current_correlation_id}] Completed {span_name} in {duration:.3f}s"
-                )
+                logger.debug("[%s] Completed %s in %.3fs", current_correlation_id, span_name, duration)
                 
                 return result
             except Exception as e:
@@ -100,9 +105,7 @@ def traced(span_name):
                 correlation_id.set(current_correlation_id)
             
             # Log de início da função
-            logger.debug(
-                f"[{current_correlation_id}] Starting {span_name} ({func.__name__})"
-            )
+            logger.debug("[%s] Starting %s (%s)", current_correlation_id, span_name, func.__name__)
             
             start_time = time.time()
             try:
@@ -110,9 +113,7 @@ def traced(span_name):
                 duration = time.time() - start_time
                 
                 # Log de conclusão da função
-                logger.debug(
-                    f"[{current_correlation_id}] Completed {span_name} in {duration:.3f}s"
-                )
+                logger.debug("[%s] Completed %s in %.3fs", current_correlation_id, span_name, duration)
                 
                 return result
             except Exception as e:
@@ -146,4 +147,16 @@ def get_current_correlation_id() -> str:
     if not current_id:
         current_id = str(uuid4())
         correlation_id.set(current_id)
-    return current_id 
\ No newline at end of file
+    return current_id
+
+def set_task_tagging(enabled: bool) -> None:
+    """
+    Ativa ou desativa o registro tarefa -> ID de correlação.
+    
+    Args:
+        enabled: Se as funções com @traced devem registrar a tarefa corrente
+    """
+    global task_tagging
+    task_tagging = enabled
+    if not enabled:
+        task_correlation.clear()
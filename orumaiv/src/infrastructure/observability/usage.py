@@ -0,0 +1,165 @@
+"""
+Módulo de contabilização de uso de tokens e custo do Gemini.
+
+Este módulo extrai as contagens de tokens das respostas do Gemini e agrega
+o uso por usuário, intenção e modelo em rollups diários de tamanho limitado.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+
+from src.config.settings import settings
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Preço em USD por milhão de tokens (entrada e saída) de cada modelo
+MODEL_PRICING = {
+    "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
+    "gemini-2.0-flash-lite": {"input": 0.075, "output": 0.30},
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+    "gemini-1.5-pro": {"input": 1.25, "output": 5.00},
+}
+
+# Chave usada quando uma dimensão atinge o número máximo de chaves distintas
+OVERFLOW_KEY = "__outros__"
+
+# Dimensões de agregação
+DIMENSIONS = ("user", "intent", "model")
+
+# Rollups diários: data -> dimensão -> chave -> contadores
+_usage_rollups: "OrderedDict[str, Dict[str, Dict[str, Dict[str, float]]]]" = OrderedDict()
+
+def extract_usage(response, default_model: str) -> Dict[str, Any]:
+    """
+    Extrai contagens de tokens e o modelo de uma resposta do Gemini.
+    
+    Args:
+        response: Resposta do Gemini API
+        default_model: Modelo a ser usado quando a resposta não o informa
+        
+    Returns:
+        Dict[str, Any]: Modelo, tokens de prompt, de resposta e totais
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or 0
+    response_tokens = getattr(usage_metadata, "candidates_token_count", None) or 0
+    total_tokens = getattr(usage_metadata, "total_token_count", None) or (prompt_tokens + response_tokens)
+    
+    return {
+        "model": getattr(response, "model_version", None) or default_model,
+        "prompt_tokens": prompt_tokens,
+        "response_tokens": response_tokens,
+        "total_tokens": total_tokens
+    }
+
+def estimate_cost(model: str, prompt_tokens: int, response_tokens: int) -> float:
+    """
+    Estima o custo em USD de uma chamada.
+    
+    Args:
+        model: ID do modelo (versões como "gemini-2.0-flash-001" são aceitas)
+        prompt_tokens: Tokens de entrada
+        response_tokens: Tokens de saída
+        
+    Returns:
+        float: Custo estimado em USD, ou 0.0 se o modelo não tiver preço conhecido
+    """
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        # Procura pelo prefixo mais longo conhecido
+        for known_model in sorted(MODEL_PRICING, key=len, reverse=True):
+            if model.startswith(known_model):
+                pricing = MODEL_PRICING[known_model]
+                break
+                
+    if pricing is None:
+        return 0.0
+        
+    return (prompt_tokens * pricing["input"] + response_tokens * pricing["output"]) / 1_000_000
+
+def record_usage(usage: Optional[Dict[str, Any]], user_id: str, intent: str,
+                 latency: float = 0.0) -> None:
+    """
+    Agrega o uso de uma chamada no rollup do dia corrente.
+    
+    Args:
+        usage: Uso extraído com extract_usage (ignorado se None)
+        user_id: ID do usuário
+        intent: Intenção identificada
+        latency: Latência da chamada em segundos
+    """
+    if not usage:
+        return
+        
+    day = datetime.utcnow().date().isoformat()
+    rollup = _usage_rollups.get(day)
+    if rollup is None:
+        rollup = {dimension: {} for dimension in DIMENSIONS}
+        _usage_rollups[day] = rollup
+        
+        # Mantém apenas os dias mais recentes
+        while len(_usage_rollups) > settings.USAGE_RETENTION_DAYS:
+            _usage_rollups.popitem(last=False)
+    
+    model = usage.get("model", "unknown")
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    response_tokens = usage.get("response_tokens", 0)
+    cost = estimate_cost(model, prompt_tokens, response_tokens)
+    
+    for dimension, key in (("user", user_id), ("intent", intent), ("model", model)):
+        entries = rollup[dimension]
+        
+        if key not in entries:
+            # Limita a cardinalidade de cada dimensão
+            if len(entries) >= settings.USAGE_MAX_KEYS:
+                key = OVERFLOW_KEY
+            entries.setdefault(key, {
+                "requests": 0,
+                "prompt_tokens": 0,
+                "response_tokens": 0,
+                "total_tokens": 0,
+                "cost_usd": 0.0,
+                "latency_seconds": 0.0
+            })
+            
+        entry = entries[key]
+        entry["requests"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["response_tokens"] += response_tokens
+        entry["total_tokens"] += usage.get("total_tokens", prompt_tokens + response_tokens)
+        entry["cost_usd"] += cost
+        entry["latency_seconds"] += latency
+        
+    logger.debug("[USAGE] %s %s %s - %s/%s tokens", user_id, intent, model, prompt_tokens, response_tokens)
+
+def get_usage_summary(days: int = 7) -> Dict[str, Any]:
+    """
+    Retorna os rollups diários de uso dos últimos dias.
+    
+    Args:
+        days: Número de dias a retornar
+        
+    Returns:
+        Dict[str, Any]: Rollups por dia e totais do período
+    """
+    selected_days = list(_usage_rollups.keys())[-days:] if days > 0 else []
+    
+    totals = {
+        "requests": 0,
+        "prompt_tokens": 0,
+        "response_tokens": 0,
+        "total_tokens": 0,
+        "cost_usd": 0.0
+    }
+    for day in selected_days:
+        for entry in _usage_rollups[day]["model"].values():
+            for field in totals:
+                totals[field] += entry[field]
+    
+    return {
+        "days": {day: _usage_rollups[day] for day in selected_days},
+        "totals": totals
+    }
@@ -0,0 +1,290 @@
+"""
+Métricas em janelas de tempo deslizantes.
+
+Complementa o cache de métricas acumuladas desde o início do processo
+(`metrics._metrics_cache`) com buffers circulares em três resoluções:
+
+- 1s, cobrindo os últimos 5 minutos
+- 10s, cobrindo a última hora
+- 1min, cobrindo as últimas 24 horas
+
+Cada série (métrica + rótulos) guarda por intervalo a contagem, a soma e,
+para histogramas, as contagens por bucket, em buffers pré-alocados de
+tamanho fixo (cerca de 34 KB por contador e 250 KB por histograma com os
+buckets de latência). Consultas sobre uma janela usam a resolução mais fina
+que a cobre e retornam taxas e percentis; a janela inteira de um buffer
+(5 min, 1 h ou 24 h) usa totais mantidos a cada observação, e as demais
+somam os intervalos de forma vetorizada. O número de séries agregadas por
+consulta é limitado.
+
+Só os rótulos de baixa cardinalidade entram nas séries (ver
+`metrics._WINDOW_LABELS`); contagens por usuário ficam apenas no cache
+acumulado.
+"""
+
+import bisect
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+
+# (resolução em segundos, número de intervalos mantidos)
+RESOLUTIONS = ((1, 300), (10, 360), (60, 1440))
+
+# Janela máxima consultável
+MAX_WINDOW_SECONDS = RESOLUTIONS[-1][0] * RESOLUTIONS[-1][1]
+
+class _Ring:
+    """
+    Buffer circular pré-alocado de intervalos de uma resolução.
+
+    O intervalo da época `e` ocupa a linha `e % size` de uma matriz
+    `size x width` em um `array('d')`: `[contagem, soma, bucket_0, ...,
+    bucket_n]`. As escritas são feitas no array; as leituras de várias
+    linhas, por uma visão NumPy sobre a mesma memória. `totals` acumula
+    todas as linhas do buffer, de modo que a janela do buffer inteiro é
+    respondida sem percorrê-lo.
+    """
+
+    __slots__ = ("resolution", "size", "width", "head", "data", "rows", "epochs", "epoch_rows", "totals")
+
+    def __init__(self, resolution: int, size: int, width: int):
+        self.resolution = resolution
+        self.size = size
+        self.width = width
+        # Época mais recente já incluída no buffer
+        self.head: Optional[int] = None
+        self.data = array("d", bytes(8 * size * width))
+        self.rows = np.frombuffer(self.data, dtype=np.float64).reshape(size, width)
+        # Época de cada linha (-1: nunca usada)
+        self.epochs = array("q", [-1]) * size
+        self.epoch_rows = np.frombuffer(self.epochs, dtype=np.int64)
+        self.totals = [0.0] * width
+
+    def advance(self, epoch: int) -> None:
+        """
+        Avança o buffer até `epoch`, zerando as linhas que saíram dele.
+        """
+        if self.head is not None and epoch <= self.head:
+            return
+        first = epoch - self.size + 1 if self.head is None else max(self.head + 1, epoch - self.size + 1)
+        if epoch - first < 8:
+            # Caso comum (poucos intervalos novos): sem o custo fixo do NumPy
+            data, totals, width = self.data, self.totals, self.width
+            for expired in range(first, epoch + 1):
+                position = expired % self.size
+                base = position * width
+                if data[base]:
+                    for index in range(width):
+                        totals[index] -= data[base + index]
+                        data[base + index] = 0.0
+                self.epochs[position] = expired
+        else:
+            positions = np.arange(first, epoch + 1) % self.size
+            stale = self.rows[positions].sum(axis=0)
+            for index in range(self.width):
+                self.totals[index] -= float(stale[index])
+            self.rows[positions] = 0.0
+            self.epoch_rows[positions] = np.arange(first, epoch + 1)
+        self.head = epoch
+
+    def add(self, now: float, bucket: Optional[int], value: float) -> None:
+        """
+        Registra uma observação no intervalo de `now`.
+        """
+        epoch = int(now // self.resolution)
+        if self.head is None or epoch > self.head:
+            self.advance(epoch)
+        elif epoch <= self.head - self.size:
+            # Anterior ao buffer: não há onde registrá-la
+            return
+        base = (epoch % self.size) * self.width
+        data = self.data
+        totals = self.totals
+        data[base] += 1
+        data[base + 1] += value
+        totals[0] += 1
+        totals[1] += value
+        if bucket is not None:
+            data[base + bucket] += 1
+            totals[bucket] += 1
+
+    def collect(self, now: float, window: float) -> List[float]:
+        """
+        Soma, coluna a coluna, os intervalos dentro da janela que termina em `now`.
+        """
+        current = int(now // self.resolution)
+        intervals = max(1, int(round(window / self.resolution)))
+        if intervals >= self.size and current == self.head:
+            return list(self.totals)
+        oldest = current - intervals
+        mask = (self.epoch_rows > oldest) & (self.epoch_rows <= current)
+        return self.rows[mask].sum(axis=0).tolist()
+
+class WindowedSeries:
+    """
+    Série de uma métrica com rótulos, nas três resoluções.
+    """
+
+    __slots__ = ("buckets", "rings", "width")
+
+    def __init__(self, buckets: Sequence[float] = ()):
+        """
+        Args:
+            buckets: Limites superiores dos buckets (vazio para contadores)
+        """
+        self.buckets = tuple(buckets)
+        self.width = 2 + (len(self.buckets) + 1 if self.buckets else 0)
+        self.rings = tuple(_Ring(resolution, size, self.width) for resolution, size in RESOLUTIONS)
+
+    def add(self, value: float, now: float) -> None:
+        """
+        Registra uma ocorrência (contador) ou observação (histograma).
+        """
+        bucket = 2 + bisect.bisect_left(self.buckets, value) if self.buckets else None
+        for ring in self.rings:
+            ring.add(now, bucket, value)
+
+    def summarize(self, window: float, now: float) -> Dict[str, Any]:
+        """
+        Agrega a série sobre a janela.
+
+        Returns:
+            Dict[str, Any]: count, rate_per_second e, para histogramas,
+                sum, avg, p50, p90 e p99
+        """
+        ring = next(
+            (ring for ring in self.rings if window <= ring.resolution * ring.size),
+            self.rings[-1]
+        )
+        totals = ring.collect(now, window)
+
+        count = int(totals[0])
+        summary = {
+            "count": count,
+            "rate_per_second": count / window,
+            "resolution_seconds": ring.resolution
+        }
+        if self.buckets:
+            summary.update({
+                "sum": totals[1],
+                "avg": totals[1] / count if count else 0.0,
+                "p50": self._quantile(totals[2:], count, 0.50),
+                "p90": self._quantile(totals[2:], count, 0.90),
+                "p99": self._quantile(totals[2:], count, 0.99)
+            })
+        return summary
+
+    def _quantile(self, counts: List[float], total: int, fraction: float) -> Optional[float]:
+        """
+        Estima um percentil interpolando dentro do bucket (como o
+        histogram_quantile do Prometheus).
+        """
+        if not total:
+            return None
+
+        rank = fraction * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    # Bucket +inf: o melhor limite conhecido é o último
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+class WindowedMetrics:
+    """
+    Conjunto de séries em janelas, limitado por LRU.
+    """
+
+    def __init__(self, max_series: int = 2000):
+        """
+        Args:
+            max_series: Número máximo de séries; as menos recentes são descartadas
+        """
+        self.max_series = max_series
+        self.evictions = 0
+        self._series: "OrderedDict[Tuple[str, str], WindowedSeries]" = OrderedDict()
+
+    def count(self, metric: str, labels_key: str, now: Optional[float] = None) -> None:
+        """
+        Registra uma ocorrência de um contador.
+        """
+        self._get(metric, labels_key, ()).add(1, now or time.time())
+
+    def observe(self, metric: str, labels_key: str, value: float, buckets: Sequence[float],
+                now: Optional[float] = None) -> None:
+        """
+        Registra uma observação de um histograma.
+        """
+        self._get(metric, labels_key, buckets).add(value, now or time.time())
+
+    def query(self, window: float, metric: Optional[str] = None, labels: Optional[str] = None,
+              now: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Agrega as séries sobre uma janela que termina agora.
+
+        As séries são percorridas da atualizada mais recentemente para a
+        mais antiga, e no máximo `limit` séries que passam pelos filtros são
+        agregadas.
+
+        Args:
+            window: Tamanho da janela em segundos (até MAX_WINDOW_SECONDS)
+            metric: Filtra as métricas que começam com este prefixo
+            labels: Filtra as séries cujos rótulos contêm este texto (ex: "agent:NLUAgent")
+            now: Fim da janela (padrão: agora)
+            limit: Máximo de séries agregadas (padrão: METRICS_WINDOW_QUERY_MAX_SERIES)
+
+        Returns:
+            Dict[str, Any]: Janela consultada, resumo de cada série e se a
+                consulta foi truncada pelo limite
+        """
+        now = now or time.time()
+        window = min(window, MAX_WINDOW_SECONDS)
+        limit = limit or settings.METRICS_WINDOW_QUERY_MAX_SERIES
+        series = []
+        scanned = 0
+        truncated = False
+        for (name, labels_key), windowed in reversed(list(self._series.items())):
+            if metric and not name.startswith(metric):
+                continue
+            if labels and labels not in labels_key:
+                continue
+            if scanned >= limit:
+                truncated = True
+                break
+            scanned += 1
+            summary = windowed.summarize(window, now)
+            if summary["count"]:
+                series.append({"metric": name, "labels": labels_key, **summary})
+
+        return {"window_seconds": window, "series": series, "truncated": truncated}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o número de séries mantidas.
+        """
+        return {"series": len(self._series), "max_series": self.max_series, "evictions": self.evictions}
+
+    def _get(self, metric: str, labels_key: str, buckets: Sequence[float]) -> WindowedSeries:
+        key = (metric, labels_key)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = WindowedSeries(buckets)
+            if len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._series.move_to_end(key)
+        return series
+
+# Séries em janelas compartilhadas pelo processo
+windowed_metrics = WindowedMetrics(settings.METRICS_WINDOW_MAX_SERIES)
@@ -0,0 +1,70 @@
+"""
+Testes do canal WebSocket de chat.
+"""
+
+import asyncio
+
+import pytest
+
+from src.api.routes import chat_ws
+from src.infrastructure.cache.idempotency import MemoryIdempotencyStore
+
+
+class _FakeWebSocket:
+    """WebSocket que apenas guarda os frames enviados."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+def _connection():
+    session = chat_ws.ChatSession("s1", "u1")
+    return chat_ws.ChatConnection(_FakeWebSocket(), session, None, None)
+
+
+def test_disconnect_releases_idempotency_key(monkeypatch):
+    """Uma mensagem cancelada pela desconexão não bloqueia a repetição."""
+    store = MemoryIdempotencyStore(max_entries=10, ttl=60, wait_timeout=0.5)
+    monkeypatch.setattr(chat_ws, "get_idempotency_store", lambda: store)
+
+    started = asyncio.Event()
+
+    async def blocked_context(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(chat_ws.context_prefetcher, "get", blocked_context)
+
+    async def scenario():
+        connection = _connection()
+        payload = {"content": "oi", "client_message_id": "c1"}
+
+        handle = asyncio.create_task(connection._handle(payload))
+        await started.wait()
+        handle.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await handle
+
+        # A repetição reserva a chave em vez de esperar pela original
+        started.clear()
+        retry = asyncio.create_task(connection._handle(payload))
+        await asyncio.wait_for(started.wait(), 0.2)
+        retry.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await retry
+
+    asyncio.run(scenario())
+    assert "u1:c1" not in store._in_progress
+
+
+def test_invalid_task_id_does_not_change_session():
+    """Uma mensagem inválida não altera a tarefa ativa da sessão."""
+    connection = _connection()
+
+    event, *_ = asyncio.run(connection._handle({"content": "oi", "task_id": 123}))
+
+    assert event["code"] == "invalid_message"
+    assert connection.session.task_id is None